@@ -0,0 +1,235 @@
+import csv
+import io
+import math
+import psycopg2
+from psycopg2.extras import execute_values
+
+# Rows streamed per COPY / execute_values round trip.
+DEFAULT_CHUNK_SIZE = 5000
+
+# --- Typed Column Mapping Per Table ---
+# Each entry maps a DataFrame column to (table column, postgres type).
+# Columns are listed in the order they are sent to the server.
+TABLE_COLUMNS = {
+    "employee": [
+        ("employee_id", "int"),
+        ("name", "text"),
+        ("phone_num", "text"),
+        ("job_role", "text"),
+        ("salary", "float"),
+        ("account_num", "text"),
+        ("hours_week", "int"),
+    ],
+    "store": [
+        ("store_id", "text"),
+        ("name", "text"),
+        ("address", "text"),
+        ("distance_km", "float"),
+        ("expected_time", "interval"),
+        ("open_time", "time"),
+        ("close_time", "time"),
+    ],
+    "product_pellets": [
+        ("product_id", "int"),
+        ("name", "text"),
+        ("category", "text"),
+        ("quantity", "int"),
+        ("pallet_cost", "float"),
+    ],
+    "product_pellet": [
+        ("pellet_id", "int"),
+        ("name", "text"),
+        ("category", "text"),
+        ("cost", "int"),
+        ("weight", "float"),
+        ("received", "date"),
+        ("sell_by", "date"),
+        ("refrigerated", "bool"),
+        ("sent", "bool"),
+    ],
+    "truck": [
+        ("employee_id", "int"),
+        ("plate_number", "text"),
+        ("refrigerated", "bool"),
+        ("capacity", "float"),
+        ("km_driven", "float"),
+        ("operational_status", "text"),
+        ("fuel_capacity", "float"),
+        ("last_maintanance", "date"),
+    ],
+    "supplier": [
+        ("supplier_id", "text"),
+        ("expected_delivery_time", "interval"),
+        ("product_id", "int"),
+        ("product_category", "text"),
+    ],
+    "inventory": [
+        ("capacity_pellets", "int"),
+        ("current_pellets", "int"),
+        ("to_be_sent", "int"),
+        ("to_be_received", "int"),
+    ],
+}
+
+# Serial columns loaded with explicit ids; their sequences are resynced after a load.
+SERIAL_COLUMNS = {
+    "employee": "employee_id",
+    "product_pellets": "product_id",
+    "product_pellet": "pellet_id",
+}
+
+# --- Value Conversion ---
+def _is_null(value):
+    if value is None:
+        return True
+    if isinstance(value, float) and math.isnan(value):
+        return True
+    # pandas.NaT / pd.NA compare unequal to themselves or raise on bool()
+    try:
+        return value != value
+    except (TypeError, ValueError):
+        return True
+
+def _to_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "t", "1", "yes")
+    return bool(value)
+
+def _to_int(value):
+    # cost is stored as INT; round rather than truncate float CSV values.
+    return int(round(float(value)))
+
+CONVERTERS = {
+    "int": _to_int,
+    "float": float,
+    "text": str,
+    "bool": _to_bool,
+    "date": str,
+    "interval": str,
+    "time": str,
+}
+
+def convert_value(value, pg_type):
+    """
+    Converts one DataFrame cell to a Python value psycopg2 can adapt.
+    NULL-like values (None, NaN, NaT) become None.
+    """
+    if _is_null(value):
+        return None
+    return CONVERTERS[pg_type](value)
+
+def iter_table_rows(table, df):
+    """
+    Yields tuples of converted values for `df` in TABLE_COLUMNS order.
+    """
+    columns = TABLE_COLUMNS[table]
+    missing = [name for name, _ in columns if name not in df.columns]
+    if missing:
+        raise KeyError(f"DataFrame for {table} is missing columns: {missing}")
+    frame = df[[name for name, _ in columns]]
+    types = [pg_type for _, pg_type in columns]
+    for values in frame.itertuples(index=False, name=None):
+        yield tuple(convert_value(v, t) for v, t in zip(values, types))
+
+def _iter_chunks(rows, chunk_size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _format_copy_value(value):
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return value
+
+# --- COPY FROM STDIN ---
+def copy_rows(conn, table, rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Streams already converted rows into `table` with COPY ... FROM STDIN (CSV).
+    Each chunk is written to an in-memory buffer and sent as one COPY, so memory
+    stays bounded by `chunk_size` rows.
+    """
+    column_list = ", ".join(name for name, _ in TABLE_COLUMNS[table])
+    sql = f"COPY {table} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+    total = 0
+    with conn.cursor() as cur:
+        for chunk in _iter_chunks(rows, chunk_size):
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in chunk:
+                writer.writerow([
+                    "\\N" if v is None else _format_copy_value(v) for v in row
+                ])
+            buffer.seek(0)
+            cur.copy_expert(sql, buffer)
+            total += len(chunk)
+    return total
+
+# --- execute_values Fallback ---
+def insert_rows_batched(conn, table, rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Inserts already converted rows with multi-row INSERT statements built by
+    psycopg2.extras.execute_values.
+    """
+    column_list = ", ".join(name for name, _ in TABLE_COLUMNS[table])
+    sql = f"INSERT INTO {table} ({column_list}) VALUES %s"
+    total = 0
+    with conn.cursor() as cur:
+        for chunk in _iter_chunks(rows, chunk_size):
+            execute_values(cur, sql, chunk, page_size=chunk_size)
+            total += len(chunk)
+    return total
+
+# --- Sequence Resync ---
+def sync_serial_sequence(conn, table):
+    """
+    Moves the serial sequence of `table` past the highest loaded id, so later
+    INSERTs without an explicit id don't collide with seeded rows.
+    """
+    column = SERIAL_COLUMNS.get(table)
+    if column is None:
+        return
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT setval(pg_get_serial_sequence('{table}', '{column}'),
+                          COALESCE((SELECT MAX({column}) FROM {table}), 0) + 1,
+                          false);
+        """)
+
+# --- Bulk Load a DataFrame ---
+def bulk_load_dataframe(conn, table, df, method="copy", chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Loads `df` into `table` using the typed mapping in TABLE_COLUMNS and commits.
+
+    method="copy" streams through COPY FROM STDIN and falls back to
+    execute_values batches if the server refuses COPY (e.g. missing privileges
+    or a pooler that doesn't support the COPY protocol).
+    method="values" goes straight to execute_values.
+    Returns the number of rows loaded.
+    """
+    if table not in TABLE_COLUMNS:
+        raise KeyError(f"No column mapping defined for table {table}")
+    if method not in ("copy", "values"):
+        raise ValueError(f"Unknown bulk load method: {method}")
+
+    loaded = None
+    if method == "copy":
+        try:
+            loaded = copy_rows(conn, table, iter_table_rows(table, df), chunk_size)
+        except (psycopg2.NotSupportedError, psycopg2.ProgrammingError,
+                psycopg2.OperationalError) as e:
+            if conn.closed:
+                raise
+            print(f"COPY into {table} failed ({e}); falling back to execute_values.")
+            conn.rollback()
+    if loaded is None:
+        loaded = insert_rows_batched(conn, table, iter_table_rows(table, df), chunk_size)
+    sync_serial_sequence(conn, table)
+    conn.commit()
+    return loaded
@@ -1,6 +1,9 @@
+from contextlib import contextmanager
 from dotenv import load_dotenv
 import os
 import psycopg2
+from psycopg2 import pool
+from db_sim_metrics import MetricsConnection
 
 # Load environment variables from .env file
 load_dotenv()
@@ -11,6 +14,23 @@ DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_HOST = os.getenv("DB_HOST")
 DB_PORT = os.getenv("DB_PORT")
+# Optional schema to run against (used to isolate scenario runs)
+DB_SCHEMA = os.getenv("DB_SCHEMA")
+
+# Admin passphrase the employee account numbers are encrypted with.
+# In real-world use, this passphrase should be stored securely, not hardcoded.
+ADMIN_PASSPHRASE = "sample_admin_key"
+
+# Connection pool bounds
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "4"))
+
+_connection_pool = None
+
+def _connection_options():
+    if DB_SCHEMA:
+        return f"-c search_path={DB_SCHEMA}"
+    return None
 
 def get_db_connection():
     return psycopg2.connect(
@@ -18,5 +38,78 @@ def get_db_connection():
         user=DB_USER,
         password=DB_PASSWORD,
         host=DB_HOST,
-        port=DB_PORT
+        port=DB_PORT,
+        options=_connection_options(),
+        connection_factory=MetricsConnection
     )
+
+def use_schema(schema):
+    """
+    Points every new connection of this process at `schema` (None for the
+    server default). The pool is closed so pooled sessions pick it up too.
+    """
+    global DB_SCHEMA
+    DB_SCHEMA = schema
+    close_connection_pool()
+
+# --- Connection Pool ---
+def get_connection_pool():
+    """
+    Returns the process-wide bounded connection pool, creating it on first use.
+    """
+    global _connection_pool
+    if _connection_pool is None or _connection_pool.closed:
+        _connection_pool = pool.ThreadedConnectionPool(
+            DB_POOL_MIN,
+            DB_POOL_MAX,
+            dbname=DB_NAME,
+            user=DB_USER,
+            password=DB_PASSWORD,
+            host=DB_HOST,
+            port=DB_PORT,
+            options=_connection_options(),
+            connection_factory=MetricsConnection
+        )
+    return _connection_pool
+
+def close_connection_pool():
+    global _connection_pool
+    if _connection_pool is not None and not _connection_pool.closed:
+        _connection_pool.closeall()
+    _connection_pool = None
+
+# --- Day Session ---
+@contextmanager
+def day_session():
+    """
+    Borrows one pooled connection for a simulated day and runs the whole day in
+    a single transaction: committed if the block finishes, rolled back if it raises.
+    """
+    db_pool = get_connection_pool()
+    conn = db_pool.getconn()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        db_pool.putconn(conn, close=conn.closed != 0)
+
+# --- Savepoint ---
+@contextmanager
+def savepoint(conn, name="sp"):
+    """
+    Wraps a block in a SAVEPOINT so a failed statement only undoes that block
+    instead of aborting the surrounding day transaction.
+    """
+    with conn.cursor() as cur:
+        cur.execute(f"SAVEPOINT {name};")
+    try:
+        yield
+    except Exception:
+        with conn.cursor() as cur:
+            cur.execute(f"ROLLBACK TO SAVEPOINT {name};")
+        raise
+    with conn.cursor() as cur:
+        cur.execute(f"RELEASE SAVEPOINT {name};")
@@ -0,0 +1,170 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+FORECAST_STEPS = 12
+ARIMA_ORDER = (1, 1, 1)
+MODEL_CACHE = os.path.join("forecast_cache", "arima_models.json")
+
+# --- Series Helpers ---
+def series_hash(months, values, order=ARIMA_ORDER):
+    """
+    Fingerprint of one product's history: its months, demand values and
+    the model order. An unchanged hash means the cached fit still holds.
+    """
+    digest = hashlib.sha1()
+    digest.update(json.dumps([list(months), list(order)]).encode())
+    digest.update(np.asarray(values, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+def monthly_series(months, values):
+    """
+    Demand history as a month-start indexed series, as the notebook builds it.
+    """
+    ts = pd.Series(np.asarray(values, dtype=np.float64), index=pd.to_datetime([f"{m}-01" for m in months]))
+    return ts.asfreq("MS")
+
+def forecast_columns(steps):
+    return [f"Forecast_Month_{i + 1}" for i in range(steps)]
+
+# --- Model Cache ---
+def load_model_cache(path=MODEL_CACHE):
+    """
+    Returns {product_id: {"hash", "order", "params", "forecast"}} from the
+    cache file, or {} when there is none yet.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return {int(pid): entry for pid, entry in json.load(f).items()}
+
+def save_model_cache(cache, path=MODEL_CACHE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({str(pid): entry for pid, entry in sorted(cache.items())}, f)
+    os.replace(tmp, path)
+
+# --- Fit One Product ---
+def _fit_arima(task):
+    """
+    Process pool worker: fits ARIMA on one product's history, starting the
+    optimizer from `start_params` when given, and forecasts `steps` months.
+    Returns (product_id, params, forecast, error).
+    """
+    product_id, months, values, order, steps, start_params = task
+    from statsmodels.tsa.arima.model import ARIMA
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            model = ARIMA(monthly_series(months, values), order=order, enforce_invertibility=False)
+            fit = model.fit(start_params=start_params)
+            return product_id, fit.params.tolist(), fit.forecast(steps=steps).tolist(), None
+    except Exception as e:
+        return product_id, None, None, str(e)
+
+def arima_forecast_matrix(Y, months, steps=FORECAST_STEPS, order=ARIMA_ORDER):
+    """
+    Fits ARIMA(order) on every row of `Y` (series x months) in this
+    process and returns the (series, steps) forecasts; rows whose fit
+    fails are NaN. For callers that already run in a worker process.
+    """
+    forecast = np.full((len(Y), steps), np.nan)
+    for i, values in enumerate(np.asarray(Y, dtype=np.float64)):
+        _, _, row, error = _fit_arima((i, list(months), values, order, steps, None))
+        if error is None:
+            forecast[i] = row
+    return forecast
+
+def _refilter_arima(product_id, months, values, order, steps, params):
+    # Cached parameters on unchanged history: no optimisation, only the
+    # Kalman filter to reach the end of the series.
+    from statsmodels.tsa.arima.model import ARIMA
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        model = ARIMA(monthly_series(months, values), order=order, enforce_invertibility=False)
+        return model.filter(params).forecast(steps=steps).tolist()
+
+# --- Forecast All Products ---
+def forecast_demand(pivot, steps=FORECAST_STEPS, order=ARIMA_ORDER, cache_path=MODEL_CACHE,
+                    max_workers=None, chunk_size=4):
+    """
+    Forecasts `steps` months of demand for every product of `pivot`
+    (product_id x "YYYY-MM", like monthly_demand_pivot) with ARIMA(order),
+    returning forecast_df as the notebook builds it.
+
+    Products whose history hash matches the cache reuse their fit as is.
+    The others are fitted across a process pool of `max_workers`, in
+    chunks of `chunk_size` products per task; a product with cached
+    parameters from an older history starts the optimizer from them,
+    which converges in a few iterations when only the last months changed.
+    The cache is rewritten with the new fits. Products whose fit fails are
+    reported and left out, as in the notebook.
+    """
+    cache = load_model_cache(cache_path) if cache_path else {}
+    months = [str(m) for m in pivot.columns]
+    forecasts, tasks, hashes = {}, [], {}
+    reused = warm = 0
+    started = time.perf_counter()
+    for product_id, row in pivot.iterrows():
+        product_id = int(product_id)
+        values = row.to_numpy(dtype=np.float64)
+        hashes[product_id] = digest = series_hash(months, values, order)
+        entry = cache.get(product_id)
+        if entry is not None and entry["hash"] == digest and entry["order"] == list(order):
+            forecast = entry["forecast"]
+            if len(forecast) < steps:
+                forecast = _refilter_arima(product_id, months, values, order, steps, entry["params"])
+            forecasts[product_id] = forecast[:steps]
+            reused += 1
+            continue
+        start_params = entry["params"] if entry is not None and entry["order"] == list(order) else None
+        warm += start_params is not None
+        tasks.append((product_id, months, values, order, steps, start_params))
+
+    if tasks:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(_fit_arima, tasks, chunksize=chunk_size))
+        for product_id, params, forecast, error in results:
+            if error is not None:
+                print(f"Forecast failed for product {product_id}: {error}")
+                continue
+            forecasts[product_id] = forecast
+            cache[product_id] = {
+                "hash": hashes[product_id], "order": list(order), "params": params, "forecast": forecast
+            }
+        if cache_path:
+            save_model_cache(cache, cache_path)
+    print(
+        f"Forecast {len(forecasts)} products in {time.perf_counter() - started:.2f}s: "
+        f"{reused} reused, {warm} warm-started, {len(tasks) - warm} fitted from scratch."
+    )
+
+    forecast_df = pd.DataFrame.from_dict(forecasts, orient="index", columns=forecast_columns(steps)).sort_index()
+    forecast_df.index.name = "Product_ID"
+    return forecast_df
+
+if __name__ == "__main__":
+    from db_config import get_db_connection
+    from db_monthly_rollup import load_monthly_pivot
+
+    parser = argparse.ArgumentParser(description="Forecast monthly demand per product with cached ARIMA fits.")
+    parser.add_argument("--start", help="First month of history (YYYY-MM).")
+    parser.add_argument("--end", help="Last month of history (YYYY-MM).")
+    parser.add_argument("--steps", type=int, default=FORECAST_STEPS)
+    parser.add_argument("--workers", type=int, help="Processes fitting models (default: one per core).")
+    parser.add_argument("--cache", default=MODEL_CACHE)
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    try:
+        pivot = load_monthly_pivot(conn, "demand", args.start, args.end)
+    finally:
+        conn.close()
+    print(forecast_demand(pivot, args.steps, cache_path=args.cache, max_workers=args.workers).round(1).to_string())
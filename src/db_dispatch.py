@@ -0,0 +1,277 @@
+from datetime import datetime, timedelta
+from db_order_behavior import enforce_truck_maintenance
+
+# --- Dispatch Parameters ---
+SHIFT_START_TIME = datetime.strptime("08:00", "%H:%M").time()
+SHIFT_LENGTH = timedelta(hours=11)           # Trucks must be back an hour before the 20:00 close.
+LOADING_TIME = timedelta(hours=1)
+STOP_UNLOAD_TIME = timedelta(minutes=20)
+STOP_DETOUR_KM = 5.0                         # Extra km per additional store on a route.
+DEFAULT_BAND_KM = 10.0                       # Stores within this distance of each other share routes.
+DEFAULT_EXPECTED_TIME = timedelta(hours=2)
+
+# --- Fleet ---
+def dispatchable_trucks(current_date, state):
+    """
+    Returns the trucks that can run routes today: available, with a driver and
+    not due for maintenance. Overdue trucks are sent to maintenance here.
+    """
+    trucks = []
+    for truck in list(state.available_trucks()):
+        truck_id = truck["truck_id"]
+        if not truck["employee_id"]:
+            print(f"Truck {truck_id} does not have an associated driver.")
+            continue
+        if enforce_truck_maintenance(None, truck_id, current_date, state):
+            print(f"Truck {truck_id} is under maintenance on {current_date}.")
+            continue
+        trucks.append({
+            "truck_id": truck_id,
+            "driver_id": truck["employee_id"],
+            "capacity": float(truck["capacity"] or 0),
+            "refrigerated": bool(truck["refrigerated"]),
+            "time_used": timedelta(0),
+            "busy": False,
+        })
+    return trucks
+
+# --- Stops ---
+def make_stop(order, items, state):
+    store_id = order["store_id"]
+    return {
+        "order_id": order["order_id"],
+        "store_id": store_id,
+        "items": items,
+        "weight": sum(item["weight"] for item in items),
+        "refrigerated": any(item.get("refrigerated", False) for item in items),
+        "distance_km": state.store_distance(store_id),
+        "expected_time": state.store_expected_time(store_id, DEFAULT_EXPECTED_TIME),
+    }
+
+def take_items(items, max_weight):
+    """
+    Takes as much of `items` as fits in `max_weight`, splitting an item's
+    quantity when needed. Returns (taken, rest).
+    """
+    taken, rest, taken_weight = [], [], 0.0
+    for item in items:
+        quantity = item["quantity"]
+        unit_weight = item["weight"] / quantity
+        fits = min(quantity, int((max_weight - taken_weight) // unit_weight)) if unit_weight > 0 else quantity
+        if fits > 0:
+            taken.append({**item, "quantity": fits, "weight": unit_weight * fits})
+            taken_weight += unit_weight * fits
+        if fits < quantity:
+            rest.append({**item, "quantity": quantity - fits, "weight": unit_weight * (quantity - fits)})
+    return taken, rest
+
+# --- Routes ---
+def route_km(stops):
+    farthest = max(stop["distance_km"] for stop in stops)
+    stores = {stop["store_id"] for stop in stops}
+    return farthest * 2 + STOP_DETOUR_KM * (len(stores) - 1)
+
+def route_duration(stops):
+    farthest = max(stop["expected_time"] for stop in stops)
+    stores = {stop["store_id"] for stop in stops}
+    return LOADING_TIME + farthest * 2 + STOP_UNLOAD_TIME * len(stores)
+
+def fits_truck(truck, stops):
+    return (
+        sum(stop["weight"] for stop in stops) <= truck["capacity"]
+        and (truck["refrigerated"] or not any(stop["refrigerated"] for stop in stops))
+        and truck["time_used"] + route_duration(stops) <= SHIFT_LENGTH
+    )
+
+def pick_truck(trucks, stop):
+    """
+    Best truck to open a new route with: a free truck that fits the stop,
+    keeping refrigerated trucks for refrigerated stops, largest capacity first
+    so later stops can join the route.
+    """
+    candidates = [t for t in trucks if not t["busy"] and fits_truck(t, [stop])]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda t: (t["refrigerated"] == stop["refrigerated"], t["capacity"]))
+
+def distance_bands(stops, band_km):
+    """
+    Sweeps stops outward from the warehouse: a band starts at the nearest
+    unassigned store and takes every stop within `band_km` of it.
+    """
+    bands, band, band_start = [], [], None
+    for stop in sorted(stops, key=lambda s: s["distance_km"]):
+        if band and stop["distance_km"] - band_start > band_km:
+            bands.append(band)
+            band = []
+        if not band:
+            band_start = stop["distance_km"]
+        band.append(stop)
+    if band:
+        bands.append(band)
+    return bands
+
+def close_route(truck, stops, current_date):
+    start = datetime.combine(current_date, SHIFT_START_TIME) + truck["time_used"]
+    duration = route_duration(stops)
+    truck["time_used"] += duration
+    truck["busy"] = False
+    km = route_km(stops)
+    ordered = sorted(stops, key=lambda s: s["distance_km"])
+    return {
+        "truck_id": truck["truck_id"],
+        "driver_id": truck["driver_id"],
+        "stops": ordered,
+        "weight": sum(stop["weight"] for stop in stops),
+        "km_driven": km,
+        "trip_start": start,
+        "departure": start + LOADING_TIME,
+        "estimated_return": start + duration,
+        "km_per_stop": km / len(stops),
+    }
+
+# --- Dispatch ---
+def dispatch_orders(planned, current_date, state, band_km=DEFAULT_BAND_KM):
+    """
+    Consolidates the day's planned orders into multi-stop truck routes.
+
+    Orders heavier than the largest suitable truck are split over the largest
+    free trucks first (all or nothing). The remaining orders are grouped into
+    distance bands and packed first-fit-decreasing by weight; refrigerated
+    stops only go on refrigerated trucks. A truck can run several routes as
+    long as they fit in its shift.
+
+    Returns (routes, unfulfilled_order_ids).
+    """
+    trucks = dispatchable_trucks(current_date, state)
+    routes = []
+    unfulfilled = []
+    regular = []
+
+    for order in planned:
+        stop = make_stop(order, order["items"], state)
+        suitable = [t for t in trucks if t["refrigerated"] or not stop["refrigerated"]]
+        max_capacity = max((t["capacity"] for t in suitable), default=0)
+        if stop["weight"] <= max_capacity:
+            regular.append(stop)
+            continue
+        if max_capacity <= 0:
+            unfulfilled.append(order["order_id"])
+            continue
+        # Fill the largest free trucks one after another until the order is loaded.
+        assigned, rest = [], order["items"]
+        for truck in sorted(suitable, key=lambda t: -t["capacity"]):
+            if not rest:
+                break
+            if truck["busy"]:
+                continue
+            taken, remaining = take_items(rest, truck["capacity"])
+            chunk = make_stop(order, taken, state) if taken else None
+            if chunk is None or not fits_truck(truck, [chunk]):
+                continue
+            truck["busy"] = True
+            assigned.append((truck, chunk))
+            rest = remaining
+        if rest:
+            for truck, _ in assigned:
+                truck["busy"] = False
+            print(f"No available truck for order from store {order['store_id']} with total weight {stop['weight']}.")
+            unfulfilled.append(order["order_id"])
+            continue
+        routes.extend(close_route(truck, [chunk], current_date) for truck, chunk in assigned)
+
+    for band in distance_bands(regular, band_km):
+        open_routes = []  # (truck, stops)
+        # Refrigerated stops first so they get the refrigerated trucks.
+        for stop in sorted(band, key=lambda s: (not s["refrigerated"], -s["weight"])):
+            for truck, stops in open_routes:
+                if fits_truck(truck, stops + [stop]):
+                    stops.append(stop)
+                    break
+            else:
+                truck = pick_truck(trucks, stop)
+                if truck is None:
+                    print(f"No available truck for order from store {stop['store_id']} with total weight {stop['weight']}.")
+                    unfulfilled.append(stop["order_id"])
+                    continue
+                truck["busy"] = True
+                open_routes.append((truck, [stop]))
+        routes.extend(close_route(truck, stops, current_date) for truck, stops in open_routes)
+
+    return routes, unfulfilled
+
+# --- Route Deliveries ---
+def route_deliveries(routes):
+    """
+    Flattens routes into one delivery per stop, carrying the truck, timing
+    and the stop's share of the route's kilometres.
+    """
+    return [
+        {
+            "order_id": stop["order_id"],
+            "store_id": stop["store_id"],
+            "items": stop["items"],
+            "truck_id": route["truck_id"],
+            "driver_id": route["driver_id"],
+            "trip_start": route["trip_start"],
+            "time_sent": route["departure"],
+            "estimated_return": route["estimated_return"],
+            "km_driven": route["km_per_stop"],
+        }
+        for route in routes
+        for stop in route["stops"]
+    ]
+
+# --- Daily Report ---
+def ensure_dispatch_report_table(conn):
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS dispatch_report (
+                date DATE PRIMARY KEY,
+                orders_dispatched INT,
+                unfulfilled_orders INT,
+                trucks_used INT,
+                routes INT,
+                stops INT,
+                km_driven FLOAT,
+                avg_load_factor FLOAT
+            );
+        """)
+
+def dispatch_report(routes, unfulfilled, orders_without_stock, state):
+    """
+    Summarises a day's dispatch. Unfulfilled orders include those that could
+    not be shipped for lack of stock as well as those left without a truck.
+    """
+    capacities = {t: float(state.trucks[t]["capacity"] or 0) for t in {r["truck_id"] for r in routes}}
+    load_factors = [r["weight"] / capacities[r["truck_id"]] for r in routes if capacities[r["truck_id"]]]
+    return {
+        "orders_dispatched": len({s["order_id"] for r in routes for s in r["stops"]}),
+        "unfulfilled_orders": len(set(unfulfilled)) + orders_without_stock,
+        "trucks_used": len(capacities),
+        "routes": len(routes),
+        "stops": sum(len(r["stops"]) for r in routes),
+        "km_driven": round(sum(r["km_driven"] for r in routes), 2),
+        "avg_load_factor": round(sum(load_factors) / len(load_factors), 3) if load_factors else 0.0,
+    }
+
+def save_dispatch_report(conn, current_date, report):
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO dispatch_report (
+                date, orders_dispatched, unfulfilled_orders, trucks_used,
+                routes, stops, km_driven, avg_load_factor
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (date) DO UPDATE SET
+                orders_dispatched = EXCLUDED.orders_dispatched,
+                unfulfilled_orders = EXCLUDED.unfulfilled_orders,
+                trucks_used = EXCLUDED.trucks_used,
+                routes = EXCLUDED.routes,
+                stops = EXCLUDED.stops,
+                km_driven = EXCLUDED.km_driven,
+                avg_load_factor = EXCLUDED.avg_load_factor;
+        """, (
+            current_date, report["orders_dispatched"], report["unfulfilled_orders"],
+            report["trucks_used"], report["routes"], report["stops"],
+            report["km_driven"], report["avg_load_factor"],
+        ))
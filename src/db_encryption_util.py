@@ -1,12 +1,23 @@
+import base64
+from collections import OrderedDict
+import hashlib
+import os
 from cryptography.fernet import Fernet
-import psycopg2
-from datetime import datetime
-from db_payroll_behavior import log_transaction
+from db_config import ADMIN_PASSPHRASE
 
-# --- Load or define encryption key ---
-# In real-world use, this key should be stored securely, not hardcoded.
-ENCRYPTION_KEY = b'sample_admin_key__must_be_32_bytes!'
-fernet = Fernet(Fernet.generate_key())
+# Key derivation function (from passphrase)
+def derive_key_from_passphrase(passphrase: str) -> bytes:
+    return base64.urlsafe_b64encode(
+        hashlib.sha256(passphrase.encode()).digest()
+    )
+
+# --- Load the Encryption Key ---
+# Account numbers are encrypted by db_generate_employee with a key derived
+# from the admin passphrase; set PAYROLL_PASSPHRASE to override it.
+PAYROLL_PASSPHRASE = os.getenv("PAYROLL_PASSPHRASE", ADMIN_PASSPHRASE)
+DECRYPT_CACHE_SIZE = int(os.getenv("PAYROLL_DECRYPT_CACHE", "10000"))
+
+fernet = Fernet(derive_key_from_passphrase(PAYROLL_PASSPHRASE))
 
 # --- Encryption Utility ---
 def encrypt_account_number(account_number: str) -> str:
@@ -16,40 +27,51 @@ def encrypt_account_number(account_number: str) -> str:
 def decrypt_account_number(encrypted_account: str) -> str:
     return fernet.decrypt(encrypted_account.encode()).decode()
 
-# --- Simulate Transaction to External Bank ---
-def simulate_bank_transfer(employee_id, payment, decrypted_account_num):
-    print(f"Simulating bank transfer:")
-    print(f"  - Employee ID: {employee_id}")
-    print(f"  - Payment Amount: ${payment:.2f}")
-    print(f"  - Destination Account: {decrypted_account_num}")
-    print("  - Status: SUCCESS\n")
-
-# --- Combined Payroll Operation ---
-def execute_payroll_transaction(employee_id, encrypted_account, payment, last_payment, next_payment):
-    decrypted_account = decrypt_account_number(encrypted_account)
-    simulate_bank_transfer(employee_id, payment, decrypted_account)
-
-    conn = get_db_connection()
-    now = datetime.now()
-    with conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                INSERT INTO payroll_log (
-                    employee_id, payment, account_num, last_payment, next_payment, date_time
-                ) VALUES (%s, %s, %s, %s, %s, %s)
-                RETURNING transaction_id;
-            """, (employee_id, payment, encrypted_account, last_payment, next_payment, now))
-            transaction_id = cur.fetchone()[0]
-
-        log_transaction(conn, transaction_id, payment)
-    conn.commit()
-
-# --- DB Connection (replicating for completeness) ---
-def get_db_connection():
-    return psycopg2.connect(
-        dbname="your_db_name",
-        user="your_username",
-        password="your_password",
-        host="localhost",
-        port="5432"
-    )
+# --- Plaintext Cache ---
+class DecryptCache:
+    """
+    Bounded LRU map from encrypted account number to plaintext, so employees
+    paid every cycle are decrypted only once per process.
+    """
+
+    def __init__(self, maxsize=DECRYPT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token):
+        plaintext = self.entries.get(token)
+        if plaintext is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(token)
+        return plaintext
+
+    def put(self, token, plaintext):
+        self.entries[token] = plaintext
+        self.entries.move_to_end(token)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def stats(self):
+        return {"size": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+def decrypt_accounts(encrypted_accounts, cache=None):
+    """
+    Decrypts a batch of account numbers, serving repeats from `cache` (a
+    DecryptCache) and decrypting each distinct miss once. Returns the
+    plaintexts in input order.
+    """
+    decrypted = {}
+    for token in encrypted_accounts:
+        if token in decrypted:
+            continue
+        plaintext = cache.get(token) if cache is not None else None
+        if plaintext is None:
+            plaintext = decrypt_account_number(token)
+            if cache is not None:
+                cache.put(token, plaintext)
+        decrypted[token] = plaintext
+    return [decrypted[token] for token in encrypted_accounts]
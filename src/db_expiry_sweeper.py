@@ -0,0 +1,80 @@
+from collections import defaultdict
+from psycopg2.extras import execute_values
+
+DEFAULT_SWEEP_BATCH = 5000
+
+# --- Schema ---
+def ensure_expiry_tables(conn):
+    """
+    Creates the partial index the sweeper scans and the waste_log table on
+    databases built before they were added to db_structure.sql.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_product_pellet_unsent_sell_by
+            ON product_pellet (sell_by) WHERE sent = FALSE;
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS waste_log (
+                date DATE,
+                name TEXT,
+                category TEXT,
+                pellets INT,
+                cost FLOAT,
+                PRIMARY KEY (date, name)
+            );
+        """)
+
+# --- Sweep Expired Pellets ---
+def sweep_expired_pellets(conn, current_date, batch_size=DEFAULT_SWEEP_BATCH):
+    """
+    Deletes the unsent pellets whose sell_by date is before `current_date`,
+    at most `batch_size` at a time, through the partial index on unsent
+    pellets. Each batch's DELETE ... RETURNING is aggregated per product in
+    the same statement, so nothing is scanned twice. Returns
+    {name: {"category", "pellets", "cost"}}.
+    """
+    expired = defaultdict(lambda: {"category": None, "pellets": 0, "cost": 0})
+    with conn.cursor() as cur:
+        while True:
+            cur.execute("""
+                WITH gone AS (
+                    DELETE FROM product_pellet
+                    WHERE pellet_id IN (
+                        SELECT pellet_id FROM product_pellet
+                        WHERE sent = FALSE AND sell_by < %s
+                        LIMIT %s
+                    )
+                    RETURNING name, category, cost
+                )
+                SELECT name, MIN(category), COUNT(*), COALESCE(SUM(cost), 0)
+                FROM gone
+                GROUP BY name;
+            """, (current_date, batch_size))
+            rows = cur.fetchall()
+            for name, category, pellets, cost in rows:
+                entry = expired[name]
+                entry["category"] = category
+                entry["pellets"] += pellets
+                entry["cost"] += cost
+            if sum(row[2] for row in rows) < batch_size:
+                break
+    return dict(expired)
+
+def log_waste(conn, current_date, expired):
+    """
+    Adds the day's expired pellet counts and cost to waste_log, one row per
+    product and day.
+    """
+    if not expired:
+        return
+    with conn.cursor() as cur:
+        execute_values(cur, """
+            INSERT INTO waste_log (date, name, category, pellets, cost) VALUES %s
+            ON CONFLICT (date, name) DO UPDATE
+            SET pellets = waste_log.pellets + EXCLUDED.pellets,
+                cost = waste_log.cost + EXCLUDED.cost;
+        """, [
+            (current_date, name, e["category"], e["pellets"], e["cost"])
+            for name, e in sorted(expired.items())
+        ], page_size=len(expired))
@@ -0,0 +1,258 @@
+import argparse
+import glob
+import json
+import os
+import shutil
+from datetime import datetime
+import pandas as pd
+from db_config import get_db_connection
+
+CACHE_DIR = "extract_cache"
+DEFAULT_FETCH_BATCH = 50_000
+
+# Tables the EDA notebook loads into df_dict.
+NOTEBOOK_TABLES = (
+    "store", "pending_orders", "product_pellets", "product_pellet", "inventory",
+    "employee", "truck", "inventory_delivery", "truck_log", "fuel_log",
+    "payroll_log", "supplier", "supplier_delivery", "transactions",
+    "overspending_log", "underperformance_log", "system_config",
+)
+
+# Append-only tables and their high-water mark column: rows are never
+# updated after their day commits, and ids only grow, so a sync pulls the
+# rows above the mark into month folders of date_time. Every other table
+# is re-pulled as one snapshot file, since its rows change in place.
+INCREMENTAL = {
+    "transactions": "transaction_id",
+    "inventory_delivery": "transaction_id",
+    "truck_log": "log_id",
+    "fuel_log": "transaction_id",
+    "payroll_log": "transaction_id",
+    "overspending_log": "id",
+    "underperformance_log": "id",
+}
+
+SNAPSHOT_FILE = "snapshot.parquet"
+WATERMARK_FILE = "_watermark.json"
+
+def _arrow_types():
+    import pyarrow as pa
+    return {
+        "smallint": pa.int16(),
+        "integer": pa.int32(),
+        "bigint": pa.int64(),
+        "real": pa.float32(),
+        "double precision": pa.float64(),
+        "boolean": pa.bool_(),
+        "text": pa.string(),
+        "json": pa.string(),
+        "jsonb": pa.string(),
+        "date": pa.date32(),
+        "time without time zone": pa.time64("us"),
+        "timestamp without time zone": pa.timestamp("us"),
+        "timestamp with time zone": pa.timestamp("us", tz="UTC"),
+        "interval": pa.duration("us"),
+    }
+
+# --- Table Layout ---
+def table_columns(conn, table):
+    """
+    Returns [(column, Postgres type)] of `table` in column order.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT a.attname, format_type(a.atttypid, a.atttypmod)
+            FROM pg_attribute a
+            WHERE a.attrelid = to_regclass(%s) AND a.attnum > 0 AND NOT a.attisdropped
+            ORDER BY a.attnum;
+        """, (table,))
+        return cur.fetchall()
+
+def _select_list(columns, arrow_types):
+    # json columns and types without an Arrow mapping are pulled as text.
+    return ", ".join(
+        f"{name}::text AS {name}" if pg_type in ("json", "jsonb") or pg_type not in arrow_types else name
+        for name, pg_type in columns
+    )
+
+def _arrow_schema(columns, arrow_types):
+    import pyarrow as pa
+    return pa.schema([(name, arrow_types.get(pg_type, pa.string())) for name, pg_type in columns])
+
+def _to_arrow(rows, schema):
+    import pyarrow as pa
+    return pa.table(
+        {field.name: pa.array([r[i] for r in rows], type=field.type) for i, field in enumerate(schema)},
+        schema=schema,
+    )
+
+def _write_atomic(table, path):
+    import pyarrow.parquet as pq
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, path)
+
+# --- Watermarks ---
+def table_watermark(table, cache_dir=CACHE_DIR):
+    """
+    Returns the last id cached for an incremental table, or None.
+    """
+    path = os.path.join(cache_dir, table, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)["value"]
+
+def _save_watermark(table, column, value, cache_dir):
+    path = os.path.join(cache_dir, table, WATERMARK_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"column": column, "value": value, "synced_at": datetime.now().isoformat()}, f)
+    os.replace(tmp, path)
+
+def _part_range(path):
+    lo, hi = os.path.basename(path)[len("part-"):-len(".parquet")].split("-")
+    return int(lo), int(hi)
+
+def _drop_parts_above(table, watermark, cache_dir):
+    # Parts written by a sync that stopped before recording its watermark.
+    for path in glob.glob(os.path.join(cache_dir, table, "*", "part-*.parquet")):
+        if watermark is None or _part_range(path)[0] > watermark:
+            os.remove(path)
+
+def reset_table_cache(table, cache_dir=CACHE_DIR):
+    shutil.rmtree(os.path.join(cache_dir, table), ignore_errors=True)
+
+# --- Sync ---
+def _sync_incremental(conn, table, column, columns, cache_dir, batch_size):
+    arrow_types = _arrow_types()
+    schema = _arrow_schema(columns, arrow_types)
+    watermark = table_watermark(table, cache_dir)
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT MAX({column}) FROM {table};")
+        latest = cur.fetchone()[0]
+    if watermark is not None and (latest is None or latest < watermark):
+        # The database was rebuilt since the cache was filled.
+        reset_table_cache(table, cache_dir)
+        watermark = None
+    _drop_parts_above(table, watermark, cache_dir)
+
+    id_index = [name for name, _ in columns].index(column)
+    month_index = [name for name, _ in columns].index("date_time")
+    pulled = 0
+    with conn.cursor(name=f"extract_{table}") as cur:
+        cur.itersize = batch_size
+        cur.execute(f"""
+            SELECT {_select_list(columns, arrow_types)} FROM {table}
+            WHERE %s::int IS NULL OR {column} > %s
+            ORDER BY {column};
+        """, (watermark, watermark))
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            by_month = {}
+            for row in rows:
+                month = f"{row[month_index]:%Y-%m}" if row[month_index] is not None else "undated"
+                by_month.setdefault(month, []).append(row)
+            for month, month_rows in by_month.items():
+                lo, hi = month_rows[0][id_index], month_rows[-1][id_index]
+                path = os.path.join(cache_dir, table, month, f"part-{lo:012d}-{hi:012d}.parquet")
+                _write_atomic(_to_arrow(month_rows, schema), path)
+            watermark = rows[-1][id_index]
+            _save_watermark(table, column, watermark, cache_dir)
+            pulled += len(rows)
+    return pulled
+
+def _sync_snapshot(conn, table, columns, cache_dir):
+    arrow_types = _arrow_types()
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT {_select_list(columns, arrow_types)} FROM {table};")
+        rows = cur.fetchall()
+    _write_atomic(_to_arrow(rows, _arrow_schema(columns, arrow_types)), os.path.join(cache_dir, table, SNAPSHOT_FILE))
+    return len(rows)
+
+def sync_table(conn, table, cache_dir=CACHE_DIR, batch_size=DEFAULT_FETCH_BATCH):
+    """
+    Brings the cached copy of `table` up to date and returns the rows
+    pulled: only rows above the high-water mark for INCREMENTAL tables
+    (streamed through a server-side cursor, `batch_size` rows per round
+    trip), the whole table otherwise. Rows of archived log partitions stay
+    in the cache.
+    """
+    columns = table_columns(conn, table)
+    if not columns:
+        raise ValueError(f"Table '{table}' does not exist.")
+    try:
+        if table in INCREMENTAL:
+            return _sync_incremental(conn, table, INCREMENTAL[table], columns, cache_dir, batch_size)
+        return _sync_snapshot(conn, table, columns, cache_dir)
+    finally:
+        conn.rollback()
+
+def sync_cache(conn, tables=NOTEBOOK_TABLES, cache_dir=CACHE_DIR, batch_size=DEFAULT_FETCH_BATCH):
+    """
+    Syncs every table of `tables`; returns {table: rows pulled}.
+    """
+    return {table: sync_table(conn, table, cache_dir, batch_size) for table in tables}
+
+# --- Load ---
+def load_table(table, columns=None, months=None, cache_dir=CACHE_DIR):
+    """
+    Returns the cached `table` as a DataFrame backed by Arrow memory
+    (pd.ArrowDtype columns), reading only `columns` when given and, for
+    incremental tables, only the "YYYY-MM" `months` when given. Files are
+    read through memory maps. A table never synced or without rows yet
+    gives an empty DataFrame.
+    """
+    import pyarrow.dataset as ds
+    from pyarrow import fs
+    if table in INCREMENTAL:
+        folders = months if months is not None else ["*"]
+        files = sorted(
+            path
+            for folder in folders
+            for path in glob.glob(os.path.join(cache_dir, table, folder, "part-*.parquet"))
+        )
+    else:
+        files = glob.glob(os.path.join(cache_dir, table, SNAPSHOT_FILE))
+    if not files:
+        return pd.DataFrame(columns=columns)
+    dataset = ds.dataset(
+        [os.path.abspath(f) for f in files],
+        format="parquet",
+        filesystem=fs.LocalFileSystem(use_mmap=True),
+    )
+    return dataset.to_table(columns=columns).to_pandas(types_mapper=pd.ArrowDtype)
+
+def load_tables(tables=NOTEBOOK_TABLES, columns=None, cache_dir=CACHE_DIR):
+    """
+    Returns {table: DataFrame} like the notebook's df_dict; `columns` maps a
+    table to the columns to read.
+    """
+    columns = columns or {}
+    return {table: load_table(table, columns.get(table), cache_dir=cache_dir) for table in tables}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync tables into the local Parquet extraction cache.")
+    parser.add_argument("--tables", nargs="+", default=list(NOTEBOOK_TABLES))
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_FETCH_BATCH)
+    parser.add_argument("--full", action="store_true", help="Drop the cached tables and pull them again.")
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    try:
+        for table in args.tables:
+            if args.full:
+                reset_table_cache(table, args.cache_dir)
+            started = datetime.now()
+            pulled = sync_table(conn, table, args.cache_dir, args.batch_size)
+            mark = table_watermark(table, args.cache_dir)
+            print(
+                f"{table}: {pulled} rows pulled in {(datetime.now() - started).total_seconds():.2f}s"
+                + (f", watermark {INCREMENTAL[table]} = {mark}" if table in INCREMENTAL else "")
+            )
+    finally:
+        conn.close()
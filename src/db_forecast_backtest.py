@@ -0,0 +1,203 @@
+import argparse
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from db_demand_forecast import FORECAST_STEPS, ARIMA_ORDER, arima_forecast_matrix, forecast_columns
+from db_smoothing_forecast import SEASON_LENGTH, holt_winters_forecast, seasonal_naive_forecast
+
+BACKTEST_CACHE = os.path.join("forecast_cache", "backtest")
+DEFAULT_MIN_TRAIN = 12
+
+def naive_forecast(Y, steps=FORECAST_STEPS, season_length=SEASON_LENGTH):
+    """
+    Repeats each row's last value.
+    """
+    return np.repeat(np.asarray(Y, dtype=np.float64)[:, -1:], steps, axis=1)
+
+# model -> f(Y, months, steps, season_length) giving a (series, steps) matrix.
+MODELS = {
+    "arima": lambda Y, months, steps, m: arima_forecast_matrix(Y, months, steps, ARIMA_ORDER),
+    "holt_winters": lambda Y, months, steps, m: holt_winters_forecast(Y, steps, m)[0],
+    "seasonal_naive": lambda Y, months, steps, m: seasonal_naive_forecast(Y, steps, m),
+    "naive": lambda Y, months, steps, m: naive_forecast(Y, steps, m),
+}
+
+# --- Folds ---
+def fold_origins(num_periods, horizon=FORECAST_STEPS, min_train=DEFAULT_MIN_TRAIN, step=1):
+    """
+    Rolling origins: every `step` periods from `min_train`, as long as a
+    full `horizon` of actuals follows the origin.
+    """
+    return list(range(min_train, num_periods - horizon + 1, step))
+
+def fold_key(model, Y_train, months, horizon, season_length):
+    """
+    Cache key of one fold: the model, its settings and the training data.
+    Folds of an older history keep their key when new months arrive.
+    """
+    digest = hashlib.sha1()
+    digest.update(repr((model, list(months), horizon, season_length, ARIMA_ORDER)).encode())
+    digest.update(np.ascontiguousarray(Y_train, dtype=np.float64).tobytes())
+    return f"{model}-{digest.hexdigest()}"
+
+def _run_fold(task):
+    """
+    Process pool worker: forecasts one fold of one model for every product.
+    Forecasts are floored at 0 and saved under the fold's cache key.
+    """
+    model, Y_train, months, horizon, season_length, path = task
+    forecast = np.maximum(MODELS[model](Y_train, months, horizon, season_length), 0)
+    if path is not None:
+        tmp = path + ".tmp.npy"
+        np.save(tmp, forecast)
+        os.replace(tmp, path)
+    return forecast
+
+# --- Backtest ---
+def backtest_forecasts(pivot, models=tuple(MODELS), horizon=FORECAST_STEPS, min_train=DEFAULT_MIN_TRAIN,
+                       step=1, season_length=SEASON_LENGTH, cache_dir=BACKTEST_CACHE, max_workers=None):
+    """
+    Rolling-origin evaluation of every model over `pivot` (product_id x
+    "YYYY-MM", like monthly_demand_pivot). Each fold trains on the months
+    before its origin and forecasts the next `horizon` months for every
+    product at once. Folds run as separate tasks on a process pool and
+    their forecasts are cached in `cache_dir`, so a rerun only computes
+    folds whose training data changed. Returns one row per product, model,
+    origin and horizon step with the actual and forecast demand.
+    """
+    Y = pivot.to_numpy(dtype=np.float64)
+    months = [str(m) for m in pivot.columns]
+    origins = fold_origins(Y.shape[1], horizon, min_train, step)
+    if not origins:
+        raise ValueError(
+            f"{Y.shape[1]} months of history leave no fold with {min_train} training and {horizon} test months."
+        )
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+
+    started = time.perf_counter()
+    forecasts, tasks = {}, []
+    for model in models:
+        if model not in MODELS:
+            raise ValueError(f"Unknown model '{model}'; expected one of {', '.join(MODELS)}.")
+        for origin in origins:
+            key = fold_key(model, Y[:, :origin], months[:origin], horizon, season_length)
+            path = os.path.join(cache_dir, key + ".npy") if cache_dir else None
+            if path is not None and os.path.exists(path):
+                forecasts[model, origin] = np.load(path)
+            else:
+                tasks.append((model, origin, (model, Y[:, :origin], months[:origin], horizon, season_length, path)))
+    if tasks:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = pool.map(_run_fold, [task for _, _, task in tasks])
+            for (model, origin, _), forecast in zip(tasks, results):
+                forecasts[model, origin] = forecast
+    print(
+        f"Backtested {len(models)} models x {len(origins)} folds x {len(pivot)} products in "
+        f"{time.perf_counter() - started:.2f}s ({len(tasks)} folds computed, "
+        f"{len(models) * len(origins) - len(tasks)} from cache)."
+    )
+
+    product_ids = pivot.index.to_numpy()
+    steps = np.arange(1, horizon + 1)
+    frames = []
+    for (model, origin), forecast in forecasts.items():
+        frames.append(pd.DataFrame({
+            "product_id": np.repeat(product_ids, horizon),
+            "model": model,
+            "origin": months[origin],
+            "step": np.tile(steps, len(product_ids)),
+            "actual": Y[:, origin:origin + horizon].ravel(),
+            "forecast": forecast.ravel(),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+# --- Error Tables ---
+def error_tables(backtest):
+    """
+    Returns (mape_df, bias_df), product_id x model, in percent: MAPE over
+    the months with non-zero demand, and bias as total forecast minus total
+    actual relative to the total actual (positive means over-forecasting).
+    Failed forecasts (NaN) are left out.
+    """
+    df = backtest.dropna(subset=["forecast"])
+    nonzero = df[df["actual"] != 0]
+    ape = (nonzero["forecast"] - nonzero["actual"]).abs() / nonzero["actual"]
+    mape_df = 100 * ape.groupby([nonzero["product_id"], nonzero["model"]]).mean().unstack("model")
+    totals = df.groupby(["product_id", "model"])[["forecast", "actual"]].sum()
+    bias = 100 * (totals["forecast"] - totals["actual"]) / totals["actual"].replace(0, np.nan)
+    bias_df = bias.unstack("model")
+    return mape_df.round(2), bias_df.round(2)
+
+def choose_models(mape_df, default="seasonal_naive"):
+    """
+    Picks the model with the lowest MAPE for every product; products
+    without a MAPE (no demand in any test month) get `default`.
+    """
+    choice = mape_df.fillna(np.inf).idxmin(axis=1).where(mape_df.notna().any(axis=1), default)
+    choice.name = "model"
+    return choice
+
+def model_summary(mape_df, bias_df, choice):
+    """
+    Per model: mean MAPE and bias over products, and how many products it
+    was chosen for.
+    """
+    summary = pd.DataFrame({
+        "mean_mape": mape_df.mean(),
+        "median_mape": mape_df.median(),
+        "mean_bias": bias_df.mean(),
+        "chosen_for": choice.value_counts(),
+    }).fillna({"chosen_for": 0})
+    summary["chosen_for"] = summary["chosen_for"].astype(int)
+    return summary.sort_values("mean_mape").round(2)
+
+# --- Forecast With the Chosen Models ---
+def forecast_best(pivot, choice, steps=FORECAST_STEPS, season_length=SEASON_LENGTH):
+    """
+    Forecasts every product with its chosen model (`choice`, from
+    choose_models) on the full history, and returns forecast_df in the
+    notebook's layout.
+    """
+    Y = pivot.to_numpy(dtype=np.float64)
+    months = [str(m) for m in pivot.columns]
+    models = choice.reindex(pivot.index).fillna("seasonal_naive").to_numpy()
+    forecast = np.full((len(pivot), steps), np.nan)
+    for model in np.unique(models):
+        rows = models == model
+        forecast[rows] = MODELS[model](Y[rows], months, steps, season_length)
+    forecast_df = pd.DataFrame(np.maximum(forecast, 0), index=pivot.index.astype(int), columns=forecast_columns(steps))
+    forecast_df.index.name = "Product_ID"
+    return forecast_df
+
+if __name__ == "__main__":
+    from db_config import get_db_connection
+    from db_monthly_rollup import load_monthly_pivot
+
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of the demand forecasting models.")
+    parser.add_argument("--start", help="First month of history (YYYY-MM).")
+    parser.add_argument("--end", help="Last month of history (YYYY-MM).")
+    parser.add_argument("--models", nargs="+", choices=MODELS, default=list(MODELS))
+    parser.add_argument("--horizon", type=int, default=FORECAST_STEPS)
+    parser.add_argument("--min-train", type=int, default=DEFAULT_MIN_TRAIN)
+    parser.add_argument("--step", type=int, default=1, help="Months between fold origins.")
+    parser.add_argument("--workers", type=int, help="Processes running folds (default: one per core).")
+    parser.add_argument("--cache-dir", default=BACKTEST_CACHE)
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    try:
+        pivot = load_monthly_pivot(conn, "demand", args.start, args.end)
+    finally:
+        conn.close()
+    backtest = backtest_forecasts(
+        pivot, args.models, args.horizon, args.min_train, args.step,
+        cache_dir=args.cache_dir, max_workers=args.workers,
+    )
+    mape_df, bias_df = error_tables(backtest)
+    choice = choose_models(mape_df)
+    print(model_summary(mape_df, bias_df, choice).to_string())
+    print(pd.concat([mape_df.add_suffix("_mape"), choice], axis=1).to_string())
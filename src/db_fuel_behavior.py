@@ -1,6 +1,3 @@
-from datetime import datetime
-from db_config import get_db_connection
-
 # --- Log to Transactions Table ---
 def log_transaction(conn, cost, current_date):
     with conn.cursor() as cur:
@@ -41,33 +38,89 @@ def detect_fuel_overspending(conn, transaction_id, actual_cost, expected_cost, e
                 current_date,
                 employee_id
             ))
-        conn.commit()
+
+# --- Maintain Per-Truck Fuel Level ---
+def ensure_fuel_level_column(conn):
+    """
+    Adds truck.fuel_level on databases built before it was added to
+    db_structure.sql; backfill_fuel_levels fills it in.
+    """
+    with conn.cursor() as cur:
+        cur.execute("ALTER TABLE truck ADD COLUMN IF NOT EXISTS fuel_level FLOAT;")
+
+def record_fuel_level(conn, truck_id, liters, state=None):
+    """
+    Adds a fuel_log entry's liters to the truck's running fuel_level.
+    The level wraps at fuel_capacity, matching SUM(liters) % capacity over the log.
+    """
+    if state is not None and truck_id in state.trucks:
+        state.add_fuel(truck_id, liters)
+        return
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE truck
+            SET fuel_level = (COALESCE(fuel_level, 0) + %s)
+                - fuel_capacity * FLOOR((COALESCE(fuel_level, 0) + %s) / fuel_capacity)
+            WHERE truck_id = %s;
+        """, (liters, liters, truck_id))
+
+# --- Rebuild Fuel Levels From fuel_log ---
+def backfill_fuel_levels(conn, only_missing=False):
+    """
+    Recomputes truck.fuel_level from the full fuel_log history.
+    With only_missing=True, only trucks whose fuel_level is NULL are rebuilt.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE truck t
+            SET fuel_level = f.filled - t.fuel_capacity * FLOOR(f.filled / t.fuel_capacity)
+            FROM (
+                SELECT tr.truck_id, COALESCE(SUM(fl.liters), 0) AS filled
+                FROM truck tr
+                LEFT JOIN fuel_log fl ON fl.truck_id = tr.truck_id
+                GROUP BY tr.truck_id
+            ) f
+            WHERE f.truck_id = t.truck_id
+              AND (%s = FALSE OR t.fuel_level IS NULL);
+        """, (only_missing,))
+        return cur.rowcount
 
 # --- Add Fuel Log Entry ---
-def add_fuel_log(truck_id, employee_id, cost, liters, cost_per_liter, expected_cost, current_date):
-    conn = get_db_connection()
-    with conn:
+def add_fuel_log(conn, truck_id, employee_id, cost, liters, cost_per_liter, expected_cost, current_date, state=None):
+    # Runs on the caller's connection and transaction.
+    transaction_id = log_transaction(conn, cost, current_date)
 
-        transaction_id = log_transaction(conn, cost, current_date)
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO fuel_log (
+                transaction_id, truck_id, employee_id, cost, liters, cost_per_liter, expected_cost, date_time
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s);
+        """, (
+            transaction_id,
+            truck_id,
+            employee_id,
+            cost,
+            liters,
+            cost_per_liter,
+            expected_cost,
+            current_date
+        ))
 
-        with conn.cursor() as cur:
-            cur.execute("""
-                INSERT INTO fuel_log (
-                    transaction_id, truck_id, employee_id, cost, liters, cost_per_liter, expected_cost, date_time
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s);
-            """, (
-                transaction_id,
-                truck_id,
-                employee_id,
-                cost,
-                liters,
-                cost_per_liter,
-                expected_cost,
-                current_date
-            ))
+    record_fuel_level(conn, truck_id, liters, state)
+    detect_fuel_overspending(conn, transaction_id, cost, expected_cost, employee_id, current_date)
 
-        detect_fuel_overspending(conn, transaction_id, cost, expected_cost, employee_id, current_date)
-        conn.commit()
+if __name__ == "__main__":
+    import argparse
+    from db_config import day_session
 
-# if __name__ == "__main__":
-#     add_fuel_log()
+    parser = argparse.ArgumentParser(description="Fuel log maintenance.")
+    parser.add_argument("--backfill", action="store_true",
+                        help="Rebuild truck.fuel_level from the full fuel_log history.")
+    args = parser.parse_args()
+    if args.backfill:
+        with day_session() as conn:
+            ensure_fuel_level_column(conn)
+            updated = backfill_fuel_levels(conn)
+        print(f"Rebuilt fuel level for {updated} trucks.")
+    else:
+        parser.print_help()
@@ -0,0 +1,292 @@
+from datetime import timedelta
+import json, random
+from psycopg2.extras import execute_values
+from db_order_behavior import allocate_dispatch_wave
+from db_dispatch import dispatch_orders, route_deliveries, dispatch_report, save_dispatch_report
+from db_simulation_state import SimulationState
+from db_sim_metrics import timed_stage
+from db_monthly_rollup import demand_deltas, record_flow
+from db_order_anomaly_log import EXPECTED_DELIVERY_DURATION, UNDERPERFORMANCE_THRESHOLD
+
+LATE_DELIVERY_THRESHOLD = timedelta(minutes=30)
+
+# --- Load the Day's Orders ---
+def load_pending_orders(conn):
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT id, store_id, products, date_time
+            FROM pending_orders
+            ORDER BY date_time ASC, id ASC;
+        """)
+        return cur.fetchall()
+
+# --- Plan the Dispatch Wave (pure Python) ---
+def plan_orders(orders, state):
+    """
+    Decides, for every pending order, what can ship today from stock.
+    Uses only the in-memory state; no statements are issued.
+
+    Returns (planned, resupply, orders_without_stock) where `planned` is a
+    list of dicts with order_id, store_id, products and the items to ship,
+    and `resupply` is a list of (product_id, quantity) shortfalls in order.
+    """
+    planned = []
+    resupply = []
+    orders_without_stock = 0
+    reserved = {}  # product_id -> pellets promised to earlier orders in this wave.
+    for order_id, store_id, products_json, order_time in orders:
+        try:
+            prepared_items = []  # List of items to be delivered.
+            products = json.loads(products_json) if isinstance(products_json, str) else products_json
+            for item in products:
+                stock = state.product_status(item['product_id'])[0]
+                available = max(stock - reserved.get(item['product_id'], 0), 0)
+                deliver_now = min(item['quantity'], available)
+                if deliver_now > 0:
+                    prepared_items.append({
+                        'product_id': item['product_id'],
+                        'quantity': deliver_now,
+                        'weight': item['weight'] * deliver_now,
+                        'refrigerated': item.get('refrigerated', False)
+                    })
+                if deliver_now < item['quantity']:
+                    resupply.append((item['product_id'], item['quantity'] - deliver_now))
+            if not prepared_items:
+                orders_without_stock += 1
+                continue
+            planned.append({
+                'order_id': order_id,
+                'store_id': store_id,
+                'products': products,
+                'items': prepared_items,
+            })
+            for item in products:
+                reserved[item['product_id']] = reserved.get(item['product_id'], 0) + item['quantity']
+        except Exception as order_error:
+            print(f"Error processing order for store {store_id} at {order_time}: {order_error}")
+            continue
+    return planned, resupply, orders_without_stock
+
+# --- Reserve Serial Ids ---
+def reserve_ids(conn, table, column, count):
+    """
+    Draws `count` ids from the serial sequence of table.column so parent and
+    child rows can be bulk inserted with known keys.
+    """
+    if count <= 0:
+        return []
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT nextval(pg_get_serial_sequence(%s, %s))
+            FROM generate_series(1, %s);
+        """, (table, column, count))
+        return [r[0] for r in cur.fetchall()]
+
+# --- Resupply Requests ---
+def request_resupply_batch(conn, requests, current_date, state):
+    """
+    Inserts the supplier orders for every shortfall of the day in one
+    statement, split into batches of at most the free warehouse space the
+    same way request_resupply does. Each shortfall takes its quantity off
+    the free space seen by the next one, and ordering stops once it is used
+    up, as successive request_resupply calls would.
+    """
+    current, _, to_be_received, capacity = state.inventory_status()
+    available_space = capacity - (current + to_be_received)
+    rows = []
+    for product_id, quantity in requests:
+        if available_space <= 0:
+            break
+        state.record_request(product_id, quantity)
+        requested = quantity
+        while quantity > 0:
+            batch = min(quantity, available_space)
+            rows.append((product_id, current_date, product_id, batch, current_date))
+            quantity -= batch
+        available_space -= requested
+    if not rows:
+        return
+    with conn.cursor() as cur:
+        execute_values(cur, """
+            INSERT INTO supplier_delivery (
+                supplier_id, expected_delivery_time, order_sent, status,
+                cost, product_id, quantity_received, date_time
+            ) VALUES %s;
+        """, rows, template="""(
+            (SELECT supplier_id FROM supplier WHERE product_id = %s LIMIT 1),
+            INTERVAL '2 days', %s, 'pending', 0, %s, %s, %s
+        )""", page_size=len(rows))
+
+# --- Build the Delivery Rows ---
+def build_delivery_rows(stops, pellet_maps, state):
+    """
+    Computes every row the wave writes: one inventory_delivery, delivery and
+    fuel transaction, truck_log and fuel_log entry per route stop, plus the
+    underperformance_log rows with the rule of log_delivery_anomalies: a stop
+    more than 30 minutes late whose trip also ran more than 30 minutes over
+    the expected three hours. Ids are filled in later by emit_deliveries.
+    """
+    gas_price = state.gas_price
+    deliveries = []
+    for stop, pellet_map in zip(stops, pellet_maps):
+        store_id, items = stop['store_id'], stop['items']
+        delay_minutes = random.randint(0, 60)
+        delivery_delay = timedelta(minutes=delay_minutes)
+        actual_return_time = stop['estimated_return'] + delivery_delay
+        actual_duration = actual_return_time - stop['trip_start']
+        total_cost = sum(state.pallet_cost(item['product_id']) * item['quantity'] for item in items)
+        km_driven_delivery = stop['km_driven']
+        extra_km = round(random.uniform(0, 5), 2) if delay_minutes > 0 else 0
+        liters_used = km_driven_delivery / 3.0
+        deliveries.append({
+            **stop,
+            'pellet_map': pellet_map,
+            'time_returned': actual_return_time,
+            'expected_time': state.store_expected_time(store_id, timedelta(hours=2)),
+            'delivery_delay': delivery_delay,
+            'total_cost': total_cost,
+            'distance_km': state.store_distance(store_id),
+            'km_driven_delivery': km_driven_delivery,
+            'extra_km': extra_km,
+            'liters_used': liters_used,
+            'fuel_cost': round(liters_used * gas_price, 2),
+            'gas_price': gas_price,
+            'expected_duration': EXPECTED_DELIVERY_DURATION,
+            'actual_duration': actual_duration,
+            # Only log anomalies if delay exceeds 30 minutes.
+            'late': (delivery_delay > LATE_DELIVERY_THRESHOLD
+                     and actual_duration - EXPECTED_DELIVERY_DURATION > UNDERPERFORMANCE_THRESHOLD),
+        })
+    return deliveries
+
+# --- Emit the Wave ---
+def emit_deliveries(conn, deliveries, current_date):
+    """
+    Writes all rows of the wave with one multi-row INSERT per table and
+    removes the dispatched orders from pending_orders.
+    """
+    n = len(deliveries)
+    delivery_ids = reserve_ids(conn, 'inventory_delivery', 'transaction_id', n)
+    transaction_ids = reserve_ids(conn, 'transactions', 'transaction_id', 2 * n)
+
+    delivery_rows, transaction_rows, truck_log_rows, fuel_log_rows, late_rows = [], [], [], [], []
+    for i, (d, delivery_id) in enumerate(zip(deliveries, delivery_ids)):
+        items = d['items']
+        delivery_txn, fuel_txn = transaction_ids[2 * i], transaction_ids[2 * i + 1]
+        delivery_rows.append((
+            delivery_id, d['store_id'], json.dumps(d['pellet_map']),
+            json.dumps([item['quantity'] for item in items]), d['total_cost'],
+            d['truck_id'], d['driver_id'], d['time_sent'], d['time_returned'],
+            'completed', current_date, sum(item['quantity'] for item in items)
+        ))
+        transaction_rows.append((delivery_txn, 'delivery', d['total_cost'], current_date, current_date))
+        transaction_rows.append((fuel_txn, 'fuel', d['fuel_cost'], current_date, current_date))
+        truck_log_rows.append((
+            delivery_id, d['driver_id'], d['time_sent'], d['time_returned'], d['expected_time'],
+            'on_time', d['distance_km'], d['km_driven_delivery'], d['extra_km'],
+            d['delivery_delay'], current_date
+        ))
+        fuel_log_rows.append((
+            fuel_txn, d['truck_id'], d['driver_id'], d['fuel_cost'], d['liters_used'],
+            d['gas_price'], d['fuel_cost'], current_date
+        ))
+        if d['late']:
+            late_rows.append((
+                delivery_id, 'truck', d['driver_id'], 'delivery_delay',
+                d['expected_duration'], d['actual_duration'],
+                d['actual_duration'] - d['expected_duration'],
+                "Delivery took longer than expected", 'system', current_date
+            ))
+
+    with conn.cursor() as cur:
+        execute_values(cur, """
+            INSERT INTO inventory_delivery (
+                transaction_id, store_sent, products_delivered, quantities_delivered, cost,
+                truck_sent, driver_sent, time_sent, time_returned, status, date_time, quantity
+            ) VALUES %s;
+        """, delivery_rows, page_size=n)
+        execute_values(cur, """
+            INSERT INTO transactions (transaction_id, type, cost, date, date_time) VALUES %s;
+        """, transaction_rows, page_size=2 * n)
+        execute_values(cur, """
+            INSERT INTO truck_log (
+                delivery_id, driver_id, time_sent, time_returned, expected_time,
+                status, distance_km, km_driven_delivery, extra_km, delivery_delay, date_time
+            ) VALUES %s;
+        """, truck_log_rows, page_size=n)
+        execute_values(cur, """
+            INSERT INTO fuel_log (
+                transaction_id, truck_id, employee_id, cost, liters,
+                cost_per_liter, expected_cost, date_time
+            ) VALUES %s;
+        """, fuel_log_rows, page_size=n)
+        if late_rows:
+            execute_values(cur, """
+                INSERT INTO underperformance_log (
+                    delivery_id, entity_type, entity_id, event_type,
+                    expected_duration, actual_duration, deviation,
+                    reason, flagged_by, date_time
+                ) VALUES %s;
+            """, late_rows, page_size=len(late_rows))
+        cur.execute("""
+            DELETE FROM pending_orders
+            WHERE id = ANY(%s);
+        """, (sorted({d['order_id'] for d in deliveries}),))
+
+# --- Fulfill Orders ---
+@timed_stage
+def fulfill_orders(conn, current_date, state=None):
+    """
+    Fulfills the day's pending orders as one batch:
+      1. Load the orders (trucks, stock and reference data come from `state`).
+      2. Decide what ships from stock and which resupply requests to place.
+      3. Insert all resupply requests in one statement.
+      4. Consolidate the orders into multi-stop truck routes (db_dispatch).
+      5. Allocate pellets for every route stop in one FEFO statement.
+      6. Insert all delivery, transaction, truck_log and fuel_log rows in
+         one statement per table and delete the dispatched orders.
+      7. Record the day's dispatch report.
+
+    Without a SimulationState one is loaded for the call and flushed at the
+    end. Nothing is committed; the caller owns the transaction. Returns the
+    dispatch report.
+    """
+    owns_state = state is None
+    if owns_state:
+        state = SimulationState.load(conn)
+
+    orders = load_pending_orders(conn)
+    planned, resupply, orders_without_stock = plan_orders(orders, state)
+    request_resupply_batch(conn, resupply, current_date, state)
+
+    routes, unfulfilled = dispatch_orders(planned, current_date, state)
+    stops = route_deliveries(routes)
+    if stops:
+        pellet_maps = allocate_dispatch_wave(conn, [stop['items'] for stop in stops], state)
+        deliveries = build_delivery_rows(stops, pellet_maps, state)
+        emit_deliveries(conn, deliveries, current_date)
+        record_flow(conn, demand_deltas(current_date, [d['pellet_map'] for d in deliveries]), state)
+
+        for d in deliveries:
+            state.add_fuel(d['truck_id'], d['liters_used'])
+            state.set_truck_status(d['truck_id'], 'available')
+            state.dispatched_trucks.add(d['truck_id'])
+        dispatched = {d['order_id'] for d in deliveries}
+        for order in planned:
+            if order['order_id'] not in dispatched:
+                continue
+            # Inventory: subtract requested quantities and add them to to_be_sent.
+            for item in order['products']:
+                state.record_shipment(item['product_id'], item['quantity'])
+
+    report = dispatch_report(routes, unfulfilled, orders_without_stock, state)
+    save_dispatch_report(conn, current_date, report)
+    print(
+        f"Dispatched {report['orders_dispatched']} orders on {report['routes']} routes with "
+        f"{report['trucks_used']} trucks ({report['km_driven']} km); "
+        f"{report['unfulfilled_orders']} orders left pending on {current_date}."
+    )
+
+    if owns_state:
+        state.flush(conn)
+    return report
@@ -1,19 +1,26 @@
 import pandas as pd
 import random
 import string
-from faker import Faker
 from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes, hmac, padding
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 import base64
-import hashlib
-from datetime import datetime
+import struct
 import numpy as np
 import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from db_config import ADMIN_PASSPHRASE
+from db_encryption_util import derive_key_from_passphrase
 
-# Initialize Faker and constants
-fake = Faker()
-Faker.seed(0)
-random.seed(0)
-np.random.seed(0)
+# Output directory
+DATA_DIR = "generated_data"
+
+EMPLOYEE_COLUMNS = [
+    "employee_id", "name", "phone_num", "job_role",
+    "salary", "account_num", "hours_week"
+]
 
 # Job roles, counts, salaries (mean), and std deviation
 roles = [
@@ -26,45 +33,203 @@ roles = [
     ("maintenance", 3, 7000)
 ]
 
-# Key derivation function (from passphrase)
-def derive_key_from_passphrase(passphrase: str) -> bytes:
-    return base64.urlsafe_b64encode(
-        hashlib.sha256(passphrase.encode()).digest()
-    )
-
 # Encryption setup
-passphrase = "sample_admin_key"
-key = derive_key_from_passphrase(passphrase)
-fernet = Fernet(key)
-
-# Generate employee data
-employees = []
-employee_id = 1
-
-for role, count, salary_mean in roles:
-    for _ in range(count):
-        name = fake.unique.name()
-        phone = f"+1-{fake.msisdn()[0:3]}-{fake.msisdn()[3:6]}-{fake.msisdn()[6:10]}"
-        salary = round(np.random.normal(loc=salary_mean, scale=1000), 2)
-        acc_num = ''.join(random.choices(string.digits, k=12))
-        encrypted_acc = fernet.encrypt(acc_num.encode()).decode()
-        hours_week = max(0, int(np.random.normal(40, 6)))  # no negative hours
-        employees.append([
-            employee_id, name, phone, role, salary,
-            encrypted_acc, hours_week
-        ])
-        employee_id += 1
-
-# Create DataFrame and export
-df = pd.DataFrame(employees, columns=[
-    "employee_id", "name", "phone_num", "job_role",
-    "salary", "account_num", "hours_week"
+passphrase = ADMIN_PASSPHRASE
+
+# Name pools for the high-volume generator: first x middle initial x last
+# gives 260,000 distinct names without Faker.
+FIRST_NAMES = np.array([
+    "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda",
+    "William", "Elizabeth", "David", "Barbara", "Richard", "Susan", "Joseph", "Jessica",
+    "Thomas", "Sarah", "Charles", "Karen", "Christopher", "Lisa", "Daniel", "Nancy",
+    "Matthew", "Betty", "Anthony", "Margaret", "Mark", "Sandra", "Donald", "Ashley",
+    "Steven", "Kimberly", "Paul", "Emily", "Andrew", "Donna", "Joshua", "Michelle",
+    "Kenneth", "Carol", "Kevin", "Amanda", "Brian", "Dorothy", "George", "Melissa",
+    "Timothy", "Deborah", "Ronald", "Stephanie", "Edward", "Rebecca", "Jason", "Sharon",
+    "Jeffrey", "Laura", "Ryan", "Cynthia", "Jacob", "Kathleen", "Gary", "Amy",
+    "Nicholas", "Angela", "Eric", "Shirley", "Jonathan", "Anna", "Stephen", "Brenda",
+    "Larry", "Pamela", "Justin", "Emma", "Scott", "Nicole", "Brandon", "Helen",
+    "Benjamin", "Samantha", "Samuel", "Katherine", "Gregory", "Christine", "Alexander", "Debra",
+    "Frank", "Rachel", "Patrick", "Carolyn", "Raymond", "Janet", "Jack", "Catherine",
+    "Dennis", "Maria", "Jerry", "Heather",
+])
+LAST_NAMES = np.array([
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis",
+    "Rodriguez", "Martinez", "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas",
+    "Taylor", "Moore", "Jackson", "Martin", "Lee", "Perez", "Thompson", "White",
+    "Harris", "Sanchez", "Clark", "Ramirez", "Lewis", "Robinson", "Walker", "Young",
+    "Allen", "King", "Wright", "Scott", "Torres", "Nguyen", "Hill", "Flores",
+    "Green", "Adams", "Nelson", "Baker", "Hall", "Rivera", "Campbell", "Mitchell",
+    "Carter", "Roberts", "Gomez", "Phillips", "Evans", "Turner", "Diaz", "Parker",
+    "Cruz", "Edwards", "Collins", "Reyes", "Stewart", "Morris", "Morales", "Murphy",
+    "Cook", "Rogers", "Gutierrez", "Ortiz", "Morgan", "Cooper", "Peterson", "Bailey",
+    "Reed", "Kelly", "Howard", "Ramos", "Kim", "Cox", "Ward", "Richardson",
+    "Watson", "Brooks", "Chavez", "Wood", "James", "Bennett", "Gray", "Mendoza",
+    "Ruiz", "Hughes", "Price", "Alvarez", "Castillo", "Sanders", "Patel", "Myers",
+    "Long", "Ross", "Foster", "Jimenez",
 ])
+MIDDLE_INITIALS = np.array(list(string.ascii_uppercase))
+
+# Token timestamp used by the fast generator when a seed is given, so the
+# ciphertexts are reproducible too.
+SEEDED_ISSUED_AT = datetime(2025, 1, 1, tzinfo=timezone.utc)
+ENCRYPT_CHUNK_SIZE = 10_000
+
+# --- Generate Employees ---
+def generate_employees(drivers=None, seed=0, passphrase=passphrase):
+    """
+    Returns the employee table as a DataFrame. `drivers` overrides the number
+    of drivers; the other roles keep their default head count. Account
+    numbers are Fernet-encrypted with the key derived from `passphrase`.
+    """
+    from faker import Faker
+    fake = Faker()
+    fake.seed_instance(seed)
+    rng = random.Random(seed)
+    np_rng = np.random.RandomState(seed)
+    fernet = Fernet(derive_key_from_passphrase(passphrase))
+
+    employees = []
+    employee_id = 1
+    for role, count, salary_mean in roles:
+        if role == "driver" and drivers is not None:
+            count = drivers
+        for _ in range(count):
+            name = fake.unique.name()
+            phone = f"+1-{fake.msisdn()[0:3]}-{fake.msisdn()[3:6]}-{fake.msisdn()[6:10]}"
+            salary = round(np_rng.normal(loc=salary_mean, scale=1000), 2)
+            acc_num = ''.join(rng.choices(string.digits, k=12))
+            encrypted_acc = fernet.encrypt(acc_num.encode()).decode()
+            hours_week = max(0, int(np_rng.normal(40, 6)))  # no negative hours
+            employees.append([
+                employee_id, name, phone, role, salary,
+                encrypted_acc, hours_week
+            ])
+            employee_id += 1
+
+    return pd.DataFrame(employees, columns=EMPLOYEE_COLUMNS)
+
+# --- High-Volume Generator ---
+def role_counts(num_employees, drivers=None):
+    """
+    Splits `num_employees` over the roles in their default proportions
+    (largest remainder), with `drivers` overriding the driver count.
+    """
+    default = np.array([count for _, count, _ in roles], dtype=float)
+    share = default / default.sum() * num_employees
+    counts = np.floor(share).astype(int)
+    counts[np.argsort(counts - share)[:num_employees - counts.sum()]] += 1
+    if drivers is not None:
+        counts[[role for role, _, _ in roles].index("driver")] = drivers
+    return counts
+
+def sample_names(n, rng):
+    """
+    Draws `n` names from the precomputed pools, distinct as long as `n` fits
+    in the 260,000 combinations.
+    """
+    per_last = len(FIRST_NAMES) * len(MIDDLE_INITIALS)
+    total = per_last * len(LAST_NAMES)
+    idx = rng.choice(total, size=n, replace=n > total)
+    first = FIRST_NAMES[idx % len(FIRST_NAMES)]
+    middle = MIDDLE_INITIALS[idx // len(FIRST_NAMES) % len(MIDDLE_INITIALS)]
+    last = LAST_NAMES[idx // per_last]
+    return pd.Series(first) + " " + middle + ". " + last
+
+def sample_phones(n, rng):
+    """
+    Draws `n` phone numbers in the +1-XXX-XXX-XXXX format of the Faker path.
+    """
+    area = pd.Series(rng.integers(200, 1000, size=n)).astype(str)
+    exchange = pd.Series(rng.integers(200, 1000, size=n)).astype(str)
+    line = pd.Series(rng.integers(0, 10_000, size=n)).astype(str).str.zfill(4)
+    return "+1-" + area + "-" + exchange + "-" + line
+
+def _fernet_token(signing_key, encryption_key, data, current_time, iv):
+    # A Fernet token built from the spec's parts, so the IV can come from the
+    # seeded generator: version, timestamp, IV, AES-128-CBC ciphertext of the
+    # PKCS7-padded data, then an HMAC-SHA256 of all of it.
+    padder = padding.PKCS7(algorithms.AES.block_size).padder()
+    padded = padder.update(data) + padder.finalize()
+    encryptor = Cipher(algorithms.AES(encryption_key), modes.CBC(iv)).encryptor()
+    ciphertext = encryptor.update(padded) + encryptor.finalize()
+    basic_parts = b"\x80" + struct.pack(">Q", current_time) + iv + ciphertext
+    h = hmac.HMAC(signing_key, hashes.SHA256())
+    h.update(basic_parts)
+    return base64.urlsafe_b64encode(basic_parts + h.finalize())
+
+def _encrypt_chunk(key, current_time, plaintexts, ivs):
+    raw_key = base64.urlsafe_b64decode(key)
+    signing_key, encryption_key = raw_key[:16], raw_key[16:]
+    return [
+        _fernet_token(signing_key, encryption_key, text.encode(), current_time, ivs[i * 16:(i + 1) * 16]).decode()
+        for i, text in enumerate(plaintexts)
+    ]
+
+def encrypt_account_numbers(account_nums, key, current_time, ivs, max_workers=None,
+                            chunk_size=ENCRYPT_CHUNK_SIZE):
+    """
+    Fernet-encrypts `account_nums` with the given token time and the 16-byte
+    IVs packed in `ivs`, spreading chunks over a process pool. Tokens decrypt
+    with the regular Fernet(key).decrypt.
+    """
+    chunks = [
+        (account_nums[start:start + chunk_size], ivs[start * 16:(start + chunk_size) * 16])
+        for start in range(0, len(account_nums), chunk_size)
+    ]
+    if len(chunks) <= 1 or max_workers == 1:
+        return [token for texts, chunk_ivs in chunks for token in _encrypt_chunk(key, current_time, texts, chunk_ivs)]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_encrypt_chunk, key, current_time, texts, chunk_ivs) for texts, chunk_ivs in chunks]
+        return [token for future in futures for token in future.result()]
+
+def generate_employees_fast(num_employees=100_000, drivers=None, seed=0, passphrase=passphrase,
+                            issued_at=None, max_workers=None):
+    """
+    High-volume variant of generate_employees for load tests: names and
+    phones are sampled from precomputed arrays instead of Faker, and account
+    numbers are encrypted in parallel across a process pool. Same columns as
+    generate_employees, so insert_employees loads it unchanged.
+
+    The output depends only on `seed`: IVs come from the seeded generator and
+    tokens carry `issued_at` (SEEDED_ISSUED_AT when seeded, now otherwise).
+    """
+    rng = np.random.default_rng(seed)
+    counts = role_counts(num_employees, drivers)
+    n = int(counts.sum())
+    if issued_at is None:
+        issued_at = SEEDED_ISSUED_AT if seed is not None else datetime.now()
+
+    job_role = np.repeat([role for role, _, _ in roles], counts)
+    salary_mean = np.repeat([mean for _, _, mean in roles], counts)
+    account_nums = pd.Series(rng.integers(0, 10**12, size=n)).astype(str).str.zfill(12).tolist()
+    df = pd.DataFrame({
+        "employee_id": np.arange(1, n + 1),
+        "name": sample_names(n, rng),
+        "phone_num": sample_phones(n, rng),
+        "job_role": job_role,
+        "salary": np.round(rng.normal(salary_mean, 1000), 2),
+        "account_num": encrypt_account_numbers(
+            account_nums, derive_key_from_passphrase(passphrase), int(issued_at.timestamp()),
+            rng.bytes(16 * n), max_workers
+        ),
+        # no negative hours
+        "hours_week": np.maximum(0, rng.normal(40, 6, size=n)).astype(int),
+    })
+    return df[EMPLOYEE_COLUMNS]
 
-# Ensure output folder exists
-output_dir = "generated_data"
-os.makedirs(output_dir, exist_ok=True)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the employee table.")
+    parser.add_argument("--count", type=int, help="Total employees; uses the fast generator.")
+    parser.add_argument("--drivers", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, help="Processes used to encrypt account numbers.")
+    args = parser.parse_args()
 
-# Save to local folder
-csv_path = os.path.join(output_dir, "employees.csv")
-df.to_csv(csv_path, index=False)
+    if args.count is None:
+        df = generate_employees(args.drivers, args.seed)
+    else:
+        df = generate_employees_fast(args.count, args.drivers, args.seed, max_workers=args.workers)
+    # Ensure output folder exists
+    os.makedirs(DATA_DIR, exist_ok=True)
+    df.to_csv(os.path.join(DATA_DIR, "employees.csv"), index=False)
@@ -1,31 +1,30 @@
 import pandas as pd
 import os
 
-# Ensure output folder exists
-output_dir = "generated_data"
-os.makedirs(output_dir, exist_ok=True)
+# Output directory
+DATA_DIR = "generated_data"
 
-# Load product_pellets.csv
-product_df = pd.read_csv(os.path.join(output_dir, 'product_pellets.csv'))
+# --- Generate Inventory ---
+def generate_inventory(product_df, pellet_scale=1.0, capacity_pellets=25000):
+    """
+    Returns the single inventory row. current_pellets is the total product
+    quantity; both it and the capacity grow with the pellet scale factor,
+    and the capacity never starts below the stock.
+    """
+    scale = max(pellet_scale, 1.0)
+    current_pellets = int(round(product_df['quantity'].sum() * pellet_scale))
+    return pd.DataFrame([{
+        'inventory_id': 1,
+        'capacity_pellets': max(int(round(capacity_pellets * scale)), current_pellets),
+        # Compute current_pellets from total quantity
+        'current_pellets': current_pellets,
+        # to_be_sent and to_be_received are 0 initially
+        'to_be_sent': 0,
+        'to_be_received': 0
+    }])
 
-# Compute current_pellets from total quantity
-current_pellets = product_df['quantity'].sum()
-
-# Set capacity at 25000
-capacity_pellets = 25000
-
-# to_be_sent and to_be_received are 0 initially
-to_be_sent = 0
-to_be_received = 0
-
-# Create DataFrame
-inventory_df = pd.DataFrame([{
-    'inventory_id': 1,
-    'capacity_pellets': capacity_pellets,
-    'current_pellets': current_pellets,
-    'to_be_sent': to_be_sent,
-    'to_be_received': to_be_received
-}])
-
-# Save to CSV
-inventory_df.to_csv(os.path.join(output_dir, 'inventory.csv'), index=False)
+if __name__ == "__main__":
+    # Load product_pellets.csv
+    product_df = pd.read_csv(os.path.join(DATA_DIR, 'product_pellets.csv'))
+    inventory_df = generate_inventory(product_df)
+    inventory_df.to_csv(os.path.join(DATA_DIR, 'inventory.csv'), index=False)
@@ -6,42 +6,48 @@ import os
 
 # Define folder
 DATA_DIR = "generated_data"
-os.makedirs(DATA_DIR, exist_ok=True)
-
-# Load existing product and store data
-products_df = pd.read_csv(os.path.join(DATA_DIR, 'product_pellets.csv'))
-stores_df = pd.read_csv(os.path.join(DATA_DIR, 'stores.csv'))
 
 # Function to generate a fake product entry for a pending order
-def make_product_entry(product):
-    quantity = random.randint(1, 10)
-    weight_per_unit = round(random.uniform(20.0, 50.0), 2)  # simulate per-unit weight in kg
-    refrigerated = random.choice([True, False])
+def make_product_entry(product_id, rng=random):
+    quantity = rng.randint(1, 10)
+    weight_per_unit = round(rng.uniform(20.0, 50.0), 2)  # simulate per-unit weight in kg
+    refrigerated = rng.choice([True, False])
     return {
-        "product_id": int(product["product_id"]),
+        "product_id": int(product_id),
         "quantity": quantity,
         "weight": weight_per_unit,
         "refrigerated": refrigerated
     }
 
-# Generate 10 pending orders
-pending_orders = []
-for _ in range(10):
-    store = stores_df.sample(1).iloc[0]
-    store_id = store['store_id']
-    
-    num_products = random.randint(1, 3)
-    selected_products = products_df.sample(num_products)
+# --- Generate Pending Orders ---
+def generate_pending_orders(products_df, stores_df, num_orders=10, seed=None, as_of=None):
+    """
+    Returns `num_orders` pending orders from random stores, each for one to
+    three random products, placed within the two days before `as_of`.
+    """
+    rng = random.Random(seed)
+    as_of = as_of or datetime.now()
+    store_ids = stores_df['store_id'].tolist()
+    product_ids = products_df['product_id'].tolist()
 
-    products = [make_product_entry(prod) for _, prod in selected_products.iterrows()]
-    
-    order = {
-        "store_id": int(store_id),
-        "products": json.dumps(products),
-        "date_time": (datetime.now() - timedelta(days=random.randint(0, 2))).strftime("%Y-%m-%d %H:%M:%S")
-    }
-    pending_orders.append(order)
+    pending_orders = []
+    for _ in range(num_orders):
+        store_id = rng.choice(store_ids)
+        num_products = rng.randint(1, 3)
+        selected_products = rng.sample(product_ids, min(num_products, len(product_ids)))
+        products = [make_product_entry(product_id, rng) for product_id in selected_products]
+        pending_orders.append({
+            "store_id": store_id,
+            "products": json.dumps(products),
+            "date_time": (as_of - timedelta(days=rng.randint(0, 2))).strftime("%Y-%m-%d %H:%M:%S")
+        })
+
+    return pd.DataFrame(pending_orders)
 
-# Create and save DataFrame
-pending_orders_df = pd.DataFrame(pending_orders)
-pending_orders_df.to_csv(os.path.join(DATA_DIR, "pending_orders.csv"), index=False)
+if __name__ == "__main__":
+    os.makedirs(DATA_DIR, exist_ok=True)
+    # Load existing product and store data
+    products_df = pd.read_csv(os.path.join(DATA_DIR, 'product_pellets.csv'))
+    stores_df = pd.read_csv(os.path.join(DATA_DIR, 'stores.csv'))
+    pending_orders_df = generate_pending_orders(products_df, stores_df)
+    pending_orders_df.to_csv(os.path.join(DATA_DIR, "pending_orders.csv"), index=False)
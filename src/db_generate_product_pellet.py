@@ -1,65 +1,145 @@
-import pandas as pd
-import random
-from datetime import datetime, timedelta
+import argparse
 import os
+from datetime import date
+import numpy as np
+import pandas as pd
 
 # Set data directory
 DATA_DIR = "generated_data"
-os.makedirs(DATA_DIR, exist_ok=True)
 
-# Load product summary data
-product_df = pd.read_csv(os.path.join(DATA_DIR, "product_pellets.csv"))
+REFRIGERATED_CATEGORIES = ["dairy", "meat", "frozen", "produce"]
+PELLET_COLUMNS = ["name", "category", "cost", "weight", "received", "sell_by", "refrigerated", "sent"]
 
-# Helper functions
-def random_received_date():
-    days_ago = random.randint(1, 60)
-    return datetime.now() - timedelta(days=days_ago)
+# --- Pellet Counts ---
+def pellet_counts(quantities, rng):
+    """
+    Number of pellet rows per product. Each pellet takes 1-3 units of the
+    product's quantity until it is used up, drawn for all products at once.
+    """
+    quantities = np.asarray(quantities, dtype=np.int64)
+    if quantities.sum() == 0:
+        return np.zeros(len(quantities), dtype=np.int64)
+    draws = rng.integers(1, 4, size=int(quantities.sum()))
+    running = np.cumsum(draws)
+    starts = np.concatenate(([0], np.cumsum(quantities)[:-1]))
+    # Units consumed before each product's segment of draws.
+    offsets = np.where(starts > 0, running[np.maximum(starts - 1, 0)], 0)
+    # Draws are at least 1, so each product is used up within its own segment.
+    last = np.searchsorted(running, offsets + quantities)
+    return np.where(quantities > 0, last - starts + 1, 0)
 
-def random_sell_by_date(received):
-    return received + timedelta(days=random.randint(10, 45))
+# --- Product Batches ---
+def product_batches(product_df, chunk_size):
+    """
+    Groups products so that each batch yields roughly `chunk_size` pellets
+    (a pellet takes two units on average).
+    """
+    expected = (product_df["quantity"].to_numpy() / 2.0).cumsum()
+    batch_ids = (expected // max(chunk_size, 1)).astype(int)
+    for _, batch in product_df.groupby(batch_ids, sort=True):
+        yield batch
 
-def generate_pellets_from_product(product_row):
-    product_name = product_row["name"]
-    category = product_row["category"]
-    total_quantity = product_row["quantity"]
-    cost = product_row["pallet_cost"]
+# --- Generate Pellets ---
+def iter_pellet_chunks(product_df, scale=1.0, seed=None, as_of=None, chunk_size=500_000):
+    """
+    Yields product_pellet DataFrames of about `chunk_size` rows, indexed by
+    pellet_id. Received dates, sell-by offsets, weights and refrigeration
+    flags are drawn as NumPy arrays for a whole batch of products at a time.
 
-    remaining_quantity = total_quantity
-    entries = []
+    `scale` multiplies every product's quantity; `seed` makes the output
+    reproducible; `as_of` is the date received dates count back from.
+    """
+    rng = np.random.default_rng(seed)
+    as_of = np.datetime64(as_of or date.today(), "D")
+    products = product_df.copy()
+    products["quantity"] = np.round(products["quantity"].to_numpy() * scale).astype(np.int64)
+    # Split very large products so no single product exceeds one chunk.
+    limit = max(2 * chunk_size, 1)
+    pieces = np.maximum(1, -(-products["quantity"].to_numpy() // limit))
+    products = products.loc[products.index.repeat(pieces)]
+    piece_no = products.groupby(level=0).cumcount().to_numpy()
+    products["quantity"] = np.clip(products["quantity"].to_numpy() - piece_no * limit, 0, limit)
+    products = products.reset_index(drop=True)
 
-    while remaining_quantity > 0:
-        quantity = min(remaining_quantity, random.randint(1, 3))
-        weight = round(random.uniform(200.0, 400.0), 2)
-        received_date = random_received_date()
-        sell_by = random_sell_by_date(received_date)
-        refrigerated = category.lower() in ["dairy", "meat", "frozen", "produce"]
-        sent = False
+    next_id = 1
+    for batch in product_batches(products, chunk_size):
+        counts = pellet_counts(batch["quantity"].to_numpy(), rng)
+        n = int(counts.sum())
+        if n == 0:
+            continue
+        received = as_of - rng.integers(1, 61, size=n).astype("timedelta64[D]")
+        sell_by = received + rng.integers(10, 46, size=n).astype("timedelta64[D]")
+        categories = np.repeat(batch["category"].to_numpy(), counts)
+        chunk = pd.DataFrame({
+            "name": np.repeat(batch["name"].to_numpy(), counts),
+            "category": categories,
+            "cost": np.repeat(batch["pallet_cost"].to_numpy(), counts),
+            "weight": np.round(rng.uniform(200.0, 400.0, size=n), 2),
+            "received": received,
+            "sell_by": sell_by,
+            "refrigerated": np.isin(np.char.lower(categories.astype(str)), REFRIGERATED_CATEGORIES),
+            "sent": np.zeros(n, dtype=bool),
+        }, index=pd.RangeIndex(next_id, next_id + n, name="pellet_id"))
+        # Keep dates as plain YYYY-MM-DD like the original CSVs.
+        chunk["received"] = chunk["received"].dt.date
+        chunk["sell_by"] = chunk["sell_by"].dt.date
+        next_id += n
+        yield chunk
 
-        entries.append({
-            "name": product_name,
-            "category": category,
-            "cost": cost,
-            "weight": weight,
-            "received": received_date.date(),
-            "sell_by": sell_by.date(),
-            "refrigerated": refrigerated,
-            "sent": sent
-        })
+def generate_product_pellet(product_df, scale=1.0, seed=None, as_of=None):
+    """
+    Returns the whole product_pellet dataset as one DataFrame.
+    """
+    chunks = list(iter_pellet_chunks(product_df, scale, seed, as_of))
+    if not chunks:
+        return pd.DataFrame(columns=PELLET_COLUMNS).rename_axis("pellet_id")
+    return pd.concat(chunks)
 
-        remaining_quantity -= quantity
+# --- Write Pellets ---
+def write_product_pellet(product_df, path, fmt="csv", scale=1.0, seed=None, as_of=None, chunk_size=500_000):
+    """
+    Streams the pellets to `path` chunk by chunk, as CSV or Parquet, so memory
+    stays bounded by `chunk_size`. Returns the number of rows written.
+    """
+    written = 0
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
 
-    return entries
+        writer = None
+        try:
+            for chunk in iter_pellet_chunks(product_df, scale, seed, as_of, chunk_size):
+                table = pa.Table.from_pandas(chunk, preserve_index=True)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+                written += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        return written
 
-# Generate all entries
-all_pellets = []
-for _, row in product_df.iterrows():
-    pellets = generate_pellets_from_product(row)
-    all_pellets.extend(pellets)
+    if fmt != "csv":
+        raise ValueError(f"Unknown output format '{fmt}', expected 'csv' or 'parquet'.")
+    for chunk in iter_pellet_chunks(product_df, scale, seed, as_of, chunk_size):
+        chunk.to_csv(path, mode="w" if written == 0 else "a", header=written == 0)
+        written += len(chunk)
+    return written
 
-# Create DataFrame
-pellets_df = pd.DataFrame(all_pellets)
-pellets_df.index += 1
-pellets_df.index.name = "pellet_id"
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate product_pellet seed data.")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplier on every product's quantity.")
+    parser.add_argument("--seed", type=int, help="Seed for the random generator.")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--chunk-size", type=int, default=500_000, help="Pellets generated per chunk.")
+    args = parser.parse_args()
 
-# Save to CSV
-pellets_df.to_csv(os.path.join(DATA_DIR, "product_pellet.csv"))
+    os.makedirs(DATA_DIR, exist_ok=True)
+    # Load product summary data
+    product_df = pd.read_csv(os.path.join(DATA_DIR, "product_pellets.csv"))
+    extension = "parquet" if args.format == "parquet" else "csv"
+    output_path = os.path.join(DATA_DIR, f"product_pellet.{extension}")
+    rows = write_product_pellet(
+        product_df, output_path, args.format, args.scale, args.seed, chunk_size=args.chunk_size
+    )
+    print(f"Wrote {rows} pellets to {output_path}.")
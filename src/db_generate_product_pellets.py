@@ -2,13 +2,8 @@ import random
 import pandas as pd
 import os
 
-# Ensure the output directory exists
+# Output directory
 DATA_DIR = "generated_data"
-os.makedirs(DATA_DIR, exist_ok=True)
-
-product_data = []
-total_quantity = 0
-max_total = 25000
 
 all_products = [
     ("Whole Milk", "Dairy"),
@@ -67,28 +62,47 @@ all_products = [
     ("Disinfectant Wipes", "Household")
 ]
 
-for product_name, category in all_products:
-    if len(product_data) >= 50:
-        break
-    max_remaining = max_total - total_quantity
-    if max_remaining <= 0:
-        break
+# --- Generate Product Summary ---
+def generate_product_pellets(num_products=50, seed=None, max_total=None):
+    """
+    Returns the product_pellets summary as a DataFrame. Beyond the catalogue
+    above, product names repeat with a numbered suffix. The total quantity is
+    capped at `max_total` (25000 per 50 products by default).
+    """
+    rng = random.Random(seed)
+    if max_total is None:
+        max_total = max(25000, 25000 * num_products // 50)
+
+    product_data = []
+    total_quantity = 0
+    for i in range(num_products):
+        product_name, category = all_products[i % len(all_products)]
+        if i >= len(all_products):
+            product_name = f"{product_name} #{i // len(all_products) + 1}"
+        max_remaining = max_total - total_quantity
+        if max_remaining <= 0:
+            break
+
+        quantity_min = 100
+        quantity_max = min(1000, max_remaining)
+        if quantity_min > quantity_max:
+            quantity = quantity_max
+        else:
+            quantity = rng.randint(quantity_min, quantity_max)
 
-    quantity_min = 100
-    quantity_max = min(1000, max_remaining)
-    if quantity_min > quantity_max:
-        quantity = quantity_max
-    else:
-        quantity = random.randint(quantity_min, quantity_max)
+        product_data.append({
+            "product_id": len(product_data) + 1,
+            "name": product_name,
+            "category": category,
+            "quantity": quantity,
+            "pallet_cost": round(rng.uniform(40, 200), 2)
+        })
+        total_quantity += quantity
 
-    product_data.append({
-        "product_id": len(product_data) + 1,
-        "name": product_name,
-        "category": category,
-        "quantity": quantity,
-        "pallet_cost": round(random.uniform(40, 200), 2)
-    })
-    total_quantity += quantity
+    return pd.DataFrame(product_data)
 
-df_products = pd.DataFrame(product_data)
-df_products.to_csv(os.path.join(DATA_DIR, "product_pellets.csv"), index=False)
+if __name__ == "__main__":
+    # Ensure the output directory exists
+    os.makedirs(DATA_DIR, exist_ok=True)
+    df_products = generate_product_pellets()
+    df_products.to_csv(os.path.join(DATA_DIR, "product_pellets.csv"), index=False)
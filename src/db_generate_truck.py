@@ -1,35 +1,49 @@
 import pandas as pd
 import random
+import os
 from datetime import datetime, timedelta
 
-# Load employee data and filter drivers
-employee_df = pd.read_csv("generated_data/employees.csv")
-driver_ids = employee_df[employee_df["job_role"] == "driver"]["employee_id"].tolist()
-
-# Shuffle and pick 10 drivers (or however many you want)
-random.shuffle(driver_ids)
-driver_ids = driver_ids[:10]
+# Output directory
+DATA_DIR = "generated_data"
 
 # Helper to generate random plate number
-def generate_plate_number():
-    letters = ''.join(random.choices('ABCDEFGHIJKLMNOPQRSTUVWXYZ', k=3))
-    numbers = ''.join(random.choices('0123456789', k=4))
+def generate_plate_number(rng=random):
+    letters = ''.join(rng.choices('ABCDEFGHIJKLMNOPQRSTUVWXYZ', k=3))
+    numbers = ''.join(rng.choices('0123456789', k=4))
     return f"{letters}-{numbers}"
 
-# Generate truck records
-truck_data = []
-for i in range(len(driver_ids)):
-    truck = {
-        "employee_id": driver_ids[i],
-        "plate_number": generate_plate_number(),
-        "refrigerated": i < 5,
-        "capacity": round(random.uniform(5000, 10000), 2),
-        "km_driven": round(random.uniform(0, 50000), 2),
-        "operational_status": "available",
-        "fuel_capacity": round(random.uniform(200, 400), 2),
-        "last_maintanance": (datetime.now() - timedelta(days=random.randint(0, 365))).date()
-    }
-    truck_data.append(truck)
+# --- Generate Trucks ---
+def generate_trucks(employee_df, num_trucks=10, seed=None, as_of=None):
+    """
+    Returns one truck per driver, for up to `num_trucks` randomly picked
+    drivers of `employee_df`. The first half of the fleet is refrigerated.
+    """
+    rng = random.Random(seed)
+    as_of = as_of or datetime.now().date()
+    driver_ids = employee_df[employee_df["job_role"] == "driver"]["employee_id"].tolist()
+
+    # Shuffle and pick the drivers
+    rng.shuffle(driver_ids)
+    driver_ids = driver_ids[:num_trucks]
+
+    truck_data = []
+    for i in range(len(driver_ids)):
+        truck = {
+            "employee_id": driver_ids[i],
+            "plate_number": generate_plate_number(rng),
+            "refrigerated": i < len(driver_ids) // 2,
+            "capacity": round(rng.uniform(5000, 10000), 2),
+            "km_driven": round(rng.uniform(0, 50000), 2),
+            "operational_status": "available",
+            "fuel_capacity": round(rng.uniform(200, 400), 2),
+            "last_maintanance": as_of - timedelta(days=rng.randint(0, 365))
+        }
+        truck_data.append(truck)
+
+    return pd.DataFrame(truck_data)
 
-truck_df = pd.DataFrame(truck_data)
-truck_df.to_csv("generated_data/trucks.csv", index=False)
+if __name__ == "__main__":
+    # Load employee data and filter drivers
+    employee_df = pd.read_csv(os.path.join(DATA_DIR, "employees.csv"))
+    truck_df = generate_trucks(employee_df)
+    truck_df.to_csv(os.path.join(DATA_DIR, "trucks.csv"), index=False)
@@ -1,113 +1,27 @@
 import psycopg2
 import pandas as pd
+from db_bulk_loader import bulk_load_dataframe
 
-def insert_employees(conn, employee_df):
-    with conn.cursor() as cur:
-        for _, row in employee_df.iterrows():
-            cur.execute("""
-                INSERT INTO employee (
-                    employee_id, name, phone_num, job_role, salary,
-                    account_num, hours_week
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """, (
-                row['employee_id'], row['name'], row['phone_num'],
-                row['job_role'], row['salary'], row['account_num'],
-                row['hours_week']
-            ))
-    conn.commit()
+# Each loader streams its DataFrame through COPY FROM STDIN (see db_bulk_loader).
+# Pass method="values" to use execute_values batches instead.
 
-def insert_stores(conn, store_df):
-    with conn.cursor() as cur:
-        for _, row in store_df.iterrows():
-            cur.execute("""
-                INSERT INTO store (
-                    store_id, name, address, distance_km,
-                    expected_time, open_time, close_time
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """, (
-                row['store_id'], row['name'], row['address'], row['distance_km'],
-                row['expected_time'], row['open_time'], row['close_time']
-            ))
-    conn.commit()
+def insert_employees(conn, employee_df, method="copy"):
+    return bulk_load_dataframe(conn, "employee", employee_df, method=method)
 
-def insert_product_pellets(conn, product_df):
-    with conn.cursor() as cur:
-        for _, row in product_df.iterrows():
-            cur.execute("""
-                INSERT INTO product_pellets (
-                    product_id, name, category, quantity, pallet_cost
-                ) VALUES (%s, %s, %s, %s, %s)
-            """, (
-                row['product_id'], row['name'], row['category'],
-                row['quantity'], row['pallet_cost']
-            ))
-    conn.commit()
+def insert_stores(conn, store_df, method="copy"):
+    return bulk_load_dataframe(conn, "store", store_df, method=method)
 
-def insert_product_pellet(conn, pellet_df):
-    with conn.cursor() as cur:
-        for _, row in pellet_df.iterrows():
-            cur.execute("""
-                INSERT INTO product_pellet (
-                    pellet_id, name, category, cost, weight,
-                    received, sell_by, refrigerated, sent
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
-                row['pellet_id'], row['name'], row['category'], row['cost'],
-                row['weight'], row['received'], row['sell_by'],
-                row['refrigerated'], row['sent']
-            ))
-    conn.commit()
+def insert_product_pellets(conn, product_df, method="copy"):
+    return bulk_load_dataframe(conn, "product_pellets", product_df, method=method)
 
-def insert_trucks(conn, truck_df):
-    with conn.cursor() as cur:
-        for _, row in truck_df.iterrows():
-            cur.execute("""
-                INSERT INTO truck (
-                    employee_id, plate_number, refrigerated,
-                    capacity, km_driven, operational_status,
-                    fuel_capacity, last_maintanance
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
-                row['employee_id'], row['plate_number'],
-                row['refrigerated'], row['capacity'], row['km_driven'],
-                row['operational_status'], row['fuel_capacity'],
-                row['last_maintanance']
-            ))
-    conn.commit()
-
-def insert_suppliers(conn, supplier_df):
-    with conn.cursor() as cur:
-        for _, row in supplier_df.iterrows():
-            cur.execute("""
-                INSERT INTO supplier (
-                    supplier_id, expected_delivery_time,
-                    product_id, product_category
-                ) VALUES (%s, %s, %s, %s)
-            """, (
-                row['supplier_id'], row['expected_delivery_time'],
-                row['product_id'], row['product_category']
-            ))
-    conn.commit()
-
-
-def insert_inventory(conn, inventory_df):
-    with conn.cursor() as cur:
-        for _, row in inventory_df.iterrows():
-            # Convert numpy.int64 to native Python int
-            capacity_pellets = int(row['capacity_pellets'])
-            current_pellets = int(row['current_pellets'])
-            to_be_sent = int(row['to_be_sent'])
-            to_be_received = int(row['to_be_received'])
-
-            # Insert values into the table
-            cur.execute("""
-                INSERT INTO inventory (
-                    capacity_pellets, current_pellets,
-                    to_be_sent, to_be_received
-                ) VALUES (%s, %s, %s, %s)
-            """, (capacity_pellets, current_pellets, to_be_sent, to_be_received))
-
-    conn.commit()
+def insert_product_pellet(conn, pellet_df, method="copy"):
+    return bulk_load_dataframe(conn, "product_pellet", pellet_df, method=method)
 
+def insert_trucks(conn, truck_df, method="copy"):
+    return bulk_load_dataframe(conn, "truck", truck_df, method=method)
 
+def insert_suppliers(conn, supplier_df, method="copy"):
+    return bulk_load_dataframe(conn, "supplier", supplier_df, method=method)
 
+def insert_inventory(conn, inventory_df, method="copy"):
+    return bulk_load_dataframe(conn, "inventory", inventory_df, method=method)
@@ -0,0 +1,208 @@
+import argparse
+from psycopg2.extras import execute_values
+from db_config import get_db_connection
+
+COUNTERS = ("current_pellets", "to_be_sent", "to_be_received")
+
+# --- Schema ---
+def ensure_product_inventory(conn):
+    """
+    Creates the per-product ledger on databases built before it was added
+    to db_structure.sql, and opens a row for every product that has none:
+    current_pellets starts from its unsent pellets in product_pellet, the
+    unit every order, restock and expiry delta is counted in, and
+    to_be_received from the pending supplier orders.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS product_inventory (
+                product_id INT PRIMARY KEY REFERENCES product_pellets(product_id),
+                current_pellets INT NOT NULL DEFAULT 0,
+                to_be_sent INT NOT NULL DEFAULT 0,
+                to_be_received INT NOT NULL DEFAULT 0
+            );
+        """)
+        cur.execute("""
+            INSERT INTO product_inventory (product_id, current_pellets, to_be_sent, to_be_received)
+            SELECT p.product_id, COALESCE(pp.unsent, 0), 0, COALESCE(sd.pending, 0)
+            FROM product_pellets p
+            LEFT JOIN (
+                SELECT name, COUNT(*) AS unsent
+                FROM product_pellet
+                WHERE sent = FALSE
+                GROUP BY name
+            ) pp ON pp.name = p.name
+            LEFT JOIN (
+                SELECT product_id, SUM(quantity_received) AS pending
+                FROM supplier_delivery
+                WHERE status = 'pending'
+                GROUP BY product_id
+            ) sd ON sd.product_id = p.product_id
+            ON CONFLICT (product_id) DO NOTHING;
+        """)
+        opened = cur.rowcount
+    if opened:
+        sync_inventory_totals(conn)
+    return opened
+
+# --- Reads ---
+def get_inventory_status(conn, product_id, state=None):
+    """
+    Returns (current_pellets, to_be_sent, to_be_received, capacity_pellets)
+    for one product; the capacity is the shared warehouse capacity.
+    """
+    if state is not None:
+        return state.product_status(product_id)
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT pi.current_pellets, pi.to_be_sent, pi.to_be_received, i.capacity_pellets
+            FROM inventory i
+            LEFT JOIN product_inventory pi ON pi.product_id = %s
+            WHERE i.inventory_id = 1;
+        """, (product_id,))
+        current, to_be_sent, to_be_received, capacity = cur.fetchone()
+        return current or 0, to_be_sent or 0, to_be_received or 0, capacity
+
+def get_warehouse_status(conn, state=None):
+    """
+    Returns the warehouse totals over every product as
+    (current_pellets, to_be_sent, to_be_received, capacity_pellets).
+    """
+    if state is not None:
+        return state.inventory_status()
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT COALESCE(SUM(pi.current_pellets), 0), COALESCE(SUM(pi.to_be_sent), 0),
+                   COALESCE(SUM(pi.to_be_received), 0),
+                   (SELECT capacity_pellets FROM inventory WHERE inventory_id = 1)
+            FROM product_inventory pi;
+        """)
+        return cur.fetchone()
+
+def product_ids_by_name(conn, state=None):
+    if state is not None:
+        return {p["name"]: pid for pid, p in state.products.items()}
+    with conn.cursor() as cur:
+        cur.execute("SELECT name, product_id FROM product_pellets;")
+        return dict(cur.fetchall())
+
+# --- Writes ---
+def apply_inventory_deltas(conn, deltas):
+    """
+    Adds {product_id: (current, to_be_sent, to_be_received)} deltas to the
+    ledger in one UPDATE (counters never go below zero). The warehouse
+    totals on the inventory row are rolled up separately, once per day, by
+    sync_inventory_totals; get_warehouse_status reads them from the ledger.
+    """
+    rows = [(pid, *d) for pid, d in sorted(deltas.items()) if any(d)]
+    if not rows:
+        return
+    with conn.cursor() as cur:
+        execute_values(cur, """
+            UPDATE product_inventory pi
+            SET current_pellets = GREATEST(pi.current_pellets + d.current_pellets, 0),
+                to_be_sent = GREATEST(pi.to_be_sent + d.to_be_sent, 0),
+                to_be_received = GREATEST(pi.to_be_received + d.to_be_received, 0)
+            FROM (VALUES %s) AS d(product_id, current_pellets, to_be_sent, to_be_received)
+            WHERE pi.product_id = d.product_id;
+        """, rows, page_size=len(rows))
+
+def sync_inventory_totals(conn):
+    """
+    Rolls the per-product ledger up into the warehouse inventory row.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE inventory i
+            SET current_pellets = t.current_pellets,
+                to_be_sent = t.to_be_sent,
+                to_be_received = t.to_be_received
+            FROM (
+                SELECT COALESCE(SUM(current_pellets), 0) AS current_pellets,
+                       COALESCE(SUM(to_be_sent), 0) AS to_be_sent,
+                       COALESCE(SUM(to_be_received), 0) AS to_be_received
+                FROM product_inventory
+            ) t
+            WHERE i.inventory_id = 1;
+        """)
+
+# --- Reconciliation ---
+def reconcile_inventory(conn, fix=False):
+    """
+    Compares every product's ledger with what the tables hold:
+    current_pellets against its unsent pellets in product_pellet and
+    to_be_received against its pending supplier orders. Returns the
+    products that drift; with fix=True their counters are reset to the
+    observed values (one UPDATE) and the totals refreshed. Does not commit.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            WITH observed AS (
+                SELECT p.product_id,
+                       COALESCE(pp.unsent, 0) AS current_pellets,
+                       COALESCE(sd.pending, 0) AS to_be_received
+                FROM product_pellets p
+                LEFT JOIN (
+                    SELECT name, COUNT(*) AS unsent
+                    FROM product_pellet
+                    WHERE sent = FALSE
+                    GROUP BY name
+                ) pp ON pp.name = p.name
+                LEFT JOIN (
+                    SELECT product_id, SUM(quantity_received) AS pending
+                    FROM supplier_delivery
+                    WHERE status = 'pending'
+                    GROUP BY product_id
+                ) sd ON sd.product_id = p.product_id
+            )
+            SELECT o.product_id,
+                   pi.current_pellets, o.current_pellets,
+                   pi.to_be_received, o.to_be_received
+            FROM observed o
+            LEFT JOIN product_inventory pi ON pi.product_id = o.product_id
+            WHERE pi.product_id IS NULL
+               OR pi.current_pellets <> o.current_pellets
+               OR pi.to_be_received <> o.to_be_received
+            ORDER BY o.product_id;
+        """)
+        drift = [
+            {
+                "product_id": pid,
+                "current_pellets": current,
+                "observed_pellets": observed_current,
+                "to_be_received": incoming,
+                "observed_pending": observed_incoming,
+            }
+            for pid, current, observed_current, incoming, observed_incoming in cur.fetchall()
+        ]
+        if fix and drift:
+            execute_values(cur, """
+                INSERT INTO product_inventory (product_id, current_pellets, to_be_received)
+                VALUES %s
+                ON CONFLICT (product_id) DO UPDATE
+                SET current_pellets = EXCLUDED.current_pellets,
+                    to_be_received = EXCLUDED.to_be_received;
+            """, [
+                (d["product_id"], d["observed_pellets"], d["observed_pending"]) for d in drift
+            ], page_size=len(drift))
+            sync_inventory_totals(conn)
+    return drift
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the per-product inventory ledger against the warehouse.")
+    parser.add_argument("--fix", action="store_true", help="Reset drifting counters to the observed values.")
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    try:
+        ensure_product_inventory(conn)
+        drift = reconcile_inventory(conn, fix=args.fix)
+        for d in drift:
+            print(
+                f"Product {d['product_id']}: current {d['current_pellets']} vs {d['observed_pellets']} unsent pellets, "
+                f"to_be_received {d['to_be_received']} vs {d['observed_pending']} pending."
+            )
+        print(f"{len(drift)} product(s) out of balance" + (" (fixed)." if args.fix and drift else "."))
+        conn.commit()
+    finally:
+        conn.close()
@@ -0,0 +1,213 @@
+import argparse
+from collections import defaultdict
+import pandas as pd
+from psycopg2.extras import execute_values
+from db_config import get_db_connection
+from db_partitioning import month_start
+
+# Pivotable measures; the stock balance is what came in minus what went out.
+MEASURES = {
+    "demand": "demand",
+    "restocked": "restocked",
+    "balance": "restocked - demand",
+}
+
+# Demand and restock per product and month, computed from scratch: pellets
+# listed in inventory_delivery.products_delivered by month of the delivery,
+# and received supplier_delivery quantities by month of the order.
+_FLOW_FROM_SOURCES = """
+    SELECT product_id, month, SUM(demand) AS demand, SUM(restocked) AS restocked
+    FROM (
+        SELECT p.key::int AS product_id,
+               date_trunc('month', d.date_time)::date AS month,
+               CASE WHEN jsonb_typeof(p.value) = 'array' THEN jsonb_array_length(p.value) ELSE 0 END AS demand,
+               0 AS restocked
+        FROM inventory_delivery d,
+             jsonb_each(d.products_delivered::jsonb) AS p
+        WHERE d.date_time IS NOT NULL AND d.products_delivered IS NOT NULL
+        UNION ALL
+        SELECT product_id, date_trunc('month', date_time)::date, 0, COALESCE(quantity_received, 0)
+        FROM supplier_delivery
+        WHERE status = 'received' AND product_id IS NOT NULL AND date_time IS NOT NULL
+    ) flow
+    GROUP BY product_id, month
+"""
+
+# --- Schema ---
+def ensure_monthly_rollup(conn):
+    """
+    Creates product_monthly_flow on databases built before it was added to
+    db_structure.sql and fills it from the delivery tables, so the daily
+    deltas start from a complete rollup.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('product_monthly_flow');")
+        if cur.fetchone()[0] is not None:
+            return
+        cur.execute("""
+            CREATE TABLE product_monthly_flow (
+                product_id INT,
+                month DATE,
+                demand INT NOT NULL DEFAULT 0,
+                restocked INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (product_id, month)
+            );
+        """)
+    rebuild_monthly_rollup(conn)
+
+# --- Daily Deltas ---
+def demand_deltas(day, pellet_maps):
+    """
+    Returns {(product_id, month): (demand, 0)} for deliveries sent on `day`,
+    given their products_delivered dicts (str(product_id) -> pellet ids).
+    """
+    deltas = defaultdict(int)
+    month = month_start(day)
+    for pellet_map in pellet_maps:
+        for product_id, pellet_ids in pellet_map.items():
+            deltas[int(product_id), month] += len(pellet_ids)
+    return {key: (demand, 0) for key, demand in deltas.items() if demand}
+
+def restock_deltas(received):
+    """
+    Returns {(product_id, month): (0, restocked)} for received supplier
+    orders given as (product_id, quantity, order date_time); the month is
+    the order's, as in the notebook's pivot_restock.
+    """
+    deltas = defaultdict(int)
+    for product_id, quantity, ordered in received:
+        deltas[product_id, month_start(ordered)] += quantity
+    return {key: (0, restocked) for key, restocked in deltas.items() if restocked}
+
+def record_flow(conn, deltas, state=None):
+    """
+    Adds deltas to the rollup: kept in `state` until its end-of-day flush,
+    written straight away otherwise.
+    """
+    if state is not None:
+        state.record_flow(deltas)
+    else:
+        apply_flow_deltas(conn, deltas)
+
+def apply_flow_deltas(conn, deltas):
+    """
+    Upserts {(product_id, month): (demand, restocked)} deltas into
+    product_monthly_flow in one statement.
+    """
+    rows = [(pid, month, *d) for (pid, month), d in sorted(deltas.items()) if any(d)]
+    if not rows:
+        return
+    with conn.cursor() as cur:
+        execute_values(cur, """
+            INSERT INTO product_monthly_flow (product_id, month, demand, restocked) VALUES %s
+            ON CONFLICT (product_id, month) DO UPDATE
+            SET demand = product_monthly_flow.demand + EXCLUDED.demand,
+                restocked = product_monthly_flow.restocked + EXCLUDED.restocked;
+        """, rows, page_size=len(rows))
+
+# --- Rebuild and Check ---
+def rebuild_monthly_rollup(conn):
+    """
+    Recomputes the whole rollup from inventory_delivery and
+    supplier_delivery. Does not commit. Returns the number of rows.
+    """
+    with conn.cursor() as cur:
+        cur.execute("TRUNCATE product_monthly_flow;")
+        cur.execute(f"""
+            INSERT INTO product_monthly_flow (product_id, month, demand, restocked)
+            {_FLOW_FROM_SOURCES};
+        """)
+        return cur.rowcount
+
+def reconcile_monthly_rollup(conn, fix=False):
+    """
+    Compares the rollup with a from-scratch computation and returns the
+    (product_id, month) cells that differ; with fix=True the rollup is
+    rebuilt. Does not commit.
+    """
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            WITH observed AS ({_FLOW_FROM_SOURCES})
+            SELECT COALESCE(o.product_id, f.product_id), COALESCE(o.month, f.month),
+                   f.demand, o.demand, f.restocked, o.restocked
+            FROM observed o
+            FULL JOIN product_monthly_flow f
+              ON f.product_id = o.product_id AND f.month = o.month
+            WHERE COALESCE(f.demand, 0) <> COALESCE(o.demand, 0)
+               OR COALESCE(f.restocked, 0) <> COALESCE(o.restocked, 0)
+            ORDER BY 1, 2;
+        """)
+        drift = [
+            {
+                "product_id": pid,
+                "month": month,
+                "demand": demand or 0,
+                "observed_demand": observed_demand or 0,
+                "restocked": restocked or 0,
+                "observed_restocked": observed_restocked or 0,
+            }
+            for pid, month, demand, observed_demand, restocked, observed_restocked in cur.fetchall()
+        ]
+    if fix and drift:
+        rebuild_monthly_rollup(conn)
+    return drift
+
+# --- Pivots ---
+def load_monthly_pivot(conn, measure="demand", start_month=None, end_month=None):
+    """
+    Returns `measure` (demand, restocked or balance) as a product_id x
+    "YYYY-MM" DataFrame read from the rollup, with every month between
+    start_month and end_month ("YYYY-MM", defaulting to the rolled-up range)
+    present and missing cells set to 0.
+    """
+    if measure not in MEASURES:
+        raise ValueError(f"Unknown measure '{measure}'; expected one of {', '.join(MEASURES)}.")
+    start = pd.Period(start_month, "M").start_time.date() if start_month else None
+    end = pd.Period(end_month, "M").start_time.date() if end_month else None
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT product_id, month, {MEASURES[measure]} FROM product_monthly_flow
+            WHERE (%(start)s::date IS NULL OR month >= %(start)s)
+              AND (%(end)s::date IS NULL OR month <= %(end)s)
+            ORDER BY product_id, month;
+        """, {"start": start, "end": end})
+        df = pd.DataFrame(cur.fetchall(), columns=["product_id", "month", measure])
+    if df.empty and not (start and end):
+        return pd.DataFrame()
+    df["month"] = pd.to_datetime(df["month"]).dt.to_period("M").astype(str)
+    pivot = df.pivot(index="product_id", columns="month", values=measure)
+    months = pd.period_range(
+        start=start_month or min(pivot.columns), end=end_month or max(pivot.columns), freq="M"
+    ).astype(str)
+    pivot = pivot.reindex(columns=months, fill_value=0).fillna(0).astype(int).sort_index()
+    pivot.index.name = "product_id"
+    pivot.columns.name = "month"
+    return pivot
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the per-product monthly demand/restock rollup.")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute the rollup from the delivery tables.")
+    parser.add_argument("--check", action="store_true", help="Report cells that differ from the delivery tables.")
+    parser.add_argument("--pivot", choices=MEASURES, help="Print this measure as a product x month pivot.")
+    parser.add_argument("--start", help="First month of the pivot (YYYY-MM).")
+    parser.add_argument("--end", help="Last month of the pivot (YYYY-MM).")
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    try:
+        ensure_monthly_rollup(conn)
+        if args.rebuild:
+            print(f"Rebuilt {rebuild_monthly_rollup(conn)} product-month rows.")
+        if args.check:
+            drift = reconcile_monthly_rollup(conn)
+            for d in drift:
+                print(
+                    f"Product {d['product_id']} {d['month']:%Y-%m}: demand {d['demand']} vs {d['observed_demand']}, "
+                    f"restocked {d['restocked']} vs {d['observed_restocked']}."
+                )
+            print(f"{len(drift)} product-month cell(s) out of balance.")
+        conn.commit()
+        if args.pivot:
+            print(load_monthly_pivot(conn, args.pivot, args.start, args.end).to_string())
+    finally:
+        conn.close()
@@ -1,4 +1,10 @@
 from datetime import datetime, timedelta
+from db_config import savepoint
+
+# A delivery is expected back within three hours of leaving; anything more
+# than 30 minutes over is logged as underperformance.
+EXPECTED_DELIVERY_DURATION = timedelta(hours=3)
+UNDERPERFORMANCE_THRESHOLD = timedelta(minutes=30)
 
 # --- Log Overspending ---
 def log_overspending(conn, transaction_id, expected_cost, actual_cost, employee_id, current_date, type='delivery'):
@@ -6,7 +12,7 @@ def log_overspending(conn, transaction_id, expected_cost, actual_cost, employee_
     # Log only if the actual cost exceeds expected by more than 10%
     if deviation > expected_cost * 0.1:
         try:
-            with conn.cursor() as cur:
+            with savepoint(conn, "overspending_log"), conn.cursor() as cur:
                 cur.execute("""
                     INSERT INTO overspending_log (
                         transaction_id, type, expected_cost, actual_cost, deviation,
@@ -22,7 +28,6 @@ def log_overspending(conn, transaction_id, expected_cost, actual_cost, employee_
                     current_date,
                     employee_id
                 ))
-            conn.commit()
         except Exception as e:
             print(f"Error logging overspending: {e}")
 
@@ -33,9 +38,9 @@ def log_underperformance(conn, delivery_id, entity_type, entity_id, event_type,
     The new column delivery_id is logged as well.
     """
     deviation = actual_duration - expected_duration
-    if deviation.total_seconds() > 1800:  # Only log if delay exceeds 30 minutes
+    if deviation > UNDERPERFORMANCE_THRESHOLD:  # Only log if delay exceeds 30 minutes
         try:
-            with conn.cursor() as cur:
+            with savepoint(conn, "underperformance_log"), conn.cursor() as cur:
                 cur.execute("""
                     INSERT INTO underperformance_log (
                         delivery_id, entity_type, entity_id, event_type,
@@ -53,7 +58,6 @@ def log_underperformance(conn, delivery_id, entity_type, entity_id, event_type,
                     reason or f"{event_type} exceeded expected time",
                     current_date
                 ))
-            conn.commit()
         except Exception as e:
             print(f"Error logging underperformance: {e}")
 
@@ -68,7 +72,7 @@ def log_delivery_anomalies(conn, transaction_id, expected_cost, actual_cost, dri
     log_overspending(conn, transaction_id, expected_cost, actual_cost, driver_id, current_date, type='delivery')
     
     # Calculate delivery duration and log underperformance if needed.
-    expected_duration = timedelta(hours=3)
+    expected_duration = EXPECTED_DELIVERY_DURATION
     actual_duration = delivery_end - delivery_start
     log_underperformance(
         conn,
@@ -1,20 +1,14 @@
 from datetime import datetime, timedelta
 import json, random
 from db_order_anomaly_log import log_delivery_anomalies  # Make sure this function now accepts a delivery_id argument.
-from db_config import get_db_connection
-
-# --- Inventory Check ---
-def get_inventory_status(conn, product_id):
-    with conn.cursor() as cur:
-        cur.execute("""
-            SELECT current_pellets, to_be_sent, to_be_received, capacity_pellets
-            FROM inventory
-            WHERE inventory_id = 1;
-        """, (product_id,))
-        return cur.fetchone()
+from db_fuel_behavior import record_fuel_level
+from db_inventory import get_warehouse_status, apply_inventory_deltas
+from db_monthly_rollup import demand_deltas, record_flow
 
 # --- Get Pallet Cost ---
-def get_pallet_cost(conn, product_id):
+def get_pallet_cost(conn, product_id, state=None):
+    if state is not None:
+        return state.pallet_cost(product_id)
     with conn.cursor() as cur:
         cur.execute("""
             SELECT pallet_cost FROM product_pellets
@@ -24,7 +18,9 @@ def get_pallet_cost(conn, product_id):
         return float(result[0]) if result is not None and result[0] is not None else 0.0
 
 # --- Get Expected Delivery Time for Store ---
-def get_store_expected_time(conn, store_id):
+def get_store_expected_time(conn, store_id, state=None):
+    if state is not None:
+        return state.store_expected_time(store_id, timedelta(hours=2))
     with conn.cursor() as cur:
         cur.execute("""
             SELECT expected_time FROM store
@@ -34,15 +30,18 @@ def get_store_expected_time(conn, store_id):
         return result[0] if result is not None and result[0] is not None else timedelta(hours=2)
 
 # --- Get Store Distance ---
-def get_store_distance(conn, store_id):
+def get_store_distance(conn, store_id, state=None):
+    if state is not None:
+        return state.store_distance(store_id)
     with conn.cursor() as cur:
         cur.execute("SELECT distance_km FROM store WHERE store_id = %s;", (store_id,))
         result = cur.fetchone()
         return float(result[0]) if result is not None and result[0] is not None else 0.0
 
 # --- Request Resupply ---
-def request_resupply(conn, product_id, quantity, current_date):
-    current, _, to_be_received, capacity = get_inventory_status(conn, product_id)
+def request_resupply(conn, product_id, quantity, current_date, state=None):
+    # Warehouse space is shared by every product.
+    current, _, to_be_received, capacity = get_warehouse_status(conn, state)
     available_space = capacity - (current + to_be_received)
     batches = []
     while quantity > 0:
@@ -62,20 +61,33 @@ def request_resupply(conn, product_id, quantity, current_date):
                     INTERVAL '2 days', %s, 'pending', 0, %s, %s, %s
                 );
             """, (product_id, current_date, product_id, qty, current_date))
-    conn.commit()
+    requested = sum(batches)
+    if requested:
+        if state is not None:
+            state.record_request(product_id, requested)
+        else:
+            apply_inventory_deltas(conn, {product_id: (0, 0, requested)})
 
 # --- Helper: Get Driver for Truck ---
-def get_driver_for_truck(conn, truck_id):
+def get_driver_for_truck(conn, truck_id, state=None):
     """
     Returns the driver (employee_id) associated with the given truck.
     """
+    if state is not None:
+        truck = state.trucks.get(truck_id)
+        return truck["employee_id"] if truck is not None else None
     with conn.cursor() as cur:
         cur.execute("SELECT employee_id FROM truck WHERE truck_id = %s;", (truck_id,))
         result = cur.fetchone()
         return result[0] if result is not None else None
 
 # --- Get Available Truck ---
-def get_available_truck(conn, required_weight, refrigeration_needed):
+def get_available_truck(conn, required_weight, refrigeration_needed, state=None):
+    if state is not None:
+        for truck in state.available_trucks():
+            if (truck["refrigerated"] or not refrigeration_needed) and truck["capacity"] >= required_weight:
+                return truck["truck_id"]
+        return None
     with conn.cursor() as cur:
         cur.execute("""
             SELECT truck_id, capacity, refrigerated
@@ -90,17 +102,28 @@ def get_available_truck(conn, required_weight, refrigeration_needed):
     return None
 
 # --- Update Truck Status ---
-def update_truck_status(conn, truck_id, status):
+def update_truck_status(conn, truck_id, status, state=None):
+    if state is not None:
+        state.set_truck_status(truck_id, status)
+        return
     with conn.cursor() as cur:
         cur.execute("""
             UPDATE truck
             SET operational_status = %s
             WHERE truck_id = %s;
         """, (status, truck_id))
-    conn.commit()
 
 # --- Check and Enforce Truck Maintenance ---
-def enforce_truck_maintenance(conn, truck_id, current_date):
+def enforce_truck_maintenance(conn, truck_id, current_date, state=None):
+    if state is not None:
+        truck = state.trucks.get(truck_id)
+        if truck is None:
+            return False
+        last_maintanance = truck["last_maintanance"]
+        if last_maintanance is not None and (current_date - last_maintanance).days >= 200:
+            state.start_truck_maintenance(truck_id, current_date)
+            return True
+        return False
     with conn.cursor() as cur:
         cur.execute("SELECT last_maintanance FROM truck WHERE truck_id = %s;", (truck_id,))
         result = cur.fetchone()
@@ -110,36 +133,116 @@ def enforce_truck_maintenance(conn, truck_id, current_date):
         if last_maintanance is not None and (current_date - last_maintanance).days >= 200:
             update_truck_status(conn, truck_id, 'maintenance')
             cur.execute("UPDATE truck SET last_maintanance = %s WHERE truck_id = %s;", (current_date, truck_id))
-            conn.commit()
             return True
     return False
 
-# --- Mark Product Pellets as Sent (FEFO) ---
-def mark_product_pellets_as_sent(conn, product_id, quantity, current_date):
-    with conn.cursor() as cur:
-        cur.execute("SELECT name FROM product_pellets WHERE product_id = %s;", (product_id,))
-        result = cur.fetchone()
-        if not result:
-            return []
-        product_name = result[0]
+# --- Allocate Pellets for a Dispatch Wave (FEFO) ---
+def allocate_pellets_fefo(conn, lines, state=None):
+    """
+    Reserves pellets first-expired-first-out for every (product_id, quantity)
+    line of a dispatch wave in a single UPDATE ... FROM statement.
+
+    Lines for the same product are served in list order: the first line gets
+    the earliest sell_by dates, the next line continues where it stopped.
+    Pellets locked by another transaction are skipped. Returns one list of
+    pellet ids per line, in FEFO order.
+    """
+    allocations = [[] for _ in lines]
+    wanted = []
+    for line_no, (product_id, quantity) in enumerate(lines):
+        if quantity <= 0:
+            continue
+        if state is not None:
+            product = state.products.get(product_id)
+            # Unknown product or nothing left on the shelves, skip the lookup.
+            if product is None or state.pellet_stock.get(product["name"], 0) <= 0:
+                continue
+        wanted.append((line_no, product_id, quantity))
+    if not wanted:
+        return allocations
+
     with conn.cursor() as cur:
         cur.execute("""
-            SELECT pellet_id FROM product_pellet
-            WHERE name = %s AND sent = FALSE
-            ORDER BY sell_by ASC
-            LIMIT %s;
-        """, (product_name, quantity))
-        pellets = cur.fetchall()
-        pellet_ids = [p[0] for p in pellets]
-    if pellet_ids:
-        with conn.cursor() as cur:
-            cur.execute("""
-                UPDATE product_pellet
-                SET sent = TRUE
-                WHERE pellet_id = ANY(%s);
-            """, (pellet_ids,))
-    conn.commit()
-    return pellet_ids
+            WITH demand AS (
+                SELECT d.line_no, d.product_id, d.quantity,
+                       SUM(d.quantity) OVER (
+                           PARTITION BY d.product_id ORDER BY d.line_no
+                       ) - d.quantity AS first_rank
+                FROM unnest(%s::int[], %s::int[], %s::int[]) AS d(line_no, product_id, quantity)
+            ),
+            totals AS (
+                SELECT p.product_id, p.name, SUM(d.quantity) AS quantity
+                FROM demand d
+                JOIN product_pellets p ON p.product_id = d.product_id
+                GROUP BY p.product_id, p.name
+            ),
+            -- Only the pellets the wave needs are locked: per product, the
+            -- first `quantity` unsent pellets by sell-by date that no other
+            -- transaction holds.
+            locked AS (
+                SELECT pp.pellet_id, pp.sell_by, t.product_id
+                FROM totals t
+                CROSS JOIN LATERAL (
+                    SELECT pellet_id, sell_by
+                    FROM product_pellet
+                    WHERE sent = FALSE AND name = t.name
+                    ORDER BY sell_by, pellet_id
+                    LIMIT t.quantity
+                    FOR UPDATE SKIP LOCKED
+                ) pp
+            ),
+            ranked AS (
+                SELECT pellet_id, product_id,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY product_id ORDER BY sell_by, pellet_id
+                       ) AS pick_rank
+                FROM locked
+            ),
+            picked AS (
+                SELECT r.pellet_id, r.pick_rank, d.line_no
+                FROM ranked r
+                JOIN demand d
+                  ON d.product_id = r.product_id
+                 AND r.pick_rank > d.first_rank
+                 AND r.pick_rank <= d.first_rank + d.quantity
+            )
+            UPDATE product_pellet pp
+            SET sent = TRUE
+            FROM picked
+            WHERE pp.pellet_id = picked.pellet_id
+            RETURNING picked.line_no, picked.pick_rank, pp.pellet_id, pp.name;
+        """, (
+            [w[0] for w in wanted],
+            [w[1] for w in wanted],
+            [w[2] for w in wanted],
+        ))
+        rows = sorted(cur.fetchall())
+
+    for line_no, _, pellet_id, name in rows:
+        allocations[line_no].append(pellet_id)
+        if state is not None:
+            state.adjust_pellet_stock(name, -1)
+    return allocations
+
+def allocate_dispatch_wave(conn, wave, state=None):
+    """
+    Allocates pellets for a whole dispatch wave at once. `wave` is a list of
+    item lists (one per order); returns one products_delivered dict per order,
+    mapping str(product_id) to the pellet ids sent.
+    """
+    lines = [(item['product_id'], item['quantity']) for items in wave for item in items]
+    allocations = iter(allocate_pellets_fefo(conn, lines, state))
+    pellet_maps = []
+    for items in wave:
+        delivered_dict = {}
+        for item in items:
+            delivered_dict.setdefault(str(item['product_id']), []).extend(next(allocations))
+        pellet_maps.append(delivered_dict)
+    return pellet_maps
+
+# --- Mark Product Pellets as Sent (FEFO) ---
+def mark_product_pellets_as_sent(conn, product_id, quantity, current_date, state=None):
+    return allocate_pellets_fefo(conn, [(product_id, quantity)], state)[0]
 
 # --- Log Transaction ---
 def log_transaction(conn, cost, transaction_type, current_date):
@@ -152,15 +255,17 @@ def log_transaction(conn, cost, transaction_type, current_date):
         return cur.fetchone()[0]
 
 # --- Get Current Gas Price ---
-def get_current_gas_price(conn):
+def get_current_gas_price(conn, state=None):
+    if state is not None:
+        return state.gas_price
     with conn.cursor() as cur:
         cur.execute("SELECT value FROM system_config WHERE key = 'current_gas_price';")
         result = cur.fetchone()
         return float(result[0]) if result is not None and result[0] is not None else 3.0
 
 # --- Refuel Truck After Delivery ---
-def refuel_truck_after_delivery(conn, truck_id, driver_id, km_driven, current_date):
-    gas_price = get_current_gas_price(conn)
+def refuel_truck_after_delivery(conn, truck_id, driver_id, km_driven, current_date, state=None):
+    gas_price = get_current_gas_price(conn, state)
     liters_used = km_driven / 3.0
     cost = round(liters_used * gas_price, 2)
     with conn.cursor() as cur:
@@ -174,78 +279,16 @@ def refuel_truck_after_delivery(conn, truck_id, driver_id, km_driven, current_da
             INSERT INTO fuel_log (transaction_id, truck_id, employee_id, cost, liters, cost_per_liter, expected_cost, date_time)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s);
         """, (transaction_id, truck_id, driver_id, cost, liters_used, gas_price, cost, current_date))
-    conn.commit()
-
-# --- Fulfill Orders ---
-def fulfill_orders(current_date):
-    conn = get_db_connection()
-    try:
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT store_id, products, date_time
-                FROM pending_orders
-                ORDER BY date_time ASC;
-            """)
-            orders = cur.fetchall()
-        for store_id, products_json, order_time in orders:
-            try:
-                total_weight = 0
-                refrigeration_required = False
-                prepared_items = []  # List of items to be delivered.
-                products = json.loads(products_json) if isinstance(products_json, str) else products_json
-                for item in products:
-                    available, _, _, _ = get_inventory_status(conn, item['product_id'])
-                    deliver_now = min(item['quantity'], available)
-                    if deliver_now > 0:
-                        prepared_items.append({
-                            'product_id': item['product_id'],
-                            'quantity': deliver_now,
-                            'weight': item['weight'] * deliver_now,
-                            'refrigerated': item.get('refrigerated', False)
-                        })
-                        total_weight += item['weight'] * deliver_now
-                    if deliver_now < item['quantity']:
-                        request_resupply(conn, item['product_id'], item['quantity'] - deliver_now, current_date)
-                    if item.get('refrigerated', False):
-                        refrigeration_required = True
-                if not prepared_items:
-                    continue
-                # Get truck and then use its driver.
-                truck_id = get_available_truck(conn, total_weight, refrigeration_required)
-                if not truck_id:
-                    print(f"No available truck for order from store {store_id} with total weight {total_weight}.")
-                    continue
-                driver_id = get_driver_for_truck(conn, truck_id)
-                if not driver_id:
-                    print(f"Truck {truck_id} does not have an associated driver.")
-                    continue
-                if enforce_truck_maintenance(conn, truck_id, current_date):
-                    print(f"Truck {truck_id} is under maintenance on {current_date}.")
-                    continue
-                schedule_delivery(conn, store_id, prepared_items, truck_id, driver_id, current_date)
-                # Update inventory: subtract delivered quantities and add to to_be_sent.
-                with conn.cursor() as cur:
-                    for item in products:
-                        cur.execute("""
-                            UPDATE inventory
-                            SET current_pellets = GREATEST(current_pellets - %s, 0),
-                                to_be_sent = to_be_sent + %s
-                            WHERE inventory_id = 1;
-                        """, (item['quantity'], item['quantity']))
-                    cur.execute("""
-                        DELETE FROM pending_orders
-                        WHERE store_id = %s AND date_time = %s;
-                    """, (store_id, order_time))
-                conn.commit()
-            except Exception as order_error:
-                print(f"Error processing order for store {store_id} at {order_time}: {order_error}")
-                continue
-    except Exception as e:
-        print(f"Error in fulfill_orders: {e}")
+    record_fuel_level(conn, truck_id, liters_used, state)
 
 # --- Schedule Delivery ---
-def schedule_delivery(conn, store_id, products, truck_id, driver_id, current_date):
-    store_expected_time = get_store_expected_time(conn, store_id)
+def schedule_delivery(conn, store_id, products, truck_id, driver_id, current_date, state=None, pellet_map=None):
+    """
+    Records one delivery. `pellet_map` holds the pellet ids already reserved for
+    this order by allocate_dispatch_wave; without it the order's items are
+    allocated here in a single FEFO statement.
+    """
+    store_expected_time = get_store_expected_time(conn, store_id, state)
     simulation_start = datetime.strptime("08:00", "%H:%M").time()
     now_dt = datetime.combine(current_date, simulation_start)
     loading_end = now_dt + timedelta(hours=1)
@@ -255,17 +298,17 @@ def schedule_delivery(conn, store_id, products, truck_id, driver_id, current_dat
         time_sent = datetime.combine(current_date + timedelta(days=1), datetime.strptime("04:00", "%H:%M").time())
     else:
         time_sent = loading_end
-    update_truck_status(conn, truck_id, 'loading')
-    update_truck_status(conn, truck_id, 'on_route')
+    update_truck_status(conn, truck_id, 'loading', state)
+    update_truck_status(conn, truck_id, 'on_route', state)
     delay_minutes = random.randint(0, 60)
     delivery_delay = timedelta(minutes=delay_minutes)
     actual_return_time = estimated_return_time + delivery_delay
-    delivered_dict = {}
+    if pellet_map is None:
+        pellet_map = allocate_dispatch_wave(conn, [products], state)[0]
+    delivered_dict = pellet_map
     total_cost = 0
     for item in products:
-        pellet_ids = mark_product_pellets_as_sent(conn, item['product_id'], item['quantity'], current_date)
-        delivered_dict[str(item['product_id'])] = pellet_ids
-        total_cost += get_pallet_cost(conn, item['product_id']) * item['quantity']
+        total_cost += get_pallet_cost(conn, item['product_id'], state) * item['quantity']
     with conn.cursor() as cur:
         cur.execute("""
             INSERT INTO inventory_delivery (
@@ -290,7 +333,7 @@ def schedule_delivery(conn, store_id, products, truck_id, driver_id, current_dat
             SET status = 'completed', time_returned = %s
             WHERE transaction_id = %s;
         """, (actual_return_time, delivery_id))
-    conn.commit()
+    record_flow(conn, demand_deltas(current_date, [delivered_dict]), state)
     log_transaction(conn, total_cost, 'delivery', current_date)
     # Only log anomalies if delay exceeds 30 minutes.
     if delivery_delay > timedelta(minutes=30):
@@ -305,7 +348,7 @@ def schedule_delivery(conn, store_id, products, truck_id, driver_id, current_dat
             current_date=current_date,
             delivery_id=delivery_id  # New parameter for underperformance_log.
         )
-    store_distance = get_store_distance(conn, store_id)
+    store_distance = get_store_distance(conn, store_id, state)
     km_driven_delivery = store_distance * 2
     extra_km = round(random.uniform(0, 5), 2) if delay_minutes > 0 else 0
     with conn.cursor() as cur:
@@ -320,33 +363,13 @@ def schedule_delivery(conn, store_id, products, truck_id, driver_id, current_dat
             time_sent,
             actual_return_time,
             store_expected_time,
-            get_store_distance(conn, store_id),
+            store_distance,
             km_driven_delivery,
             extra_km,
             delivery_delay,
             current_date
         ))
-    conn.commit()
-    refuel_truck_after_delivery(conn, truck_id, driver_id, km_driven_delivery, current_date)
-    update_truck_status(conn, truck_id, 'available')
-
-# --- Refuel Truck After Delivery ---
-def refuel_truck_after_delivery(conn, truck_id, driver_id, km_driven, current_date):
-    gas_price = get_current_gas_price(conn)
-    liters_used = km_driven / 3.0
-    cost = round(liters_used * gas_price, 2)
-    with conn.cursor() as cur:
-        cur.execute("""
-            INSERT INTO transactions (type, cost, date, date_time)
-            VALUES ('fuel', %s, %s, %s)
-            RETURNING transaction_id;
-        """, (cost, current_date, current_date))
-        transaction_id = cur.fetchone()[0]
-        cur.execute("""
-            INSERT INTO fuel_log (transaction_id, truck_id, employee_id, cost, liters, cost_per_liter, expected_cost, date_time)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s);
-        """, (transaction_id, truck_id, driver_id, cost, liters_used, gas_price, cost, current_date))
-    conn.commit()
-
-# if __name__ == "__main__":
-#     fulfill_orders(datetime.now().date())
+    refuel_truck_after_delivery(conn, truck_id, driver_id, km_driven_delivery, current_date, state)
+    update_truck_status(conn, truck_id, 'available', state)
+    if state is not None:
+        state.dispatched_trucks.add(truck_id)
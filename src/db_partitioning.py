@@ -0,0 +1,311 @@
+import argparse
+import os
+import re
+from datetime import date, datetime
+import pandas as pd
+from db_config import get_db_connection
+from db_extract_cache import CACHE_DIR, table_watermark
+
+ARCHIVE_DIR = "archive"
+DEFAULT_ARCHIVE_BATCH = 100_000
+
+# Log tables range-partitioned by month of date_time, with their id column.
+PARTITIONED_LOGS = {
+    "transactions": "transaction_id",
+    "fuel_log": "transaction_id",
+    "truck_log": "log_id",
+}
+
+# --- Month Helpers ---
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+def next_month(day):
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+def partition_name(table, month):
+    return f"{table}_{month:%Y_%m}"
+
+def default_partition_name(table):
+    return f"{table}_default"
+
+def _relkind(cur, table):
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s);", (table,))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+# --- Month Partitions ---
+def ensure_month_partitions(conn, day, tables=tuple(PARTITIONED_LOGS)):
+    """
+    Creates the partition holding `day`'s month for every partitioned log
+    table that lacks one, moving over the rows of that month already written
+    to the table's DEFAULT partition (created here on databases partitioned
+    before it existed). Tables that are not partitioned (older databases,
+    scenario schema copies) are left alone.
+    """
+    month = month_start(day)
+    with conn.cursor() as cur:
+        for table in tables:
+            name = partition_name(table, month)
+            if _relkind(cur, table) != "p" or _relkind(cur, name) is not None:
+                continue
+            default = default_partition_name(table)
+            if _relkind(cur, default) is None:
+                cur.execute(f"CREATE TABLE {default} PARTITION OF {table} DEFAULT;")
+            cur.execute(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS);")
+            cur.execute(f"""
+                WITH moved AS (
+                    DELETE FROM {default}
+                    WHERE date_time >= %s AND date_time < %s
+                    RETURNING *
+                )
+                INSERT INTO {name} SELECT * FROM moved;
+            """, (month, next_month(month)))
+            cur.execute(f"""
+                ALTER TABLE {table} ATTACH PARTITION {name}
+                FOR VALUES FROM (%s) TO (%s);
+            """, (month, next_month(month)))
+
+# --- Convert Existing Tables ---
+def _convert_to_partitioned(cur, table, key_columns, partition_by, partitions, converted):
+    """
+    Rebuilds a plain `table` as a partitioned one with the same columns,
+    defaults, indexes and outgoing foreign keys, moving its rows across.
+    Foreign keys pointing at the table, or at a table in `converted`, are
+    dropped: Postgres cannot reference a partitioned table by id alone.
+    """
+    cur.execute("""
+        SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+        WHERE conrelid = to_regclass(%s) AND contype = 'f'
+          AND confrelid <> ALL(ARRAY(SELECT to_regclass(t) FROM unnest(%s::text[]) AS t));
+    """, (table, converted))
+    foreign_keys = cur.fetchall()
+    cur.execute("""
+        SELECT conrelid::regclass::text, conname FROM pg_constraint
+        WHERE confrelid = to_regclass(%s) AND contype = 'f';
+    """, (table,))
+    for referencing, conname in cur.fetchall():
+        cur.execute(f"ALTER TABLE {referencing} DROP CONSTRAINT {conname};")
+    cur.execute("""
+        SELECT c.relname, pg_get_indexdef(i.indexrelid) FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = to_regclass(%s) AND NOT i.indisprimary;
+    """, (table,))
+    indexes = cur.fetchall()
+    for index, _ in indexes:
+        cur.execute(f"DROP INDEX {index};")
+    cur.execute("""
+        SELECT conname FROM pg_constraint
+        WHERE conrelid = to_regclass(%s) AND contype = 'p';
+    """, (table,))
+    for (conname,) in cur.fetchall():
+        cur.execute(f"ALTER TABLE {table} DROP CONSTRAINT {conname};")
+    cur.execute("""
+        SELECT a.attname, pg_get_serial_sequence(%s, a.attname) FROM pg_attribute a
+        WHERE a.attrelid = to_regclass(%s) AND a.attnum > 0 AND NOT a.attisdropped
+          AND pg_get_serial_sequence(%s, a.attname) IS NOT NULL;
+    """, (table, table, table))
+    sequences = cur.fetchall()
+
+    legacy = f"{table}_legacy"
+    cur.execute(f"ALTER TABLE {table} RENAME TO {legacy};")
+    cur.execute(f"""
+        CREATE TABLE {table} (
+            LIKE {legacy} INCLUDING DEFAULTS,
+            PRIMARY KEY ({", ".join(key_columns)})
+        ) PARTITION BY {partition_by};
+    """)
+    for name, bounds in partitions(cur, legacy):
+        cur.execute(f"CREATE TABLE {name} PARTITION OF {table} {bounds};")
+    cur.execute(f"INSERT INTO {table} SELECT * FROM {legacy};")
+    for column, sequence in sequences:
+        cur.execute(f"ALTER SEQUENCE {sequence} OWNED BY {table}.{column};")
+    cur.execute(f"DROP TABLE {legacy};")
+    for conname, definition in foreign_keys:
+        cur.execute(f"ALTER TABLE {table} ADD CONSTRAINT {conname} {definition};")
+    for _, definition in indexes:
+        cur.execute(definition + ";")
+
+def _month_partitions(table):
+    def partitions(cur, legacy):
+        cur.execute(f"""
+            SELECT DISTINCT date_trunc('month', date_time)::date FROM {legacy}
+            WHERE date_time IS NOT NULL ORDER BY 1;
+        """)
+        return [
+            (partition_name(table, month), f"FOR VALUES FROM ('{month}') TO ('{next_month(month)}')")
+            for (month,) in cur.fetchall()
+        ] + [(default_partition_name(table), "DEFAULT")]
+    return partitions
+
+def _pellet_partitions(cur, legacy):
+    return [
+        ("product_pellet_unsent", "FOR VALUES IN (FALSE)"),
+        ("product_pellet_sent", "FOR VALUES IN (TRUE)"),
+    ]
+
+def partition_tables(conn):
+    """
+    Migrates a database created before db_structure.sql partitioned its
+    tables: product_pellet is split into unsent/sent partitions on `sent`
+    and the log tables into monthly partitions on date_time. Tables that
+    are already partitioned are skipped. Does not commit.
+    """
+    plans = [("product_pellet", ["pellet_id", "sent"], "LIST (sent)", _pellet_partitions)]
+    plans += [
+        (table, [id_column, "date_time"], "RANGE (date_time)", _month_partitions(table))
+        for table, id_column in PARTITIONED_LOGS.items()
+    ]
+    converted = [table for table, _, _, _ in plans]
+    with conn.cursor() as cur:
+        for table, key_columns, partition_by, partitions in plans:
+            if _relkind(cur, table) != "r":
+                continue
+            print(f"Partitioning {table}...")
+            _convert_to_partitioned(cur, table, key_columns, partition_by, partitions, converted)
+
+# --- Archive to Parquet ---
+def list_month_partitions(conn, table):
+    """
+    Returns [(month, partition name)] for the monthly partitions of `table`.
+    """
+    pattern = re.compile(rf"^{re.escape(table)}_(\d{{4}})_(\d{{2}})$")
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT c.relname FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass(%s)
+            ORDER BY c.relname;
+        """, (table,))
+        names = [r[0] for r in cur.fetchall()]
+    return [
+        (date(int(m.group(1)), int(m.group(2)), 1), name)
+        for name in names
+        for m in [pattern.match(name)] if m
+    ]
+
+def _write_parquet(cur, path):
+    columns = [c[0] for c in cur.description]
+    df = pd.DataFrame(cur.fetchall(), columns=columns)
+    df.to_parquet(path, compression="zstd", index=False)
+    return len(df)
+
+# Readers of the log tables that see only what is still in the database:
+#   db_simulate_scenarios.collect_kpis   sums all of transactions and truck_log
+#                                        of the clone it runs in
+#   db_fuel_behavior.backfill_fuel_levels rebuilds fuel levels from all of fuel_log
+# The notebook reads them through db_extract_cache, which keeps the rows it
+# has synced once their partition is gone. The monthly rollup is built from
+# inventory_delivery and supplier_delivery, which are not partitioned.
+def _unfinished_run_start(cur):
+    cur.execute("SELECT to_regclass('simulation_progress') IS NOT NULL;")
+    if not cur.fetchone()[0]:
+        return None
+    cur.execute("SELECT MIN(start_date) FROM simulation_progress WHERE days_processed < num_days;")
+    return cur.fetchone()[0]
+
+def archive_blockers(conn, table, month, name, cache_dir=CACHE_DIR):
+    """
+    Returns why partition `name` of `table` (holding `month`) must stay in
+    the database, or an empty list when it is safe to archive.
+    """
+    reasons = []
+    with conn.cursor() as cur:
+        run_start = _unfinished_run_start(cur)
+        if run_start is not None and next_month(month) > run_start:
+            reasons.append(f"an unfinished simulation run started on {run_start}")
+        cur.execute(f"SELECT MAX({PARTITIONED_LOGS[table]}) FROM {name};")
+        last_id = cur.fetchone()[0]
+        watermark = table_watermark(table, cache_dir)
+        if last_id is not None and (watermark is None or watermark < last_id):
+            reasons.append(f"rows not yet synced to the extract cache in {cache_dir}")
+        if table == "fuel_log":
+            cur.execute("SELECT COUNT(*) FROM truck WHERE fuel_level IS NULL;")
+            if cur.fetchone()[0]:
+                reasons.append("trucks without a fuel level still to be rebuilt from fuel_log")
+    return reasons
+
+def archive_partitions(conn, before, output_dir=ARCHIVE_DIR, tables=tuple(PARTITIONED_LOGS),
+                       cache_dir=CACHE_DIR, force=False):
+    """
+    Exports every monthly partition that ends on or before `before` to
+    `output_dir`/<table>/<partition>.parquet, then detaches and drops it.
+    Partitions with archive_blockers are skipped unless `force` is set.
+    Each partition is committed on its own once its file is written.
+    Returns {partition: rows archived}.
+    """
+    cutoff = month_start(before)
+    archived = {}
+    for table in tables:
+        os.makedirs(os.path.join(output_dir, table), exist_ok=True)
+        for month, name in list_month_partitions(conn, table):
+            if next_month(month) > cutoff:
+                continue
+            reasons = archive_blockers(conn, table, month, name, cache_dir)
+            if reasons and not force:
+                print(f"Keeping {name}: {'; '.join(reasons)}.")
+                continue
+            with conn.cursor() as cur:
+                cur.execute(f"SELECT * FROM {name};")
+                archived[name] = _write_parquet(cur, os.path.join(output_dir, table, f"{name}.parquet"))
+                cur.execute(f"ALTER TABLE {table} DETACH PARTITION {name};")
+                cur.execute(f"DROP TABLE {name};")
+            conn.commit()
+            print(f"Archived {name}: {archived[name]} rows.")
+    return archived
+
+def archive_sent_pellets(conn, before, output_dir=ARCHIVE_DIR, batch_size=DEFAULT_ARCHIVE_BATCH):
+    """
+    Moves sent pellets received before `before` out of the database into
+    Parquet files under `output_dir`/product_pellet, `batch_size` pellets
+    per file and per commit. Returns the number of pellets archived.
+    """
+    folder = os.path.join(output_dir, "product_pellet")
+    os.makedirs(folder, exist_ok=True)
+    archived = 0
+    part = 0
+    while True:
+        with conn.cursor() as cur:
+            cur.execute("""
+                DELETE FROM product_pellet
+                WHERE sent = TRUE AND pellet_id IN (
+                    SELECT pellet_id FROM product_pellet
+                    WHERE sent = TRUE AND received < %s
+                    ORDER BY pellet_id
+                    LIMIT %s
+                )
+                RETURNING *;
+            """, (before, batch_size))
+            if cur.rowcount == 0:
+                break
+            rows = _write_parquet(cur, os.path.join(folder, f"sent_before_{before:%Y_%m_%d}_{part:04d}.parquet"))
+        conn.commit()
+        archived += rows
+        part += 1
+        if rows < batch_size:
+            break
+    print(f"Archived {archived} sent pellets received before {before}.")
+    return archived
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Partition maintenance for the log and pellet tables.")
+    parser.add_argument("--migrate", action="store_true", help="Partition the tables of an existing database.")
+    parser.add_argument("--archive-before", help="Archive log partitions ending on or before this month (YYYY-MM-DD).")
+    parser.add_argument("--pellets", action="store_true", help="Also archive sent pellets received before that date.")
+    parser.add_argument("--output", default=ARCHIVE_DIR)
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="Extract cache the notebook reads the logs from.")
+    parser.add_argument("--force", action="store_true", help="Archive partitions that readers still depend on.")
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    try:
+        if args.migrate:
+            partition_tables(conn)
+            conn.commit()
+        if args.archive_before:
+            before = datetime.strptime(args.archive_before, "%Y-%m-%d").date()
+            archive_partitions(conn, before, args.output, cache_dir=args.cache_dir, force=args.force)
+            if args.pellets:
+                archive_sent_pellets(conn, before, args.output)
+    finally:
+        conn.close()
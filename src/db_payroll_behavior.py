@@ -1,94 +1,80 @@
-from datetime import datetime, timedelta
-from db_order_anomaly_log import log_overspending
-from db_config import get_db_connection
+from datetime import timedelta
+from db_sim_metrics import timed_stage
 
-# --- Log to Transactions Table ---
-def log_transaction(conn, cost, current_date):
+# --- Duplicate Payroll Guard ---
+def ensure_payroll_month_index(conn):
+    """
+    Creates the unique index that allows one payroll per employee per month
+    on databases built before it was added to db_structure.sql.
+    """
     with conn.cursor() as cur:
         cur.execute("""
-            INSERT INTO transactions (
-                type, cost, date, date_time
-            ) VALUES ('payroll', %s, %s, %s)
-            RETURNING transaction_id;
-        """, (cost, current_date, current_date))
-        return cur.fetchone()[0]
-
-# --- Check for Duplicate Payroll ---
-def payroll_already_logged(conn, employee_id, current_date):
-    with conn.cursor() as cur:
-        cur.execute("""
-            SELECT 1 FROM payroll_log
-            WHERE employee_id = %s
-              AND date_trunc('month', date_time) = date_trunc('month', %s)
-        """, (employee_id, current_date))
-        return cur.fetchone() is not None
-
-# --- Fetch Expected Payroll ---
-def get_expected_salary(conn, employee_id):
-    with conn.cursor() as cur:
-        cur.execute("""
-            SELECT salary FROM employee
-            WHERE employee_id = %s
-        """, (employee_id,))
-        result = cur.fetchone()
-        return result[0] if result else None
-
-# --- Add Payroll Entry ---
-def add_payroll_log(conn, employee_id, payment, account_num, last_payment, next_payment, current_date):
-    # Use the provided connection instead of opening a new one
-    if payroll_already_logged(conn, employee_id, current_date):
-        print(f"Payroll already registered for employee {employee_id} this month.")
-        return
-
-    expected_salary = get_expected_salary(conn, employee_id)
-
-    # First insert into transactions
-    transaction_id = log_transaction(conn, payment, current_date)
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_payroll_log_employee_month
+            ON payroll_log (employee_id, (date_trunc('month', date_time)));
+        """)
 
+# --- Process Payrolls ---
+@timed_stage
+def process_payrolls(conn, current_date):
+    """
+    Pays every employee whose next_payment is due in one statement. Payroll
+    rows take their transaction ids straight from the transactions sequence
+    and are inserted first; the month index turns an already paid employee
+    into a skipped row (ON CONFLICT), and only the rows actually inserted
+    get a transaction and, if the payment is over 10% above the salary, an
+    overspending entry of type 'payroll' (the per-employee version logged
+    these under log_overspending's default type, 'delivery'). next_payment
+    moves forward for every due employee.
+    Returns (due, paid).
+    """
+    last_payment = current_date - timedelta(days=30)
+    next_payment = current_date + timedelta(days=30)
     with conn.cursor() as cur:
         cur.execute("""
-            INSERT INTO payroll_log (
-                transaction_id, employee_id, payment, account_num,
-                last_payment, next_payment, date_time
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s);
-        """, (
-            transaction_id,
-            employee_id,
-            payment,
-            account_num,
-            last_payment,
-            next_payment,
-            current_date
-        ))
-
-    if expected_salary:
-        log_overspending(conn, transaction_id, expected_salary, payment, employee_id, current_date)
+            WITH due AS (
+                SELECT employee_id, salary, account_num
+                FROM employee
+                WHERE next_payment <= %(today)s
+                ORDER BY employee_id
+            ), paid AS (
+                INSERT INTO payroll_log (
+                    transaction_id, employee_id, payment, account_num,
+                    last_payment, next_payment, date_time
+                )
+                SELECT nextval(pg_get_serial_sequence('transactions', 'transaction_id')),
+                       employee_id, salary, account_num, %(last)s, %(next)s, %(today)s
+                FROM due
+                ON CONFLICT (employee_id, (date_trunc('month', date_time))) DO NOTHING
+                RETURNING transaction_id, employee_id, payment
+            ), logged AS (
+                INSERT INTO transactions (transaction_id, type, cost, date, date_time)
+                SELECT transaction_id, 'payroll', payment, %(today)s, %(today)s
+                FROM paid
+            ), overspent AS (
+                INSERT INTO overspending_log (
+                    transaction_id, type, expected_cost, actual_cost, deviation,
+                    reason, flagged_by, date_time, employee_id
+                )
+                SELECT p.transaction_id, 'payroll', d.salary, p.payment, p.payment - d.salary,
+                       'Payroll cost exceeded expected threshold', 'system', %(today)s, p.employee_id
+                FROM paid p
+                JOIN due d USING (employee_id)
+                WHERE d.salary > 0 AND p.payment - d.salary > d.salary * 0.1
+            ), advanced AS (
+                UPDATE employee
+                SET next_payment = %(next)s
+                WHERE employee_id IN (SELECT employee_id FROM due)
+            )
+            SELECT (SELECT COUNT(*) FROM due), (SELECT COUNT(*) FROM paid);
+        """, {"today": current_date, "last": last_payment, "next": next_payment})
+        due, paid = cur.fetchone()
 
-# --- Process Payrolls ---
-def process_payrolls(current_date):
-    conn = get_db_connection()
-    with conn:
-        with conn.cursor() as cur:
-            cur.execute("SELECT employee_id, salary, account_num, next_payment FROM employee;")
-            for emp_id, salary, acc, next_payment in cur.fetchall():
-                # Check if payroll is due for this employee
-                if next_payment and next_payment <= current_date:
-                    add_payroll_log(
-                        conn,
-                        emp_id,
-                        salary,
-                        acc,
-                        current_date - timedelta(days=30),
-                        current_date + timedelta(days=30),
-                        current_date
-                    )
-                    cur.execute("""
-                        UPDATE employee
-                        SET next_payment = %s
-                        WHERE employee_id = %s;
-                    """, (current_date + timedelta(days=30), emp_id))
-        conn.commit()
+    if paid < due:
+        print(f"Payroll already registered this month for {due - paid} employee(s).")
+    return due, paid
 
 # if __name__ == "__main__":
 #     # For testing, run process_payrolls with the simulated current date.
-#     process_payrolls(datetime.now().date())
+#     from db_config import day_session
+#     with day_session() as conn:
+#         process_payrolls(conn, datetime.now().date())
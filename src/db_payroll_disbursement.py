@@ -0,0 +1,140 @@
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime
+from db_config import get_db_connection
+from db_encryption_util import DecryptCache, decrypt_accounts
+
+DEFAULT_CONCURRENCY = 16
+DEFAULT_BATCH_SIZE = 1000
+
+# --- Simulated Bank ---
+class SimulatedBank:
+    """
+    Stand-in for the external bank: every transfer takes `latency` seconds
+    plus up to `jitter` more, and fails with probability `failure_rate`.
+    """
+
+    def __init__(self, latency=0.02, jitter=0.01, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+
+    async def transfer(self, employee_id, payment, account_num):
+        await asyncio.sleep(self.latency + self.rng.uniform(0, self.jitter))
+        return self.rng.random() >= self.failure_rate
+
+# --- Load a Pay Cycle ---
+def load_pay_cycle(conn, pay_date):
+    """
+    Returns the payroll_log rows written on `pay_date` as dicts.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT transaction_id, employee_id, payment, account_num
+            FROM payroll_log
+            WHERE date_time::date = %s
+            ORDER BY transaction_id;
+        """, (pay_date,))
+        return [
+            {"transaction_id": t, "employee_id": e, "payment": p, "account_num": a}
+            for t, e, p, a in cur.fetchall()
+        ]
+
+# --- Disburse One Batch ---
+async def _transfer_worker(bank, queue, results):
+    while True:
+        payment, enqueued = await queue.get()
+        try:
+            try:
+                ok = await bank.transfer(payment["employee_id"], payment["payment"], payment["plain_account"])
+            except Exception as e:
+                # Recorded as a failed transfer: a dead worker would leave
+                # queue.join() waiting forever once every worker had died.
+                print(f"Transfer failed for employee {payment['employee_id']}: {e}")
+                ok = False
+            results.append((ok, time.perf_counter() - enqueued))
+        finally:
+            queue.task_done()
+
+async def disburse_batch(payments, bank, concurrency=DEFAULT_CONCURRENCY):
+    """
+    Sends every payment (with its decrypted `plain_account`) to `bank`
+    through an asyncio queue drained by `concurrency` workers. Returns
+    [(succeeded, latency in seconds)], latency counted from enqueue.
+    """
+    queue = asyncio.Queue()
+    results = []
+    workers = [asyncio.create_task(_transfer_worker(bank, queue, results)) for _ in range(concurrency)]
+    for payment in payments:
+        queue.put_nowait((payment, time.perf_counter()))
+    await queue.join()
+    for worker in workers:
+        worker.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+    return results
+
+def batch_stats(results, decrypt_seconds, elapsed):
+    latencies = sorted(latency for _, latency in results)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    return {
+        "transfers": len(results),
+        "failed": sum(1 for ok, _ in results if not ok),
+        "decrypt_ms": round(decrypt_seconds * 1000, 2),
+        "seconds": round(elapsed, 3),
+        "transfers_per_sec": round(len(results) / elapsed, 1) if elapsed else None,
+        "latency_p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "latency_p95_ms": round(p95 * 1000, 2),
+        "latency_max_ms": round(latencies[-1] * 1000, 2),
+    }
+
+# --- Disburse a Pay Cycle ---
+def disburse_payroll(payments, bank=None, concurrency=DEFAULT_CONCURRENCY,
+                     batch_size=DEFAULT_BATCH_SIZE, cache=None):
+    """
+    Pays out `payments` (rows from load_pay_cycle) in batches of
+    `batch_size`: each batch's account numbers are decrypted together,
+    through `cache` when given, then handed to the bank concurrently.
+    Prints and returns the throughput and latency of every batch.
+    """
+    bank = bank or SimulatedBank()
+    cache = cache if cache is not None else DecryptCache()
+    report = []
+    for start in range(0, len(payments), batch_size):
+        batch = payments[start:start + batch_size]
+        began = time.perf_counter()
+        plain = decrypt_accounts([p["account_num"] for p in batch], cache)
+        decrypted = time.perf_counter()
+        for payment, account in zip(batch, plain):
+            payment["plain_account"] = account
+        results = asyncio.run(disburse_batch(batch, bank, concurrency))
+        stats = batch_stats(results, decrypted - began, time.perf_counter() - began)
+        stats.update(cache.stats())
+        print(
+            f"Batch {len(report) + 1}: {stats['transfers']} transfers ({stats['failed']} failed) "
+            f"in {stats['seconds']}s, {stats['transfers_per_sec']}/s, "
+            f"p50 {stats['latency_p50_ms']}ms, p95 {stats['latency_p95_ms']}ms; "
+            f"decrypt {stats['decrypt_ms']}ms, cache {stats['hits']} hits / {stats['misses']} misses"
+        )
+        report.append(stats)
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Disburse a payroll cycle to the simulated bank.")
+    parser.add_argument("--date", required=True, help="Pay date (YYYY-MM-DD) of the payroll_log rows.")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--latency", type=float, default=0.02, help="Simulated bank latency in seconds.")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    try:
+        payments = load_pay_cycle(conn, datetime.strptime(args.date, "%Y-%m-%d").date())
+    finally:
+        conn.close()
+    print(f"Disbursing {len(payments)} payments for {args.date}...")
+    disburse_payroll(payments, SimulatedBank(args.latency, seed=args.seed), args.concurrency, args.batch_size)
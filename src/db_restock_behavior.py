@@ -1,35 +1,22 @@
 from datetime import datetime, timedelta
-from db_config import get_db_connection
+from psycopg2.extras import execute_values
+from db_config import savepoint
+from db_sim_metrics import timed_stage
+from db_inventory import get_warehouse_status, apply_inventory_deltas
+from db_monthly_rollup import restock_deltas, record_flow
 
 # Define a fixed simulation start time (08:00 AM)
 SIMULATION_START_TIME = datetime.strptime("08:00", "%H:%M").time()
 
 # --- Get Warehouse Capacity ---
-def get_inventory_space(conn):
-    with conn.cursor() as cur:
-        cur.execute("""
-            SELECT capacity_pellets, current_pellets, to_be_received
-            FROM inventory
-            WHERE inventory_id = 1;
-        """)
-        return cur.fetchone()
-
-# --- Get Inventory Status ---
-def get_inventory_status(conn, product_id):
-    """
-    Returns four columns from the inventory table:
-       current_pellets, to_be_sent, to_be_received, capacity_pellets.
-    """
-    with conn.cursor() as cur:
-        cur.execute("""
-            SELECT current_pellets, to_be_sent, to_be_received, capacity_pellets
-            FROM inventory
-            WHERE inventory_id = 1;
-        """)
-        return cur.fetchone()
+def get_inventory_space(conn, state=None):
+    current, _, to_be_received, capacity = get_warehouse_status(conn, state)
+    return capacity, current, to_be_received
 
 # --- Get Pallet Cost ---
-def get_pallet_cost(conn, product_id):
+def get_pallet_cost(conn, product_id, state=None):
+    if state is not None:
+        return state.pallet_cost(product_id)
     with conn.cursor() as cur:
         cur.execute("""
             SELECT pallet_cost FROM product_pellets
@@ -40,7 +27,9 @@ def get_pallet_cost(conn, product_id):
         return float(result[0]) if result is not None and result[0] is not None else 0.0
 
 # --- Get Default Weight ---
-def get_product_weight(conn, product_id):
+def get_product_weight(conn, product_id, state=None):
+    if state is not None:
+        return state.product_weight(product_id)
     with conn.cursor() as cur:
         cur.execute("""
             SELECT AVG(weight) FROM product_pellet
@@ -50,111 +39,172 @@ def get_product_weight(conn, product_id):
         # Fallback to 30.0
         return float(result[0]) if result is not None and result[0] is not None else 30.0
 
-# --- Unload Supplier Delivery (Single-Product Mode) ---
-def unload_supplier_delivery(conn, delivery, current_date):
+# --- Product Details for a Batch ---
+def get_receiving_details(conn, product_ids, state=None):
     """
-    Processes a pending supplier delivery for a single product.
-    
-    Expects a supplier_delivery record with 6 columns:
-      (transaction_id, product_id, quantity_received, cost, weight, delivery_date)
-    
-    Steps:
-      1. Mark the supplier_delivery record as 'received'.
-      2. Retrieve product details (name, category) from product_pellets.
-      3. For each delivered unit, insert one product_pellet record with:
-            - cost from get_pallet_cost (unit cost)
-            - weight from get_product_weight (unit weight)
-            - received = current_date
-            - sell_by = current_date + 50 days.
-         Collect the returned pellet IDs.
-      4. Update the inventory: Increase current_pellets by delivered quantity and 
-         decrease to_be_received (clamped at 0).
-      5. Log a supplier_delivery transaction with cost calculated as:
-               cost = get_pallet_cost(conn, product_id) * quantity.
-      6. Return a summary dictionary.
+    Returns {product_id: (name, category, unit_cost, unit_weight)} for every
+    product in `product_ids`, computed once per batch instead of once per pellet.
     """
-    delivery_id, product_id, quantity, _, weight, _ = delivery
-    # Compute cost dynamically.
-    computed_cost = get_pallet_cost(conn, product_id) * quantity
-    
+    product_ids = sorted(set(product_ids))
+    if state is not None and all(pid in state.products for pid in product_ids):
+        return {
+            pid: (
+                state.products[pid]["name"],
+                state.products[pid]["category"],
+                state.pallet_cost(pid),
+                state.product_weight(pid),
+            )
+            for pid in product_ids
+        }
     with conn.cursor() as cur:
-        # Mark delivery as received.
-        cur.execute("""
-            UPDATE supplier_delivery
-            SET status = 'received', order_received = %s
-            WHERE transaction_id = %s;
-        """, (current_date, delivery_id))
-        
-        # Retrieve product details.
         cur.execute("""
-            SELECT name, category FROM product_pellets
-            WHERE product_id = %s;
-        """, (product_id,))
-        row = cur.fetchone()
-        if row:
-            name, category = row
-        else:
-            raise Exception(f"Product details not found for product_id {product_id} in delivery {delivery_id}")
-
-        pellet_ids = []
-        for _ in range(quantity):
-            cur.execute("""
-                INSERT INTO product_pellet (
-                    name, category, cost, weight, received,
-                    sell_by, refrigerated, sent
-                ) VALUES (%s, %s, %s, %s, %s, %s, FALSE, FALSE)
-                RETURNING pellet_id;
-            """, (
+            SELECT p.product_id, p.name, p.category, p.pallet_cost, w.avg_weight
+            FROM product_pellets p
+            LEFT JOIN LATERAL (
+                SELECT AVG(weight) AS avg_weight
+                FROM product_pellet
+                WHERE name = p.name
+            ) w ON TRUE
+            WHERE p.product_id = ANY(%s);
+        """, (product_ids,))
+        return {
+            pid: (
                 name,
                 category,
-                get_pallet_cost(conn, product_id),
-                get_product_weight(conn, product_id),
-                current_date,
-                current_date + timedelta(days=50)
-            ))
-            pellet_id = cur.fetchone()[0]
-            pellet_ids.append(pellet_id)
-        
-        # Update inventory.
+                float(cost) if cost is not None else 0.0,
+                float(avg_weight) if avg_weight is not None else 30.0,
+            )
+            for pid, name, category, cost, avg_weight in cur.fetchall()
+        }
+
+# --- Receive Supplier Deliveries (Batch Mode) ---
+def receive_supplier_deliveries(conn, deliveries, current_date, state=None):
+    """
+    Receives a batch of pending supplier deliveries at once.
+
+    Expects supplier_delivery records with 6 columns:
+      (transaction_id, product_id, quantity_received, cost, weight, delivery_date)
+
+    Steps:
+      1. Look up name, category, unit cost and unit weight once per product.
+      2. Reserve pellet ids for every delivered unit from the pellet_id sequence.
+      3. Insert all pellets in one multi-row INSERT
+         (received = current_date, sell_by = current_date + 50 days).
+      4. Mark all deliveries 'received' in one UPDATE.
+      5. Update the per-product inventory once for the whole batch.
+      6. Log one supplier_delivery transaction per delivery in one INSERT.
+      7. Add the received quantities to the monthly rollup.
+
+    Deliveries whose product is unknown stay pending. Returns a summary per
+    delivery id with the pellet ids in insertion order.
+    """
+    details = get_receiving_details(conn, [d[1] for d in deliveries], state)
+    accepted = [d for d in deliveries if d[1] in details and d[2] and d[2] > 0]
+    if not accepted:
+        return {}
+
+    total_quantity = sum(d[2] for d in accepted)
+    received = current_date
+    sell_by = current_date + timedelta(days=50)
+
+    with conn.cursor() as cur:
         cur.execute("""
-            UPDATE inventory
-            SET current_pellets = current_pellets + %s,
-                to_be_received = GREATEST(to_be_received - %s, 0)
-            WHERE inventory_id = 1;
-        """, (quantity, quantity))
-        # Log transaction using the computed cost.
+            SELECT nextval(pg_get_serial_sequence('product_pellet', 'pellet_id'))
+            FROM generate_series(1, %s);
+        """, (total_quantity,))
+        new_ids = [r[0] for r in cur.fetchall()]
+
+        pellet_rows = []
+        summaries = {}
+        offset = 0
+        for delivery_id, product_id, quantity, _, weight, _ in accepted:
+            name, category, unit_cost, unit_weight = details[product_id]
+            pellet_ids = new_ids[offset:offset + quantity]
+            offset += quantity
+            pellet_rows.extend(
+                (pellet_id, name, category, unit_cost, unit_weight, received, sell_by, False, False)
+                for pellet_id in pellet_ids
+            )
+            summaries[delivery_id] = {
+                "delivered_dict": {str(product_id): pellet_ids},
+                "total_quantity": quantity,
+                "total_cost": unit_cost * quantity,
+                "total_weight": (weight if weight is not None else unit_weight) * quantity
+            }
+
+        execute_values(cur, """
+            INSERT INTO product_pellet (
+                pellet_id, name, category, cost, weight, received,
+                sell_by, refrigerated, sent
+            ) VALUES %s;
+        """, pellet_rows, page_size=len(pellet_rows))
+
         cur.execute("""
-            INSERT INTO transactions (type, cost, date, date_time)
-            VALUES ('supplier_delivery', %s, %s, %s);
-        """, (computed_cost, current_date, current_date))
-    conn.commit()
-    
-    return {
-        "delivered_dict": {str(product_id): pellet_ids},
-        "total_quantity": quantity,
-        "total_cost": computed_cost,
-        "total_weight": (weight if weight is not None else get_product_weight(conn, product_id)) * quantity
-    }
-
-def unload_supplier_deliveries(current_date):
+            UPDATE supplier_delivery
+            SET status = 'received', order_received = %s
+            WHERE transaction_id = ANY(%s);
+        """, (current_date, [d[0] for d in accepted]))
+
+        execute_values(cur, """
+            INSERT INTO transactions (type, cost, date, date_time) VALUES %s;
+        """, [
+            ('supplier_delivery', summaries[d[0]]["total_cost"], current_date, current_date)
+            for d in accepted
+        ], page_size=len(accepted))
+
+    if state is not None:
+        for _, product_id, quantity, _, _, _ in accepted:
+            state.record_receipt(product_id, quantity)
+            state.adjust_pellet_stock(details[product_id][0], quantity)
+    else:
+        received_by_product = {}
+        for _, product_id, quantity, _, _, _ in accepted:
+            received_by_product[product_id] = received_by_product.get(product_id, 0) + quantity
+        apply_inventory_deltas(conn, {pid: (q, 0, -q) for pid, q in received_by_product.items()})
+    record_flow(conn, restock_deltas([(d[1], d[2], d[5]) for d in accepted]), state)
+
+    return summaries
+
+# --- Unload Supplier Delivery (Single-Product Mode) ---
+def unload_supplier_delivery(conn, delivery, current_date, state=None):
     """
-    Processes all pending supplier deliveries in single-product mode.
+    Processes a single pending supplier delivery through the batch path.
+    """
+    delivery_id, product_id = delivery[0], delivery[1]
+    summaries = receive_supplier_deliveries(conn, [delivery], current_date, state)
+    if delivery_id not in summaries:
+        raise Exception(f"Product details not found for product_id {product_id} in delivery {delivery_id}")
+    return summaries[delivery_id]
+
+@timed_stage
+def unload_supplier_deliveries(conn, current_date, state=None):
+    """
+    Receives every pending supplier delivery of the day as one batch. If
+    the batch fails, each delivery is received on its own savepoint, so a
+    bad delivery stays pending without holding back the others.
     """
-    conn = get_db_connection()
     with conn.cursor() as cur:
         cur.execute("""
             SELECT transaction_id, product_id, quantity_received, cost, weight, date_time
             FROM supplier_delivery
             WHERE status = 'pending'
-            ORDER BY date_time ASC;
+            ORDER BY date_time ASC, transaction_id ASC;
         """)
         deliveries = cur.fetchall()
-    
+    if not deliveries:
+        return {}
+
+    try:
+        with savepoint(conn, "supplier_delivery"):
+            return receive_supplier_deliveries(conn, deliveries, current_date, state)
+    except Exception as e:
+        print(f"Error receiving supplier deliveries on {current_date}: {e}; receiving them one by one.")
+
+    summaries = {}
     for delivery in deliveries:
         try:
-            summary = unload_supplier_delivery(conn, delivery, current_date)
-            #print(f"Processed delivery {delivery[0]} on {current_date}. Summary: {summary}")
+            with savepoint(conn, "supplier_delivery"):
+                summaries.update(receive_supplier_deliveries(conn, [delivery], current_date, state))
         except Exception as e:
-            conn.rollback()
-            #print(f"Error processing delivery {delivery[0]} on {current_date}: {e}")
-            continue
+            print(f"Error processing supplier delivery {delivery[0]}: {e}")
+    return summaries
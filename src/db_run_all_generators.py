@@ -1,14 +1,115 @@
+import argparse
 import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from db_generate_employee import generate_employees
+from db_generate_store import generate_stores
+from db_generate_product_pellets import generate_product_pellets
+from db_generate_truck import generate_trucks
+from db_generate_product_pellet import generate_product_pellet
+from db_generate_supplier import generate_suppliers
+from db_generate_inventory import generate_inventory
+from db_generate_pending_orders import generate_pending_orders
 
-print("Running all data generators...")
+DATA_DIR = "generated_data"
 
-os.system("python3 db_generate_employee.py")
-os.system("python3 db_generate_store.py")
-os.system("python3 db_generate_truck.py")
-os.system("python3 db_generate_product_pellets.py")
-os.system("python3 db_generate_product_pellet.py")
-os.system("python3 db_generate_supplier.py")
-os.system("python3 db_generate_inventory.py")
-os.system("python3 db_generate_inventory_delivery.py")
+# --- Pipeline Definition ---
+# name -> (generator, upstream datasets passed positionally, scale parameters, output CSV)
+PIPELINE = {
+    "employees": (generate_employees, [], lambda p: {"drivers": p["drivers"]}, "employees.csv"),
+    "stores": (generate_stores, [], lambda p: {"num_stores": p["stores"]}, "stores.csv"),
+    "product_pellets": (generate_product_pellets, [], lambda p: {"num_products": p["products"]}, "product_pellets.csv"),
+    "trucks": (generate_trucks, ["employees"], lambda p: {"num_trucks": p["drivers"]}, "trucks.csv"),
+    "product_pellet": (generate_product_pellet, ["product_pellets"], lambda p: {"scale": p["pellets"]}, "product_pellet.csv"),
+    "suppliers": (generate_suppliers, ["product_pellets"], lambda p: {}, "suppliers.csv"),
+    "inventory": (generate_inventory, ["product_pellets"], lambda p: {"pellet_scale": p["pellets"]}, "inventory.csv"),
+    "pending_orders": (generate_pending_orders, ["product_pellets", "stores"], lambda p: {}, "pending_orders.csv"),
+}
 
-print("All CSVs generated.")
+# Generators without a seed argument.
+UNSEEDED = {"inventory"}
+
+def _run_step(name, inputs, kwargs):
+    generator = PIPELINE[name][0]
+    return generator(*inputs, **kwargs)
+
+def step_seed(seed, name):
+    """
+    Derives a per-generator seed so parallel runs stay reproducible.
+    """
+    if seed is None:
+        return None
+    return seed * 1000 + list(PIPELINE).index(name)
+
+def check_exclusions(exclude):
+    """
+    Raises ValueError if `exclude` names an unknown dataset or one that a
+    dataset still to be generated takes as input; the scheduler would
+    otherwise wait forever for it.
+    """
+    unknown = sorted(set(exclude) - set(PIPELINE))
+    if unknown:
+        raise ValueError(f"Unknown datasets in exclude: {', '.join(unknown)}.")
+    for name, (_, inputs, _, _) in PIPELINE.items():
+        missing = [dep for dep in inputs if dep in exclude]
+        if name not in exclude and missing:
+            raise ValueError(
+                f"Cannot exclude {', '.join(missing)}: {name} is generated from it. Exclude {name} as well."
+            )
+
+# --- Run the Pipeline ---
+def run_pipeline(stores=30, products=50, drivers=10, pellets=1.0, seed=None,
+                 output_dir=DATA_DIR, write_csv=True, max_workers=None, exclude=()):
+    """
+    Runs every generator in dependency order inside one process pool and
+    returns {dataset name: DataFrame}. Generators whose inputs are ready run
+    in parallel (stores, employees and products first), and DataFrames are
+    handed downstream in memory instead of through CSV files.
+
+    `stores`, `products` and `drivers` set the row counts; `pellets` scales
+    the pellet quantities. With write_csv the datasets are also saved to
+    `output_dir` under the usual file names. Datasets named in `exclude` are
+    skipped; see check_exclusions.
+    """
+    check_exclusions(exclude)
+    params = {"stores": stores, "products": products, "drivers": drivers, "pellets": pellets}
+    results = {}
+    pending = {name: step for name, step in PIPELINE.items() if name not in exclude}
+    running = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            for name, (_, inputs, scale, _) in list(pending.items()):
+                if all(dep in results for dep in inputs):
+                    kwargs = scale(params)
+                    if name not in UNSEEDED:
+                        kwargs["seed"] = step_seed(seed, name)
+                    future = executor.submit(_run_step, name, [results[dep] for dep in inputs], kwargs)
+                    running[future] = name
+                    del pending[name]
+            if not running:
+                raise RuntimeError(f"No runnable generator left for: {', '.join(pending)}.")
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                results[name] = future.result()
+                print(f"Generated {name}: {len(results[name])} rows.")
+
+    if write_csv:
+        os.makedirs(output_dir, exist_ok=True)
+        for name, df in results.items():
+            # product_pellet carries its pellet_id as the index.
+            df.to_csv(os.path.join(output_dir, PIPELINE[name][3]), index=name == "product_pellet")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate every seed dataset.")
+    parser.add_argument("--stores", type=int, default=30)
+    parser.add_argument("--products", type=int, default=50)
+    parser.add_argument("--drivers", type=int, default=10)
+    parser.add_argument("--pellets", type=float, default=1.0, help="Scale factor on pellet quantities.")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--workers", type=int, help="Size of the process pool.")
+    args = parser.parse_args()
+
+    print("Running all data generators...")
+    run_pipeline(args.stores, args.products, args.drivers, args.pellets, args.seed, max_workers=args.workers)
+    print("All CSVs generated.")
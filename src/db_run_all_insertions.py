@@ -33,36 +33,41 @@ def get_db_connection():
         port="5432"
     )
 
-def run_all_insertions():
+def run_all_insertions(method="copy"):
+    """
+    Loads every generated CSV into the database.
+    method="copy" streams each table through COPY FROM STDIN;
+    method="values" uses execute_values batches instead.
+    """
     conn = get_db_connection()
 
     print("Inserting employees...")
     df = pd.read_csv(paths["employees"])
-    insert_employees(conn, df)
+    insert_employees(conn, df, method=method)
 
     print("Inserting trucks...")
     df = pd.read_csv(paths["trucks"])
-    insert_trucks(conn, df)
+    insert_trucks(conn, df, method=method)
 
     print("Inserting stores...")
     df = pd.read_csv(paths["stores"])
-    insert_stores(conn, df)
+    insert_stores(conn, df, method=method)
 
     print("Inserting product pellets summary...")
     df = pd.read_csv(paths["product_pellets"])
-    insert_product_pellets(conn, df)
+    insert_product_pellets(conn, df, method=method)
 
     print("Inserting individual product pellets...")
     df = pd.read_csv(paths["product_pellet"])
-    insert_product_pellet(conn, df)
+    insert_product_pellet(conn, df, method=method)
 
     print("Inserting suppliers...")
     df = pd.read_csv(paths["suppliers"])
-    insert_suppliers(conn, df)
+    insert_suppliers(conn, df, method=method)
 
     print("Inserting inventory...")
     df = pd.read_csv(paths["inventory"])
-    insert_inventory(conn, df)
+    insert_inventory(conn, df, method=method)
 
     conn.close()
     print("All data inserted successfully.")
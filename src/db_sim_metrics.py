@@ -0,0 +1,243 @@
+import argparse
+import functools
+import json
+import re
+import time
+from contextlib import contextmanager
+import psycopg2.extensions
+
+# Statements counted as writes; their rowcount goes to rows_written.
+_WRITE_STATEMENT = re.compile(r"\b(INSERT|UPDATE|DELETE|COPY)\b", re.IGNORECASE)
+UNSTAGED = "other"
+COMMIT = "commit"
+FIELDS = ("calls", "wall_ms", "queries", "rows_written", "commits")
+
+# --- Recorder ---
+class SimMetrics:
+    """
+    Per-stage counters of the simulated day being recorded. Nothing is
+    counted outside start_day()/end_day(), so instrumented code costs one
+    attribute check when profiling is off.
+    """
+
+    def __init__(self):
+        self.day = None
+        self.stages = {}
+        self.active = None
+
+    def _stage(self, name):
+        counters = self.stages.get(name)
+        if counters is None:
+            counters = self.stages[name] = dict.fromkeys(FIELDS, 0)
+        return counters
+
+    def record_query(self, query, rowcount, statements=1):
+        if self.day is None:
+            return
+        counters = self._stage(self.active or UNSTAGED)
+        counters["queries"] += statements
+        if isinstance(query, bytes):
+            query = query.decode(errors="ignore")
+        if isinstance(query, str) and rowcount > 0 and _WRITE_STATEMENT.search(query):
+            counters["rows_written"] += rowcount
+
+    def record_commit(self, seconds):
+        if self.day is None:
+            return
+        counters = self._stage(COMMIT)
+        counters["calls"] += 1
+        counters["commits"] += 1
+        counters["wall_ms"] += seconds * 1000
+
+METRICS = SimMetrics()
+
+def start_day(day):
+    METRICS.day = day
+    METRICS.stages = {}
+    METRICS.active = None
+
+def end_day():
+    """
+    Stops recording and returns {stage: counters} for the day.
+    """
+    stages = METRICS.stages
+    METRICS.day = None
+    METRICS.stages = {}
+    METRICS.active = None
+    return stages
+
+# --- Stages ---
+@contextmanager
+def stage(name):
+    """
+    Attributes the wall time and statements of the block to stage `name`.
+    Nested stages are folded into the outermost one.
+    """
+    if METRICS.day is None or METRICS.active is not None:
+        yield
+        return
+    METRICS.active = name
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        counters = METRICS._stage(name)
+        counters["calls"] += 1
+        counters["wall_ms"] += (time.perf_counter() - started) * 1000
+        METRICS.active = None
+
+def timed_stage(func):
+    """
+    Decorator recording every call of a simulation step as a stage named
+    after the function.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with stage(func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
+
+# --- psycopg2 Wrappers ---
+# db_config builds every connection with these, so this module keeps its
+# top-level imports light: pandas is only loaded by the report functions.
+class MetricsCursor(psycopg2.extensions.cursor):
+    """
+    Cursor that reports every statement (and the rows it wrote) to the
+    recorder.
+    """
+
+    def execute(self, query, vars=None):
+        result = super().execute(query, vars)
+        METRICS.record_query(query, self.rowcount)
+        return result
+
+    def executemany(self, query, vars_list):
+        vars_list = list(vars_list)
+        result = super().executemany(query, vars_list)
+        METRICS.record_query(query, self.rowcount, len(vars_list))
+        return result
+
+    def copy_expert(self, sql, file, size=8192):
+        result = super().copy_expert(sql, file, size)
+        METRICS.record_query(sql, self.rowcount)
+        return result
+
+class MetricsConnection(psycopg2.extensions.connection):
+    """
+    Connection whose cursors are MetricsCursors and whose commits are timed.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cursor_factory = MetricsCursor
+
+    def commit(self):
+        started = time.perf_counter()
+        super().commit()
+        METRICS.record_commit(time.perf_counter() - started)
+
+# --- Storage ---
+def ensure_sim_metrics_table(conn):
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS sim_metrics (
+                run_id TEXT,
+                date DATE,
+                stage TEXT,
+                calls INT,
+                wall_ms FLOAT,
+                queries INT,
+                rows_written INT,
+                commits INT,
+                PRIMARY KEY (run_id, date, stage)
+            );
+        """)
+
+def _records(run_id, day, stages):
+    return [
+        {"run_id": run_id, "date": str(day), "stage": name, **{f: counters[f] for f in FIELDS}}
+        for name, counters in sorted(stages.items())
+    ]
+
+def save_day_metrics(conn, run_id, day, stages):
+    """
+    Writes one sim_metrics row per stage of `day`, replacing the rows of a
+    re-run day. Does not commit.
+    """
+    from psycopg2.extras import execute_values
+    rows = [tuple(r.values()) for r in _records(run_id, day, stages)]
+    if not rows:
+        return
+    with conn.cursor() as cur:
+        execute_values(cur, """
+            INSERT INTO sim_metrics (run_id, date, stage, calls, wall_ms, queries, rows_written, commits)
+            VALUES %s
+            ON CONFLICT (run_id, date, stage) DO UPDATE SET
+                calls = EXCLUDED.calls,
+                wall_ms = EXCLUDED.wall_ms,
+                queries = EXCLUDED.queries,
+                rows_written = EXCLUDED.rows_written,
+                commits = EXCLUDED.commits;
+        """, rows, page_size=len(rows))
+
+def append_day_metrics(path, run_id, day, stages):
+    with open(path, "a") as f:
+        for record in _records(run_id, day, stages):
+            f.write(json.dumps(record) + "\n")
+
+def load_metrics(conn=None, path=None, run_id=None):
+    """
+    Returns the recorded metrics as a DataFrame, from the sim_metrics table
+    (`conn`) or a JSONL file (`path`), optionally for one run only.
+    """
+    import pandas as pd
+    if path is not None:
+        df = pd.read_json(path, lines=True, dtype={"date": str})
+    else:
+        with conn.cursor() as cur:
+            cur.execute("SELECT * FROM sim_metrics;")
+            df = pd.DataFrame(cur.fetchall(), columns=[c[0] for c in cur.description])
+    if run_id is not None:
+        df = df[df["run_id"] == run_id]
+    return df
+
+# --- Report ---
+def metrics_report(df, top=10):
+    """
+    Ranks stages by cumulative wall time: total seconds, share of the run,
+    mean and p95 per day, and statement, row and commit totals.
+    """
+    import pandas as pd
+    if df.empty:
+        return pd.DataFrame()
+    grouped = df.groupby("stage")
+    report = pd.DataFrame({
+        "total_s": grouped["wall_ms"].sum() / 1000,
+        "days": grouped["date"].nunique(),
+        "mean_ms": grouped["wall_ms"].mean(),
+        "p95_ms": grouped["wall_ms"].quantile(0.95),
+        "queries": grouped["queries"].sum(),
+        "rows_written": grouped["rows_written"].sum(),
+        "commits": grouped["commits"].sum(),
+    })
+    report["share_pct"] = 100 * report["total_s"] / report["total_s"].sum()
+    report = report.sort_values("total_s", ascending=False).head(top)
+    return report.round(2)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report the slowest simulation stages.")
+    parser.add_argument("--jsonl", help="Read metrics from this JSONL file instead of sim_metrics.")
+    parser.add_argument("--run-id", help="Only report this simulation run.")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.jsonl:
+        df = load_metrics(path=args.jsonl, run_id=args.run_id)
+    else:
+        from db_config import get_db_connection
+        conn = get_db_connection()
+        try:
+            df = load_metrics(conn, run_id=args.run_id)
+        finally:
+            conn.close()
+    print(metrics_report(df, args.top).to_string())
@@ -1,10 +1,16 @@
 from datetime import datetime, timedelta
 import random
-from db_config import get_db_connection
+from db_config import day_session
 from db_payroll_behavior import process_payrolls
-from db_order_behavior import fulfill_orders, request_resupply, get_inventory_status, update_truck_status
+from db_order_behavior import request_resupply, update_truck_status
 from db_restock_behavior import unload_supplier_deliveries
+from db_fulfillment_engine import fulfill_orders
+from db_expiry_sweeper import sweep_expired_pellets, log_waste
+from db_partitioning import ensure_month_partitions
+from db_inventory import get_inventory_status, product_ids_by_name, apply_inventory_deltas
+from db_sim_metrics import stage, timed_stage
 
+@timed_stage
 def reset_product_pellet_sequence(conn):
     with conn.cursor() as cur:
         cur.execute("SELECT MAX(pellet_id) FROM product_pellet;")
@@ -12,61 +18,80 @@ def reset_product_pellet_sequence(conn):
         if max_val is None:
             max_val = 0
         cur.execute("SELECT setval(pg_get_serial_sequence('product_pellet', 'pellet_id'), %s, true);", (max_val,))
-    conn.commit()
 
-def reset_trucks_from_previous_maintenance(current_date):
+@timed_stage
+def reset_trucks_from_previous_maintenance(conn, current_date, state=None):
     """
     For trucks whose operational_status is 'maintenance' from yesterday,
     update their status to 'available' (leaving last_maintanance as yesterday).
     """
-    conn = get_db_connection()
     yesterday = current_date - timedelta(days=1)
+    if state is not None:
+        for truck in state.trucks.values():
+            if truck["operational_status"] == 'maintenance' and truck["last_maintanance"] == yesterday:
+                state.set_truck_status(truck["truck_id"], 'available')
+        return
     with conn.cursor() as cur:
         cur.execute("""
             UPDATE truck
             SET operational_status = 'available'
             WHERE operational_status = 'maintenance' AND last_maintanance = %s;
         """, (yesterday,))
-    conn.commit()
-    conn.close()
 
-def get_current_gas_price(conn):
+def get_current_gas_price(conn, state=None):
+    if state is not None:
+        return state.gas_price
     with conn.cursor() as cur:
         cur.execute("SELECT value FROM system_config WHERE key = 'current_gas_price';")
         result = cur.fetchone()
         return float(result[0]) if result is not None and result[0] is not None else 3.0
 
-def update_gas_price(conn):
-    current_price = get_current_gas_price(conn)
-    multiplier = random.uniform(0.99, 1.01)
+@timed_stage
+def update_gas_price(conn, state=None):
+    current_price = get_current_gas_price(conn, state)
+    # Scenario runs can bias the daily random walk up or down.
+    drift = state.scenario.get("gas_price_drift", 0.0) if state is not None else 0.0
+    multiplier = random.uniform(0.99 + drift, 1.01 + drift)
     new_price = round(current_price * multiplier, 3)
+    if state is not None:
+        state.set_gas_price(new_price)
+        return
     with conn.cursor() as cur:
         cur.execute("""
             INSERT INTO system_config (key, value)
             VALUES ('current_gas_price', %s)
             ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value;
         """, (new_price,))
-    conn.commit()
 
-def discard_expired_products(current_date):
-    conn = get_db_connection()
-    with conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT COUNT(*) FROM product_pellet
-                WHERE sell_by IS NOT NULL AND sell_by < %s AND sent = FALSE;
-            """, (current_date,))
-            count = cur.fetchone()[0]
-            if count > 0:
-                print(f"{count} expired products removed from inventory on {current_date}")
-            cur.execute("""
-                DELETE FROM product_pellet
-                WHERE sell_by IS NOT NULL AND sell_by < %s AND sent = FALSE;
-            """, (current_date,))
-    conn.commit()
+@timed_stage
+def discard_expired_products(conn, current_date, state=None):
+    """
+    Removes expired unsent pellets in bounded batches, records them in
+    waste_log and takes them off each product's current_pellets.
+    """
+    expired = sweep_expired_pellets(conn, current_date)
+    count = sum(e["pellets"] for e in expired.values())
+    if count > 0:
+        print(f"{count} expired products removed from inventory on {current_date}")
+    log_waste(conn, current_date, expired)
+    product_ids = product_ids_by_name(conn, state)
+    expired_by_product = {product_ids[name]: e["pellets"] for name, e in expired.items() if name in product_ids}
+    if state is not None:
+        for name, e in expired.items():
+            state.adjust_pellet_stock(name, -e["pellets"])
+        for product_id, pellets in expired_by_product.items():
+            state.record_expiry(product_id, pellets)
+    else:
+        apply_inventory_deltas(conn, {pid: (-pellets, 0, 0) for pid, pellets in expired_by_product.items()})
 
-def check_all_trucks_maintenance(current_date):
-    conn = get_db_connection()
+@timed_stage
+def check_all_trucks_maintenance(conn, current_date, state=None):
+    if state is not None:
+        for truck in state.trucks.values():
+            last_maintanance = truck["last_maintanance"]
+            if last_maintanance is not None and (current_date - last_maintanance).days >= 200:
+                state.start_truck_maintenance(truck["truck_id"], current_date)
+        return
     with conn.cursor() as cur:
         cur.execute("SELECT truck_id, last_maintanance FROM truck;")
         trucks = cur.fetchall()
@@ -78,109 +103,138 @@ def check_all_trucks_maintenance(current_date):
                         last_maintanance = %s
                     WHERE truck_id = %s;
                 """, (current_date, truck_id))
-    conn.commit()
 
-def auto_restock_low_inventory(current_date):
-    conn = get_db_connection()
-    with conn.cursor() as cur:
-        cur.execute("SELECT product_id FROM product_pellets;")
-        product_ids = [row[0] for row in cur.fetchall()]
+@timed_stage
+def auto_restock_low_inventory(conn, current_date, state=None):
+    if state is not None:
+        product_ids = list(state.products)
+    else:
+        with conn.cursor() as cur:
+            cur.execute("SELECT product_id FROM product_pellets;")
+            product_ids = [row[0] for row in cur.fetchall()]
     for product_id in product_ids:
-        current, _, incoming, capacity = get_inventory_status(conn, product_id)
+        current, _, incoming, capacity = get_inventory_status(conn, product_id, state)
         if current < 300:
             needed = 500 - current
-            request_resupply(conn, product_id, needed, current_date)
-    conn.commit()
+            request_resupply(conn, product_id, needed, current_date, state)
 
-def refill_truck_fuel(current_date):
+@timed_stage
+def refill_truck_fuel(conn, current_date, state=None):
     from db_fuel_behavior import add_fuel_log
-    conn = get_db_connection()
-    gas_price = get_current_gas_price(conn)
-    with conn:
-        with conn.cursor() as cur:
+    gas_price = get_current_gas_price(conn, state)
+    with conn.cursor() as cur:
+        # fuel_level is maintained by add_fuel_log / refuel_truck_after_delivery,
+        # so this is one read per truck instead of a SUM over fuel_log.
+        if state is not None:
+            trucks = [(t["truck_id"], t["fuel_capacity"], t["fuel_level"]) for t in state.available_trucks()]
+        else:
             cur.execute("""
-                SELECT truck_id, fuel_capacity, km_driven FROM truck
+                SELECT truck_id, fuel_capacity, fuel_level FROM truck
                 WHERE operational_status = 'available';
             """)
-            for truck_id, capacity, km_driven in cur.fetchall():
-                cur.execute("SELECT SUM(liters) FROM fuel_log WHERE truck_id = %s;", (truck_id,))
-                filled = cur.fetchone()[0] or 0
-                fuel_level = filled % capacity
-                # Refuel if fuel is less than 25% of capacity, without monthly constraint.
-                if fuel_level / capacity < 0.25:
-                    refill = random.uniform(capacity * 0.5, capacity - fuel_level)
-                    cost = round(refill * gas_price, 2)
-                    add_fuel_log(truck_id, 1, cost, refill, gas_price, cost, current_date)
-    conn.commit()
+            trucks = cur.fetchall()
+        for truck_id, capacity, fuel_level in trucks:
+            fuel_level = fuel_level or 0
+            # Refuel if fuel is less than 25% of capacity, without monthly constraint.
+            if fuel_level / capacity < 0.25:
+                refill = random.uniform(capacity * 0.5, capacity - fuel_level)
+                cost = round(refill * gas_price, 2)
+                add_fuel_log(conn, truck_id, 1, cost, refill, gas_price, cost, current_date, state)
 
-def reset_available_trucks(current_date):
-    conn = get_db_connection()
-    with conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                UPDATE truck
-                SET operational_status = 'available'
-                WHERE truck_id IN (
-                    SELECT truck_sent FROM inventory_delivery
-                    WHERE time_returned <= %s
-                )
-            """, (datetime.combine(current_date, datetime.max.time()),))
-    conn.commit()
+@timed_stage
+def reset_available_trucks(conn, current_date, state=None):
+    if state is not None:
+        # Every recorded delivery completes on the day it is scheduled, so the
+        # trucks with a returned delivery are exactly the ones ever dispatched.
+        for truck_id in state.dispatched_trucks:
+            state.set_truck_status(truck_id, 'available')
+        return
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE truck
+            SET operational_status = 'available'
+            WHERE truck_id IN (
+                SELECT truck_sent FROM inventory_delivery
+                WHERE time_returned <= %s
+            )
+        """, (datetime.combine(current_date, datetime.max.time()),))
 
-def place_new_orders(current_date):
+@timed_stage
+def place_new_orders(conn, current_date, state=None):
     import json
-    conn = get_db_connection()
-    with conn:
-        with conn.cursor() as cur:
+    with conn.cursor() as cur:
+        if state is not None:
+            store_ids = list(state.stores)
+            products = [(pid, p["pallet_cost"]) for pid, p in state.products.items()]
+        else:
             cur.execute("SELECT store_id FROM store;")
             store_ids = [r[0] for r in cur.fetchall()]
             cur.execute("SELECT product_id, pallet_cost FROM product_pellets;")
             products = cur.fetchall()
-            order_count = random.randint(10, 20)
-            for _ in range(order_count):
-                store_id = random.choice(store_ids)
-                num_products = random.randint(1, 3)
-                selected = random.sample(products, num_products)
-                total_qty = 0
-                items = []
-                for prod_id, cost in selected:
-                    max_qty = min(150 - total_qty, random.randint(10, 80))
-                    if max_qty <= 0:
-                        break
-                    qty = random.randint(1, max_qty)
-                    total_qty += qty
-                    items.append({
-                        "product_id": prod_id,
-                        "quantity": qty,
-                        "weight": random.uniform(20.0, 50.0),
-                        "refrigerated": False
-                    })
-                if items:
-                    cur.execute("""
-                        INSERT INTO pending_orders (store_id, products, date_time)
-                        VALUES (%s, %s, %s);
-                    """, (store_id, json.dumps(items), current_date))
-    conn.commit()
+        order_count = random.randint(10, 20)
+        if state is not None and "order_volume" in state.scenario:
+            order_count = max(0, round(order_count * state.scenario["order_volume"]))
+        for _ in range(order_count):
+            store_id = random.choice(store_ids)
+            num_products = random.randint(1, 3)
+            selected = random.sample(products, num_products)
+            total_qty = 0
+            items = []
+            for prod_id, cost in selected:
+                max_qty = min(150 - total_qty, random.randint(10, 80))
+                if max_qty <= 0:
+                    break
+                qty = random.randint(1, max_qty)
+                total_qty += qty
+                items.append({
+                    "product_id": prod_id,
+                    "quantity": qty,
+                    "weight": random.uniform(20.0, 50.0),
+                    "refrigerated": False
+                })
+            if items:
+                cur.execute("""
+                    INSERT INTO pending_orders (store_id, products, date_time)
+                    VALUES (%s, %s, %s);
+                """, (store_id, json.dumps(items), current_date))
+
+def run_daily_activities(conn, current_date, state=None):
+    """
+    Runs every stage of one simulated day on `conn` without committing.
+    When a SimulationState is given, reference data and mutable counters come
+    from memory and are flushed once at the end of the day.
+    """
+    # Make sure this month's log partitions exist before anything is logged.
+    ensure_month_partitions(conn, current_date)
 
-def simulate_daily_activities(current_date):
     # Reset product_pellet sequence to avoid duplicate key errors.
-    conn = get_db_connection()
     reset_product_pellet_sequence(conn)
-    conn.close()
     
     # Reset trucks from previous day maintenance.
-    reset_trucks_from_previous_maintenance(current_date)
+    reset_trucks_from_previous_maintenance(conn, current_date, state)
     
-    discard_expired_products(current_date)
-    auto_restock_low_inventory(current_date)
-    update_gas_price(get_db_connection())
-    process_payrolls(current_date)
-    reset_available_trucks(current_date)
-    refill_truck_fuel(current_date)
-    check_all_trucks_maintenance(current_date)
-    place_new_orders(current_date)
-    unload_supplier_deliveries(current_date)  # Process restock orders.
-    fulfill_orders(current_date)
+    discard_expired_products(conn, current_date, state)
+    auto_restock_low_inventory(conn, current_date, state)
+    update_gas_price(conn, state)
+    process_payrolls(conn, current_date)
+    reset_available_trucks(conn, current_date, state)
+    refill_truck_fuel(conn, current_date, state)
+    check_all_trucks_maintenance(conn, current_date, state)
+    place_new_orders(conn, current_date, state)
+    unload_supplier_deliveries(conn, current_date, state)  # Process restock orders.
+    fulfill_orders(conn, current_date, state)
+
+    if state is not None:
+        with stage("flush_state"):
+            state.flush(conn)
+
+def simulate_daily_activities(current_date, state=None):
+    """
+    Runs one simulated day on a single pooled connection and a single
+    transaction; if any stage raises, the whole day is rolled back.
+    """
+    with day_session() as conn:
+        run_daily_activities(conn, current_date, state)
     
 if __name__ == "__main__":
     simulate_daily_activities(datetime.now().date())
@@ -1,15 +1,136 @@
-from db_simulate_daily_activity import simulate_daily_activities
+import argparse
+import random
+from db_simulate_daily_activity import run_daily_activities
+from db_simulation_state import SimulationState
+from db_simulation_progress import (
+    ensure_progress_table, start_progress, save_progress, load_progress, restore_rng_state
+)
+from db_dispatch import ensure_dispatch_report_table
+from db_payroll_behavior import ensure_payroll_month_index
+from db_payroll_disbursement import load_pay_cycle, disburse_payroll
+from db_encryption_util import DecryptCache
+from db_expiry_sweeper import ensure_expiry_tables
+from db_inventory import ensure_product_inventory
+from db_monthly_rollup import ensure_monthly_rollup
+from db_sim_metrics import (
+    start_day, end_day, ensure_sim_metrics_table, save_day_metrics, append_day_metrics
+)
+from db_config import day_session
 from datetime import datetime, timedelta
 
-def simulate_range(start_date: datetime, num_days: int):
-    current_date = start_date
-    for _ in range(num_days):
+DEFAULT_RUN_ID = "default"
+
+def load_simulation_state(scenario=None):
+    with day_session() as conn:
+        state = SimulationState.load(conn)
+    state.scenario = dict(scenario or {})
+    return state
+
+def record_day_metrics(metrics, run_id, day, stages):
+    if metrics == "table":
+        with day_session() as conn:
+            save_day_metrics(conn, run_id, day, stages)
+    else:
+        append_day_metrics(metrics, run_id, day, stages)
+
+def disburse_day(day, cache):
+    with day_session() as conn:
+        payments = load_pay_cycle(conn, day)
+    if payments:
+        print(f"Disbursing {len(payments)} payments for {day.strftime('%Y-%m-%d')}...")
+        disburse_payroll(payments, cache=cache)
+
+def simulate_range(start_date: datetime, num_days: int, scenario=None, run_id=DEFAULT_RUN_ID, resume=False,
+                   metrics=None, disburse=False):
+    """
+    Simulates `num_days` days from `start_date`. Each day, together with its
+    simulation_progress checkpoint, is committed as one transaction, so a
+    crash never leaves a half-applied day behind.
+
+    With resume=True the run `run_id` continues after its last checkpoint,
+    with the RNG state and scenario it had at that point; start_date,
+    num_days and scenario are then taken from the checkpoint.
+
+    With metrics="table" (or the path of a .jsonl file) every completed day
+    records wall time, statements, rows written and commits per stage into
+    sim_metrics (or appends them to the file); see db_sim_metrics.
+
+    With disburse=True the payroll rows of every committed day are paid out
+    to the simulated bank (db_payroll_disbursement) once the day's commit
+    has landed, so a rolled-back day never sends a transfer. One
+    DecryptCache is kept for the whole run.
+    """
+    with day_session() as conn:
+        ensure_progress_table(conn)
+        ensure_dispatch_report_table(conn)
+        ensure_payroll_month_index(conn)
+        ensure_expiry_tables(conn)
+        ensure_product_inventory(conn)
+        ensure_monthly_rollup(conn)
+        if metrics == "table":
+            ensure_sim_metrics_table(conn)
+        if resume:
+            progress = load_progress(conn, run_id)
+            if progress is None:
+                raise ValueError(f"No checkpoint found for simulation run '{run_id}'.")
+            start_date = progress["start_date"]
+            num_days = progress["num_days"]
+            scenario = progress["scenario"]
+            days_processed = progress["days_processed"]
+            restore_rng_state(progress["rng_state"])
+            print(f"Resuming run '{run_id}' after {days_processed} of {num_days} days.")
+        else:
+            start_progress(conn, run_id, start_date, num_days, scenario)
+            days_processed = 0
+
+    # Reference tables and counters are loaded once and kept in memory.
+    state = load_simulation_state(scenario)
+    decrypt_cache = DecryptCache() if disburse else None
+    current_date = start_date + timedelta(days=days_processed)
+    for day_number in range(days_processed + 1, num_days + 1):
         print(f"Simulating: {current_date.strftime('%Y-%m-%d')}")
+        if metrics:
+            start_day(current_date)
         try:
-            simulate_daily_activities(current_date)
+            with day_session() as conn:
+                run_daily_activities(conn, current_date, state)
+                save_progress(conn, run_id, current_date, day_number)
         except Exception as e:
+            end_day()
             print(f"Error on {current_date.strftime('%Y-%m-%d')}: {e}")
+            # The day was rolled back, so the in-memory state is ahead of the database; reload it.
+            with day_session() as conn:
+                save_progress(conn, run_id, current_date, day_number, failed=True)
+            state = load_simulation_state(scenario)
+        else:
+            if metrics:
+                # The day is committed by now; losing its metrics must not mark it failed.
+                try:
+                    record_day_metrics(metrics, run_id, current_date, end_day())
+                except Exception as e:
+                    print(f"Could not record metrics for {current_date.strftime('%Y-%m-%d')}: {e}")
+            if disburse:
+                try:
+                    disburse_day(current_date, decrypt_cache)
+                except Exception as e:
+                    print(f"Could not disburse payroll for {current_date.strftime('%Y-%m-%d')}: {e}")
         current_date += timedelta(days=1)
 
 if __name__ == "__main__":
-    simulate_range(datetime.now().date(), 3652)
+    parser = argparse.ArgumentParser(description="Simulate a range of days.")
+    parser.add_argument("--start", type=lambda s: datetime.strptime(s, "%Y-%m-%d").date(),
+                        default=datetime.now().date(), help="First day to simulate (YYYY-MM-DD).")
+    parser.add_argument("--days", type=int, default=3652, help="Number of days to simulate.")
+    parser.add_argument("--seed", type=int, help="Seed for the random module.")
+    parser.add_argument("--run-id", default=DEFAULT_RUN_ID, help="Checkpoint name of this run.")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue the run after its last committed day.")
+    parser.add_argument("--metrics", metavar="table|FILE.jsonl",
+                        help="Record per-stage timings into sim_metrics or a JSONL file.")
+    parser.add_argument("--disburse-payroll", action="store_true",
+                        help="Pay each committed day's payroll out to the simulated bank.")
+    args = parser.parse_args()
+    if args.seed is not None and not args.resume:
+        random.seed(args.seed)
+    simulate_range(args.start, args.days, run_id=args.run_id, resume=args.resume, metrics=args.metrics,
+                   disburse=args.disburse_payroll)
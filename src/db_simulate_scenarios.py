@@ -0,0 +1,237 @@
+import os
+import random
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+import pandas as pd
+from db_config import get_db_connection, use_schema
+
+# --- Scenario Definition ---
+# A scenario is a plain dict:
+#   name              unique label, also used for the schema name
+#   fleet_size        number of trucks to keep (or grow to); None keeps the seed fleet
+#   gas_price_drift   bias added to the daily gas price multiplier, e.g. 0.002
+#   order_volume      multiplier on the number of orders placed per day
+#   seed              RNG seed for the run
+DEFAULT_SCENARIO = {
+    "fleet_size": None,
+    "gas_price_drift": 0.0,
+    "order_volume": 1.0,
+    "seed": 0,
+}
+
+def scenario_schema(name):
+    return "scenario_" + re.sub(r"[^a-z0-9_]", "_", name.lower())
+
+# --- Clone the Seed Schema ---
+def clone_schema(conn, source_schema, target_schema):
+    """
+    Copies every table of `source_schema` (structure, indexes and rows) into a
+    fresh `target_schema`. Serial columns get their own sequences so scenario
+    runs never draw ids from the seed. Foreign keys are not copied, and
+    partitioned tables are copied as plain tables holding all their rows.
+    """
+    with conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {target_schema} CASCADE;")
+        cur.execute(f"CREATE SCHEMA {target_schema};")
+        cur.execute("""
+            SELECT table_name FROM information_schema.tables
+            WHERE table_schema = %s AND table_type = 'BASE TABLE'
+              AND NOT (SELECT relispartition FROM pg_class
+                       WHERE oid = format('%%I.%%I', table_schema, table_name)::regclass)
+            ORDER BY table_name;
+        """, (source_schema,))
+        tables = [r[0] for r in cur.fetchall()]
+        for table in tables:
+            cur.execute(f"""
+                CREATE TABLE {target_schema}.{table}
+                (LIKE {source_schema}.{table} INCLUDING ALL);
+            """)
+            cur.execute(f"INSERT INTO {target_schema}.{table} SELECT * FROM {source_schema}.{table};")
+
+        cur.execute("""
+            SELECT table_name, column_name FROM information_schema.columns
+            WHERE table_schema = %s AND column_default LIKE 'nextval(%%'
+            ORDER BY table_name, column_name;
+        """, (target_schema,))
+        for table, column in cur.fetchall():
+            sequence = f"{target_schema}.{table}_{column}_seq"
+            cur.execute(f"CREATE SEQUENCE {sequence} OWNED BY {target_schema}.{table}.{column};")
+            cur.execute(f"""
+                ALTER TABLE {target_schema}.{table}
+                ALTER COLUMN {column} SET DEFAULT nextval('{sequence}');
+            """)
+            cur.execute(f"""
+                SELECT setval('{sequence}',
+                              COALESCE((SELECT MAX({column}) FROM {target_schema}.{table}), 0) + 1,
+                              false);
+            """)
+
+def drop_schema(conn, schema):
+    with conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE;")
+
+# --- Fleet Size ---
+def resize_fleet(conn, fleet_size):
+    """
+    Keeps the first `fleet_size` trucks, or clones the last truck until the
+    fleet reaches `fleet_size`. Runs inside the scenario schema.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT COUNT(*) FROM truck;")
+        current = cur.fetchone()[0]
+        if fleet_size < current:
+            cur.execute("""
+                DELETE FROM truck
+                WHERE truck_id NOT IN (
+                    SELECT truck_id FROM truck ORDER BY truck_id LIMIT %s
+                );
+            """, (fleet_size,))
+        elif fleet_size > current:
+            cur.execute("""
+                INSERT INTO truck (
+                    employee_id, plate_number, refrigerated, capacity, km_driven,
+                    operational_status, fuel_capacity, fuel_level, last_maintanance
+                )
+                SELECT t.employee_id, t.plate_number || '-' || g, t.refrigerated, t.capacity, 0,
+                       'available', t.fuel_capacity, t.fuel_capacity, t.last_maintanance
+                FROM (SELECT * FROM truck ORDER BY truck_id DESC LIMIT 1) t
+                CROSS JOIN generate_series(1, %s) g;
+            """, (fleet_size - current,))
+
+# --- Scenario KPIs ---
+def collect_kpis(conn):
+    """
+    Returns the headline numbers of one scenario run as a flat dict.
+    delivery_cost is the 'delivery' transactions: the pallet cost of the
+    goods shipped to stores, not what the stores paid. The schema records
+    no sale prices, so no revenue or net figure is reported;
+    operating_cost is what the run spent on suppliers, fuel and payroll.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT
+                COALESCE(SUM(cost) FILTER (WHERE type = 'delivery'), 0),
+                COALESCE(SUM(cost) FILTER (WHERE type = 'supplier_delivery'), 0),
+                COALESCE(SUM(cost) FILTER (WHERE type = 'fuel'), 0),
+                COALESCE(SUM(cost) FILTER (WHERE type = 'payroll'), 0)
+            FROM transactions;
+        """)
+        delivery_cost, supplier_cost, fuel_cost, payroll_cost = cur.fetchone()
+        cur.execute("SELECT COUNT(*), COALESCE(SUM(quantity), 0) FROM inventory_delivery;")
+        deliveries, pellets_delivered = cur.fetchone()
+        cur.execute("""
+            SELECT COALESCE(SUM(km_driven_delivery + extra_km), 0),
+                   COALESCE(AVG(EXTRACT(EPOCH FROM delivery_delay) / 60), 0)
+            FROM truck_log;
+        """)
+        km_driven, avg_delay_minutes = cur.fetchone()
+        cur.execute("SELECT COUNT(*) FROM pending_orders;")
+        pending_orders = cur.fetchone()[0]
+        cur.execute("SELECT COUNT(*) FROM truck;")
+        fleet = cur.fetchone()[0]
+    return {
+        "fleet_size": fleet,
+        "deliveries": deliveries,
+        "pellets_delivered": pellets_delivered,
+        "pending_orders": pending_orders,
+        "km_driven": round(float(km_driven), 2),
+        "avg_delay_minutes": round(float(avg_delay_minutes), 2),
+        "delivery_cost": round(delivery_cost, 2),
+        "supplier_cost": round(supplier_cost, 2),
+        "fuel_cost": round(fuel_cost, 2),
+        "payroll_cost": round(payroll_cost, 2),
+        "operating_cost": round(supplier_cost + fuel_cost + payroll_cost, 2),
+    }
+
+# --- Run One Scenario (worker process) ---
+def run_scenario(scenario, start_date, num_days, seed_schema="public", keep_schema=False):
+    """
+    Clones `seed_schema`, runs simulate_range against the clone and returns
+    the scenario's KPIs. Designed to run in its own process.
+    """
+    from db_simulate_range import simulate_range
+
+    scenario = {**DEFAULT_SCENARIO, **scenario}
+    schema = scenario_schema(scenario["name"])
+
+    use_schema(None)
+    conn = get_db_connection()
+    try:
+        clone_schema(conn, seed_schema, schema)
+        conn.commit()
+    finally:
+        conn.close()
+
+    use_schema(schema)
+    try:
+        conn = get_db_connection()
+        try:
+            if scenario["fleet_size"] is not None:
+                resize_fleet(conn, scenario["fleet_size"])
+                conn.commit()
+        finally:
+            conn.close()
+
+        random.seed(scenario["seed"])
+        started = datetime.now()
+        simulate_range(start_date, num_days, scenario=scenario)
+        elapsed = (datetime.now() - started).total_seconds()
+
+        conn = get_db_connection()
+        try:
+            kpis = collect_kpis(conn)
+        finally:
+            conn.close()
+    finally:
+        use_schema(None)
+        if not keep_schema:
+            conn = get_db_connection()
+            try:
+                drop_schema(conn, schema)
+                conn.commit()
+            finally:
+                conn.close()
+
+    return {"scenario": scenario["name"], **kpis, "runtime_s": round(elapsed, 1)}
+
+# --- Run Many Scenarios in Parallel ---
+def run_scenarios(scenarios, start_date, num_days, max_workers=None, seed_schema="public", keep_schemas=False):
+    """
+    Runs every scenario in its own process and schema, and returns one
+    comparison DataFrame with a row of KPIs per scenario.
+    """
+    names = [s["name"] for s in scenarios]
+    if len(set(scenario_schema(n) for n in names)) != len(names):
+        raise ValueError("Scenario names must be unique (after schema name normalisation).")
+
+    max_workers = max_workers or min(len(scenarios), os.cpu_count() or 1)
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(run_scenario, s, start_date, num_days, seed_schema, keep_schemas): s["name"]
+            for s in scenarios
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results.append(future.result())
+                print(f"Scenario {name} finished.")
+            except Exception as e:
+                print(f"Scenario {name} failed: {e}")
+                results.append({"scenario": name, "error": str(e)})
+
+    comparison = pd.DataFrame(results).set_index("scenario")
+    return comparison.reindex(names)
+
+if __name__ == "__main__":
+    scenarios = [
+        {"name": "baseline"},
+        {"name": "fleet_8", "fleet_size": 8},
+        {"name": "fleet_14", "fleet_size": 14},
+        {"name": "gas_up", "gas_price_drift": 0.002},
+        {"name": "orders_x1_5", "order_volume": 1.5},
+    ]
+    comparison = run_scenarios(scenarios, datetime.now().date(), 365)
+    print(comparison.to_string())
+    comparison.to_csv("scenario_comparison.csv")
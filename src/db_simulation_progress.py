@@ -0,0 +1,92 @@
+import json
+import random
+
+# --- Progress Table ---
+def ensure_progress_table(conn):
+    """
+    Creates simulation_progress on databases built before it was added to
+    db_structure.sql.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS simulation_progress (
+                run_id TEXT PRIMARY KEY,
+                start_date DATE,
+                num_days INT,
+                last_completed_day DATE,
+                days_processed INT,
+                failed_days INT DEFAULT 0,
+                rng_state TEXT,
+                scenario TEXT,
+                updated_at TIMESTAMP DEFAULT NOW()
+            );
+        """)
+
+# --- RNG State ---
+def dump_rng_state():
+    version, internal, gauss_next = random.getstate()
+    return json.dumps([version, list(internal), gauss_next])
+
+def restore_rng_state(rng_state):
+    version, internal, gauss_next = json.loads(rng_state)
+    random.setstate((version, tuple(internal), gauss_next))
+
+# --- Checkpoints ---
+def start_progress(conn, run_id, start_date, num_days, scenario=None):
+    """
+    Registers a new run, replacing any earlier checkpoint with the same id.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO simulation_progress (
+                run_id, start_date, num_days, last_completed_day,
+                days_processed, failed_days, rng_state, scenario, updated_at
+            )
+            VALUES (%s, %s, %s, NULL, 0, 0, %s, %s, NOW())
+            ON CONFLICT (run_id) DO UPDATE SET
+                start_date = EXCLUDED.start_date,
+                num_days = EXCLUDED.num_days,
+                last_completed_day = NULL,
+                days_processed = 0,
+                failed_days = 0,
+                rng_state = EXCLUDED.rng_state,
+                scenario = EXCLUDED.scenario,
+                updated_at = NOW();
+        """, (run_id, start_date, num_days, dump_rng_state(), json.dumps(scenario or {})))
+
+def save_progress(conn, run_id, completed_day, days_processed, failed=False):
+    """
+    Records `completed_day` and the current RNG state. Call it on the day's own
+    connection before commit so the checkpoint lands with the day's data.
+    A failed day is recorded on a fresh transaction with failed=True; it
+    advances days_processed but not last_completed_day.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE simulation_progress
+            SET last_completed_day = CASE WHEN %s THEN last_completed_day ELSE %s END,
+                days_processed = %s,
+                failed_days = failed_days + CASE WHEN %s THEN 1 ELSE 0 END,
+                rng_state = %s,
+                updated_at = NOW()
+            WHERE run_id = %s;
+        """, (failed, completed_day, days_processed, failed, dump_rng_state(), run_id))
+
+def load_progress(conn, run_id):
+    """
+    Returns the checkpoint of `run_id` as a dict, or None if there is none.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT run_id, start_date, num_days, last_completed_day,
+                   days_processed, failed_days, rng_state, scenario
+            FROM simulation_progress
+            WHERE run_id = %s;
+        """, (run_id,))
+        row = cur.fetchone()
+        if row is None:
+            return None
+        columns = [c[0] for c in cur.description]
+    progress = dict(zip(columns, row))
+    progress["scenario"] = json.loads(progress["scenario"]) if progress["scenario"] else {}
+    return progress
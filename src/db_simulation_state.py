@@ -0,0 +1,240 @@
+from db_inventory import COUNTERS, apply_inventory_deltas, sync_inventory_totals
+from db_monthly_rollup import apply_flow_deltas
+
+class SimulationState:
+    """
+    In-memory world state for the daily simulation.
+
+    Reference data (stores, products, truck specs) is loaded once per
+    simulate_range run. Mutable state (truck status, inventory counters,
+    unsent pellet stock, gas price) is kept in memory while a day runs and
+    written back as batched deltas by flush() at the end of the day.
+    """
+
+    def __init__(self):
+        self.stores = {}            # store_id -> {"distance_km", "expected_time"}
+        self.products = {}          # product_id -> {"name", "category", "pallet_cost", "avg_weight"}
+        self.trucks = {}            # truck_id -> truck row as a dict
+        self.inventory = {}         # capacity_pellets of the warehouse
+        self.product_inventory = {} # product_id -> {"current_pellets", "to_be_sent", "to_be_received"}
+        self.pellet_stock = {}      # product name -> unsent pellets in the warehouse
+        self.monthly_flow = {}      # (product_id, month) -> [demand, restocked] not yet flushed
+        self.dispatched_trucks = set()  # trucks with at least one delivery on record
+        self.gas_price = 3.0
+        self.scenario = {}          # what-if knobs, e.g. gas_price_drift, order_volume
+        self._dirty_trucks = set()
+        self._flushed_products = {}
+        self._gas_price_dirty = False
+
+    # --- Loading ---
+    @classmethod
+    def load(cls, conn):
+        from db_fuel_behavior import backfill_fuel_levels, ensure_fuel_level_column
+
+        state = cls()
+        # Databases created before fuel_level existed get the column, and
+        # trucks without a level get it from their fuel_log history.
+        ensure_fuel_level_column(conn)
+        backfill_fuel_levels(conn, only_missing=True)
+        with conn.cursor() as cur:
+            cur.execute("SELECT store_id, distance_km, expected_time FROM store;")
+            for store_id, distance_km, expected_time in cur.fetchall():
+                state.stores[store_id] = {
+                    "distance_km": distance_km,
+                    "expected_time": expected_time,
+                }
+
+            cur.execute("""
+                SELECT p.product_id, p.name, p.category, p.pallet_cost, w.avg_weight
+                FROM product_pellets p
+                LEFT JOIN (
+                    SELECT name, AVG(weight) AS avg_weight
+                    FROM product_pellet
+                    GROUP BY name
+                ) w ON w.name = p.name;
+            """)
+            for product_id, name, category, pallet_cost, avg_weight in cur.fetchall():
+                state.products[product_id] = {
+                    "name": name,
+                    "category": category,
+                    "pallet_cost": pallet_cost,
+                    "avg_weight": avg_weight,
+                }
+
+            cur.execute("""
+                SELECT truck_id, employee_id, refrigerated, capacity, km_driven,
+                       operational_status, fuel_capacity, fuel_level, last_maintanance
+                FROM truck
+                ORDER BY truck_id;
+            """)
+            columns = [c[0] for c in cur.description]
+            for row in cur.fetchall():
+                truck = dict(zip(columns, row))
+                state.trucks[truck["truck_id"]] = truck
+
+            cur.execute("SELECT capacity_pellets FROM inventory WHERE inventory_id = 1;")
+            row = cur.fetchone()
+            if row is not None:
+                state.inventory = {"capacity_pellets": row[0]}
+
+            cur.execute("""
+                SELECT product_id, current_pellets, to_be_sent, to_be_received
+                FROM product_inventory;
+            """)
+            for product_id, *counters in cur.fetchall():
+                state.product_inventory[product_id] = dict(zip(COUNTERS, counters))
+
+            cur.execute("""
+                SELECT name, COUNT(*) FROM product_pellet
+                WHERE sent = FALSE
+                GROUP BY name;
+            """)
+            state.pellet_stock = dict(cur.fetchall())
+
+            cur.execute("SELECT DISTINCT truck_sent FROM inventory_delivery WHERE truck_sent IS NOT NULL;")
+            state.dispatched_trucks = {r[0] for r in cur.fetchall()}
+
+            cur.execute("SELECT value FROM system_config WHERE key = 'current_gas_price';")
+            result = cur.fetchone()
+            if result is not None and result[0] is not None:
+                state.gas_price = float(result[0])
+
+        state._flushed_products = {pid: dict(c) for pid, c in state.product_inventory.items()}
+        return state
+
+    # --- Reference Lookups ---
+    def pallet_cost(self, product_id):
+        product = self.products.get(product_id)
+        if product is None or product["pallet_cost"] is None:
+            return 0.0
+        return float(product["pallet_cost"])
+
+    def product_weight(self, product_id):
+        product = self.products.get(product_id)
+        if product is None or product["avg_weight"] is None:
+            return 30.0
+        return float(product["avg_weight"])
+
+    def store_distance(self, store_id):
+        store = self.stores.get(store_id)
+        if store is None or store["distance_km"] is None:
+            return 0.0
+        return float(store["distance_km"])
+
+    def store_expected_time(self, store_id, default):
+        store = self.stores.get(store_id)
+        if store is None or store["expected_time"] is None:
+            return default
+        return store["expected_time"]
+
+    # --- Trucks ---
+    def set_truck_status(self, truck_id, status):
+        truck = self.trucks.get(truck_id)
+        if truck is None:
+            return
+        truck["operational_status"] = status
+        self._dirty_trucks.add(truck_id)
+
+    def start_truck_maintenance(self, truck_id, current_date):
+        truck = self.trucks[truck_id]
+        truck["operational_status"] = "maintenance"
+        truck["last_maintanance"] = current_date
+        self._dirty_trucks.add(truck_id)
+
+    def add_fuel(self, truck_id, liters):
+        truck = self.trucks[truck_id]
+        truck["fuel_level"] = ((truck["fuel_level"] or 0) + liters) % truck["fuel_capacity"]
+        self._dirty_trucks.add(truck_id)
+
+    def available_trucks(self):
+        return [t for t in self.trucks.values() if t["operational_status"] == "available"]
+
+    # --- Inventory ---
+    def _product(self, product_id):
+        return self.product_inventory.setdefault(product_id, dict.fromkeys(COUNTERS, 0))
+
+    def inventory_status(self):
+        """
+        Warehouse totals over every product, plus the shared capacity.
+        """
+        totals = [sum(p[key] for p in self.product_inventory.values()) for key in COUNTERS]
+        return (*totals, self.inventory["capacity_pellets"])
+
+    def product_status(self, product_id):
+        product = self.product_inventory.get(product_id) or dict.fromkeys(COUNTERS, 0)
+        return (*(product[key] for key in COUNTERS), self.inventory["capacity_pellets"])
+
+    def record_shipment(self, product_id, quantity):
+        product = self._product(product_id)
+        product["current_pellets"] = max(product["current_pellets"] - quantity, 0)
+        product["to_be_sent"] += quantity
+
+    def record_request(self, product_id, quantity):
+        self._product(product_id)["to_be_received"] += quantity
+
+    def record_receipt(self, product_id, quantity):
+        product = self._product(product_id)
+        product["current_pellets"] += quantity
+        product["to_be_received"] = max(product["to_be_received"] - quantity, 0)
+
+    def record_expiry(self, product_id, quantity):
+        product = self._product(product_id)
+        product["current_pellets"] = max(product["current_pellets"] - quantity, 0)
+
+    def adjust_pellet_stock(self, name, delta):
+        self.pellet_stock[name] = max(self.pellet_stock.get(name, 0) + delta, 0)
+
+    # --- Monthly Rollup ---
+    def record_flow(self, deltas):
+        for key, (demand, restocked) in deltas.items():
+            flow = self.monthly_flow.setdefault(key, [0, 0])
+            flow[0] += demand
+            flow[1] += restocked
+
+    # --- Gas Price ---
+    def set_gas_price(self, price):
+        self.gas_price = price
+        self._gas_price_dirty = True
+
+    # --- Write Back ---
+    def flush(self, conn):
+        """
+        Writes the day's in-memory changes back to the database in one batch
+        per table. Does not commit; the caller owns the transaction.
+        """
+        with conn.cursor() as cur:
+            if self._dirty_trucks:
+                cur.executemany("""
+                    UPDATE truck
+                    SET operational_status = %s, last_maintanance = %s, fuel_level = %s
+                    WHERE truck_id = %s;
+                """, [
+                    (
+                        self.trucks[t]["operational_status"],
+                        self.trucks[t]["last_maintanance"],
+                        self.trucks[t]["fuel_level"],
+                        t,
+                    )
+                    for t in sorted(self._dirty_trucks)
+                ])
+
+            if self._gas_price_dirty:
+                cur.execute("""
+                    INSERT INTO system_config (key, value)
+                    VALUES ('current_gas_price', %s)
+                    ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value;
+                """, (self.gas_price,))
+
+        flushed = self._flushed_products
+        apply_inventory_deltas(conn, {
+            pid: tuple(c[key] - flushed.get(pid, {}).get(key, 0) for key in COUNTERS)
+            for pid, c in self.product_inventory.items()
+        })
+        # The warehouse row is only rolled up here, once per day.
+        sync_inventory_totals(conn)
+        apply_flow_deltas(conn, self.monthly_flow)
+
+        self._dirty_trucks.clear()
+        self._flushed_products = {pid: dict(c) for pid, c in self.product_inventory.items()}
+        self.monthly_flow = {}
+        self._gas_price_dirty = False
@@ -0,0 +1,137 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from db_demand_forecast import FORECAST_STEPS, forecast_columns
+
+SEASON_LENGTH = 12
+SAFETY_FACTOR = 1.05
+
+# Smoothing weights searched for every series at once; each product keeps
+# the (alpha, beta, gamma) with the lowest one-step-ahead squared error.
+ALPHAS = (0.1, 0.2, 0.3, 0.5, 0.7, 0.9)
+BETAS = (0.0, 0.05, 0.1, 0.3)
+GAMMAS = (0.0, 0.1, 0.3, 0.5)
+
+# --- Matrix Models ---
+def seasonal_naive_forecast(Y, steps=FORECAST_STEPS, season_length=SEASON_LENGTH):
+    """
+    Repeats each row's last season of `Y` (series x periods) over `steps`
+    periods; series shorter than a season repeat their last value.
+    """
+    Y = np.asarray(Y, dtype=np.float64)
+    if Y.shape[1] < season_length:
+        return np.repeat(Y[:, -1:], steps, axis=1)
+    last_season = Y[:, -season_length:]
+    return last_season[:, np.arange(steps) % season_length]
+
+def _initial_state(Y, m, seasonal):
+    # Level and trend from the first two seasons (or first two periods
+    # without seasonality), seasonal indices as deviations from the level.
+    n = Y.shape[0]
+    if seasonal:
+        first, second = Y[:, :m].mean(axis=1), Y[:, m:2 * m].mean(axis=1)
+        level, trend = first, (second - first) / m
+        season = Y[:, :m] - first[:, None]
+    else:
+        level, trend = Y[:, 0], Y[:, 1] - Y[:, 0]
+        season = np.zeros((n, m))
+    return level, trend, season
+
+def holt_winters_forecast(Y, steps=FORECAST_STEPS, season_length=SEASON_LENGTH,
+                          alphas=ALPHAS, betas=BETAS, gammas=GAMMAS):
+    """
+    Additive Holt-Winters over every row of `Y` (series x periods) at once.
+    All series and all weight combinations advance together through one
+    loop over time, on (series, combinations) matrices; each series then
+    forecasts `steps` periods with its best combination. Without two full
+    seasons of history the seasonal component is dropped (Holt's linear
+    trend), and with fewer than two periods the last value is repeated.
+    Returns (forecast matrix, {"alpha", "beta", "gamma"} arrays per series).
+    """
+    Y = np.asarray(Y, dtype=np.float64)
+    n, T = Y.shape
+    m = season_length
+    seasonal = T >= 2 * m
+    if T < 2:
+        return np.repeat(Y[:, -1:], steps, axis=1), {}
+    grid = np.array(
+        [(a, b, g) for a in alphas for b in betas for g in (gammas if seasonal else (0.0,))]
+    )
+    alpha, beta, gamma = grid[:, 0], grid[:, 1], grid[:, 2]
+
+    level0, trend0, season0 = _initial_state(Y, m, seasonal)
+    level = np.repeat(level0[:, None], len(grid), axis=1)      # (n, g)
+    trend = np.repeat(trend0[:, None], len(grid), axis=1)      # (n, g)
+    season = np.repeat(season0[:, None, :], len(grid), axis=1)  # (n, g, m)
+    sse = np.zeros((n, len(grid)))
+    for t in range(T):
+        y = Y[:, t][:, None]
+        s = season[:, :, t % m]
+        err = y - (level + trend + s)
+        sse += err * err
+        new_level = alpha * (y - s) + (1 - alpha) * (level + trend)
+        season[:, :, t % m] = gamma * (y - level - trend) + (1 - gamma) * s
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        level = new_level
+
+    best = sse.argmin(axis=1)
+    rows = np.arange(n)
+    horizon = np.arange(1, steps + 1)
+    forecast = (
+        level[rows, best][:, None]
+        + horizon[None, :] * trend[rows, best][:, None]
+        + season[rows, best][:, (T + horizon - 1) % m]
+    )
+    params = {"alpha": alpha[best], "beta": beta[best], "gamma": gamma[best]}
+    return forecast, params
+
+MODELS = {
+    "holt_winters": lambda Y, steps, m: holt_winters_forecast(Y, steps, m)[0],
+    "seasonal_naive": seasonal_naive_forecast,
+}
+
+# --- Notebook Outputs ---
+def forecast_smoothing(pivot, model="holt_winters", steps=FORECAST_STEPS, season_length=SEASON_LENGTH):
+    """
+    Forecasts every product of `pivot` (product_id x period, like
+    monthly_demand_pivot) with one vectorized `model` run and returns
+    forecast_df in the notebook's layout. Demand forecasts are floored at 0.
+    """
+    if model not in MODELS:
+        raise ValueError(f"Unknown model '{model}'; expected one of {', '.join(MODELS)}.")
+    started = time.perf_counter()
+    forecast = np.maximum(MODELS[model](pivot.to_numpy(dtype=np.float64), steps, season_length), 0)
+    forecast_df = pd.DataFrame(forecast, index=pivot.index.astype(int), columns=forecast_columns(steps))
+    forecast_df.index.name = "Product_ID"
+    print(f"Forecast {len(forecast_df)} products with {model} in {time.perf_counter() - started:.3f}s.")
+    return forecast_df
+
+def optimal_restock(forecast_df, safety_factor=SAFETY_FACTOR):
+    """
+    The notebook's optimal_restock_df: forecast demand plus a safety
+    margin, rounded to whole pellets.
+    """
+    optimal_restock_df = (forecast_df * safety_factor).round().astype(int)
+    optimal_restock_df.index.name = "Product_ID"
+    return optimal_restock_df
+
+if __name__ == "__main__":
+    from db_config import get_db_connection
+    from db_monthly_rollup import load_monthly_pivot
+
+    parser = argparse.ArgumentParser(description="Forecast monthly demand per product with vectorized smoothing.")
+    parser.add_argument("--model", choices=MODELS, default="holt_winters")
+    parser.add_argument("--start", help="First month of history (YYYY-MM).")
+    parser.add_argument("--end", help="Last month of history (YYYY-MM).")
+    parser.add_argument("--steps", type=int, default=FORECAST_STEPS)
+    parser.add_argument("--safety-factor", type=float, default=SAFETY_FACTOR)
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    try:
+        pivot = load_monthly_pivot(conn, "demand", args.start, args.end)
+    finally:
+        conn.close()
+    forecast_df = forecast_smoothing(pivot, args.model, args.steps)
+    print(optimal_restock(forecast_df, args.safety_factor).to_string())
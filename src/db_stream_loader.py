@@ -0,0 +1,185 @@
+import argparse
+import os
+import queue
+import threading
+import psycopg2
+from db_bulk_loader import (
+    DEFAULT_CHUNK_SIZE, TABLE_COLUMNS, copy_rows, insert_rows_batched,
+    iter_table_rows, sync_serial_sequence
+)
+from db_config import get_db_connection
+from db_generate_product_pellet import iter_pellet_chunks
+from db_run_all_generators import PIPELINE, run_pipeline, step_seed
+
+DATA_DIR = "generated_data"
+DEFAULT_QUEUE_SIZE = 4
+
+# Tables in foreign-key order, with the dataset that feeds each one.
+LOAD_ORDER = [
+    ("employee", "employees"),
+    ("truck", "trucks"),
+    ("store", "stores"),
+    ("product_pellets", "product_pellets"),
+    ("product_pellet", "product_pellet"),
+    ("supplier", "suppliers"),
+    ("inventory", "inventory"),
+]
+
+_END = object()
+
+# --- Batches ---
+def iter_frame_batches(df, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yields an in-memory DataFrame in slices of `chunk_size` rows.
+    """
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size]
+
+# --- CSV Tee ---
+class CsvTee:
+    """
+    Optional sink that appends every batch passing through the stream to a
+    CSV file, writing the header with the first batch.
+    """
+
+    def __init__(self, path, index=False):
+        self.path = path
+        self.index = index
+        self.rows = 0
+
+    def write(self, batch):
+        batch.to_csv(self.path, mode="w" if self.rows == 0 else "a", header=self.rows == 0, index=self.index)
+        self.rows += len(batch)
+
+# --- Producer ---
+def _put(q, item, stop):
+    # Blocks while the queue is full, which keeps memory bounded, but gives
+    # up once the consumer has stopped reading. Returns whether it was queued.
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _produce(batches, q, stop):
+    try:
+        for batch in batches:
+            if not _put(q, batch, stop):
+                return
+        _put(q, _END, stop)
+    except Exception as e:
+        _put(q, e, stop)
+
+# --- Stream One Table ---
+def stream_table(conn, table, batches, method="copy", queue_size=DEFAULT_QUEUE_SIZE, tee=None):
+    """
+    Loads the DataFrame batches yielded by `batches` into `table` while they
+    are being generated. A producer thread fills a bounded queue, so at most
+    `queue_size` batches are in memory whatever the size of the dataset.
+
+    method="copy" uses COPY FROM STDIN and falls back to execute_values if the
+    first batch is refused, as bulk_load_dataframe does. `tee` (a CsvTee)
+    also writes every batch to CSV. Commits once the table is loaded and
+    returns the number of rows.
+    """
+    if table not in TABLE_COLUMNS:
+        raise KeyError(f"No column mapping defined for table {table}")
+    if method not in ("copy", "values"):
+        raise ValueError(f"Unknown bulk load method: {method}")
+
+    load = copy_rows if method == "copy" else insert_rows_batched
+    q = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    producer = threading.Thread(target=_produce, args=(batches, q, stop), daemon=True)
+    producer.start()
+
+    loaded = 0
+    try:
+        while True:
+            batch = q.get()
+            if batch is _END:
+                break
+            if isinstance(batch, Exception):
+                raise batch
+            if tee is not None:
+                tee.write(batch)
+            # product_pellet batches carry pellet_id as their index.
+            if batch.index.name is not None:
+                batch = batch.reset_index()
+            try:
+                loaded += load(conn, table, iter_table_rows(table, batch))
+            except (psycopg2.NotSupportedError, psycopg2.ProgrammingError,
+                    psycopg2.OperationalError) as e:
+                if load is not copy_rows or loaded > 0 or conn.closed:
+                    raise
+                print(f"COPY into {table} failed ({e}); falling back to execute_values.")
+                conn.rollback()
+                load = insert_rows_batched
+                loaded += load(conn, table, iter_table_rows(table, batch))
+    finally:
+        stop.set()
+        # Free a slot in case the producer is blocked on a full queue.
+        while True:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                break
+        producer.join(timeout=5)
+
+    sync_serial_sequence(conn, table)
+    conn.commit()
+    return loaded
+
+# --- Stream the Whole Seed ---
+def stream_seed_data(conn, stores=30, products=50, drivers=10, pellets=1.0, seed=None,
+                     method="copy", chunk_size=DEFAULT_CHUNK_SIZE, queue_size=DEFAULT_QUEUE_SIZE,
+                     tee_dir=None):
+    """
+    Generates the seed datasets and loads them straight into the database
+    without intermediate CSV files. The small reference datasets come from
+    the generator pipeline; product_pellet, which grows with `pellets`, is
+    streamed chunk by chunk as it is generated. With `tee_dir`, every
+    dataset is also written there as CSV. Returns {table: rows loaded}.
+    """
+    small = run_pipeline(stores, products, drivers, pellets, seed, write_csv=False, exclude=("product_pellet",))
+    if tee_dir:
+        os.makedirs(tee_dir, exist_ok=True)
+
+    counts = {}
+    for table, dataset in LOAD_ORDER:
+        if dataset == "product_pellet":
+            batches = iter_pellet_chunks(
+                small["product_pellets"], pellets, step_seed(seed, dataset), chunk_size=chunk_size
+            )
+        else:
+            batches = iter_frame_batches(small[dataset], chunk_size)
+        tee = CsvTee(os.path.join(tee_dir, PIPELINE[dataset][3]), index=dataset == "product_pellet") if tee_dir else None
+        print(f"Streaming {table}...")
+        counts[table] = stream_table(conn, table, batches, method, queue_size, tee)
+    return counts
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate seed data and stream it into the database.")
+    parser.add_argument("--stores", type=int, default=30)
+    parser.add_argument("--products", type=int, default=50)
+    parser.add_argument("--drivers", type=int, default=10)
+    parser.add_argument("--pellets", type=float, default=1.0, help="Scale factor on pellet quantities.")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--method", choices=["copy", "values"], default="copy")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE)
+    parser.add_argument("--tee", metavar="DIR", help="Also write every dataset as CSV into DIR.")
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    try:
+        counts = stream_seed_data(
+            conn, args.stores, args.products, args.drivers, args.pellets, args.seed,
+            args.method, args.chunk_size, args.queue_size, args.tee
+        )
+    finally:
+        conn.close()
+    for table, rows in counts.items():
+        print(f"{table}: {rows} rows")
@@ -26,8 +26,9 @@ CREATE TABLE product_pellets (
 );
 
 -- PRODUCT PELLET TABLE: Tracks individual pallets in warehouse
+-- Split on `sent`: shipping a pallet moves it from the hot to the cold partition.
 CREATE TABLE product_pellet (
-    pellet_id SERIAL PRIMARY KEY,
+    pellet_id SERIAL,
     name TEXT NOT NULL,
     category TEXT NOT NULL,
     cost INT,
@@ -35,16 +36,29 @@ CREATE TABLE product_pellet (
     received DATE, -- Date pallet was received
     sell_by DATE, -- Sell-by date for perishables
     refrigerated BOOLEAN, -- Whether the pallet needs refrigeration
-    sent BOOLEAN -- Whether the pallet has already been sent
-);
+    sent BOOLEAN, -- Whether the pallet has already been sent
+    PRIMARY KEY (pellet_id, sent)
+) PARTITION BY LIST (sent);
+CREATE TABLE product_pellet_unsent PARTITION OF product_pellet FOR VALUES IN (FALSE);
+CREATE TABLE product_pellet_sent PARTITION OF product_pellet FOR VALUES IN (TRUE);
+-- Expiry sweeps only look at pellets still in the warehouse.
+CREATE INDEX idx_product_pellet_unsent_sell_by ON product_pellet (sell_by) WHERE sent = FALSE;
 
 -- INVENTORY TABLE: Overview of warehouse inventory status
 CREATE TABLE inventory (
     inventory_id SERIAL,
     capacity_pellets INT, -- Max number of pallets warehouse can hold
-    current_pellets INT, -- Currently stored pallets
-    to_be_sent INT, -- Pallets scheduled to be sent
-    to_be_received INT -- Pallets expected from suppliers
+    current_pellets INT, -- Currently stored pallets (total of product_inventory at the last end-of-day flush)
+    to_be_sent INT, -- Pallets scheduled to be sent (total of product_inventory at the last end-of-day flush)
+    to_be_received INT -- Pallets expected from suppliers (total of product_inventory at the last end-of-day flush)
+);
+
+-- PRODUCT INVENTORY: Per-product stock counters; rows are opened by db_inventory
+CREATE TABLE product_inventory (
+    product_id INT PRIMARY KEY REFERENCES product_pellets(product_id),
+    current_pellets INT NOT NULL DEFAULT 0,
+    to_be_sent INT NOT NULL DEFAULT 0,
+    to_be_received INT NOT NULL DEFAULT 0
 );
 
 -- EMPLOYEE TABLE: Staff and drivers
@@ -69,6 +83,7 @@ CREATE TABLE truck (
     km_driven FLOAT, -- Total kilometers driven
     operational_status TEXT, -- e.g., 'available', 'maintenance'
     fuel_capacity FLOAT, -- Liters of fuel tank
+    fuel_level FLOAT, -- Liters in the tank, kept in step with fuel_log
     last_maintanance DATE
 );
 
@@ -89,8 +104,11 @@ CREATE TABLE inventory_delivery (
 );
 
 -- TRUCK LOG: Logs each truck’s route
+-- The log tables are partitioned by month of date_time; db_partitioning creates
+-- the month partitions and archives old ones. Rows of a month without its own
+-- partition yet land in the DEFAULT partition and move over when it is created.
 CREATE TABLE truck_log (
-    log_id SERIAL PRIMARY KEY,
+    log_id SERIAL,
     delivery_id INT REFERENCES inventory_delivery(transaction_id),
     driver_id INT REFERENCES employee(employee_id),
     time_sent TIMESTAMP,
@@ -101,35 +119,41 @@ CREATE TABLE truck_log (
     km_driven_delivery FLOAT,
     extra_km FLOAT, -- Deviation from optimal route
     delivery_delay INTERVAL, -- Delay duration if any
-    date_time TIMESTAMP
-);
+    date_time TIMESTAMP,
+    PRIMARY KEY (log_id, date_time)
+) PARTITION BY RANGE (date_time);
+CREATE TABLE truck_log_default PARTITION OF truck_log DEFAULT;
 
 -- TRANSACTIONS TABLE: Logs all financial transactions
 CREATE TABLE transactions (
-    transaction_id SERIAL PRIMARY KEY,
+    transaction_id SERIAL,
     type TEXT, -- e.g., 'delivery', 'supplier_delivery', 'fuel', 'payroll'
     cost FLOAT,
     date DATE,
-    date_time TIMESTAMP
-);
+    date_time TIMESTAMP,
+    PRIMARY KEY (transaction_id, date_time)
+) PARTITION BY RANGE (date_time);
+CREATE TABLE transactions_default PARTITION OF transactions DEFAULT;
 CREATE INDEX idx_transactions_date ON transactions(date);
 CREATE INDEX idx_transactions_type ON transactions(type);
 
 -- FUEL LOG: Fuel purchases per truck
 CREATE TABLE fuel_log (
-    transaction_id INT PRIMARY KEY REFERENCES transactions(transaction_id),
+    transaction_id INT, -- transactions(transaction_id); not enforced, transactions is partitioned
     truck_id INT REFERENCES truck(truck_id),
     employee_id INT REFERENCES employee(employee_id),
     cost FLOAT,
     liters FLOAT,
     cost_per_liter FLOAT,
     expected_cost FLOAT,
-    date_time TIMESTAMP
-);
+    date_time TIMESTAMP,
+    PRIMARY KEY (transaction_id, date_time)
+) PARTITION BY RANGE (date_time);
+CREATE TABLE fuel_log_default PARTITION OF fuel_log DEFAULT;
 
 -- PAYROLL LOG: Salary transactions
 CREATE TABLE payroll_log (
-    transaction_id INTEGER PRIMARY KEY REFERENCES transactions(transaction_id),
+    transaction_id INTEGER PRIMARY KEY, -- transactions(transaction_id)
     employee_id INT REFERENCES employee(employee_id),
     payment FLOAT,
     account_num TEXT,
@@ -137,6 +161,8 @@ CREATE TABLE payroll_log (
     next_payment DATE,
     date_time TIMESTAMP
 );
+-- One payroll per employee per month.
+CREATE UNIQUE INDEX idx_payroll_log_employee_month ON payroll_log (employee_id, (date_trunc('month', date_time)));
 
 -- SUPPLIER TABLE: Product suppliers and delivery expectations
 CREATE TABLE supplier (
@@ -156,7 +182,7 @@ CREATE TABLE supplier_delivery (
     status TEXT, -- e.g., 'pending', 'received'
     cost FLOAT, -- Cost of received delivery
     product_id INT REFERENCES product_pellets(product_id),
-    pellet_id INT REFERENCES product_pellet(pellet_id),
+    pellet_id INT, -- product_pellet(pellet_id)
     quantity_received INT,
     weight FLOAT,
     date_time TIMESTAMP
@@ -165,7 +191,7 @@ CREATE TABLE supplier_delivery (
 -- OVERSPENDING TABLE: Logs any financial anomalies
 CREATE TABLE overspending_log (
     id SERIAL PRIMARY KEY,
-    transaction_id INT REFERENCES transactions(transaction_id),
+    transaction_id INT, -- transactions(transaction_id)
     type TEXT, -- 'fuel', 'delivery', 'payroll'
     expected_cost FLOAT,
     actual_cost FLOAT,
@@ -196,6 +222,64 @@ CREATE TABLE system_config (
     value TEXT
 );
 INSERT INTO system_config (key, value) VALUES ('current_gas_price', '3.00');
+
+-- DISPATCH REPORT: Daily summary of truck routes built by the dispatcher
+CREATE TABLE dispatch_report (
+    date DATE PRIMARY KEY,
+    orders_dispatched INT,
+    unfulfilled_orders INT, -- Orders left pending (no stock or no truck)
+    trucks_used INT,
+    routes INT,
+    stops INT,
+    km_driven FLOAT,
+    avg_load_factor FLOAT -- Mean route weight / truck capacity
+);
+
+-- SIMULATION PROGRESS: Checkpoint of the last committed day of a simulate_range run
+CREATE TABLE simulation_progress (
+    run_id TEXT PRIMARY KEY,
+    start_date DATE,
+    num_days INT, -- Days requested for the whole run
+    last_completed_day DATE, -- Last day whose transaction committed
+    days_processed INT, -- Days attempted so far, including failed ones
+    failed_days INT DEFAULT 0,
+    rng_state TEXT, -- JSON dump of random.getstate() after last_completed_day
+    scenario TEXT, -- JSON of the scenario knobs the run was started with
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+-- WASTE LOG: Expired pellets discarded per product and day
+CREATE TABLE waste_log (
+    date DATE,
+    name TEXT, -- Product name
+    category TEXT,
+    pellets INT, -- Pellets discarded
+    cost FLOAT, -- Total cost of the discarded pellets
+    PRIMARY KEY (date, name)
+);
+
+-- SIM METRICS: Per-stage cost of every simulated day, recorded by db_sim_metrics
+CREATE TABLE sim_metrics (
+    run_id TEXT,
+    date DATE, -- Simulated day
+    stage TEXT, -- Instrumented stage of the day, e.g. fulfill_orders
+    calls INT,
+    wall_ms FLOAT,
+    queries INT, -- Statements executed
+    rows_written INT,
+    commits INT,
+    PRIMARY KEY (run_id, date, stage)
+);
+
+-- PRODUCT MONTHLY FLOW: Pellets delivered to stores and received from suppliers
+-- per product and month; db_monthly_rollup adds each simulated day's deltas.
+CREATE TABLE product_monthly_flow (
+    product_id INT,
+    month DATE, -- First day of the month
+    demand INT NOT NULL DEFAULT 0, -- Pellets in inventory_delivery.products_delivered
+    restocked INT NOT NULL DEFAULT 0, -- Received supplier_delivery quantities, by order month
+    PRIMARY KEY (product_id, month)
+);
 ALTER TABLE supplier_delivery DROP CONSTRAINT supplier_delivery_supplier_id_fkey;
 ALTER TABLE supplier DROP CONSTRAINT supplier_pkey;
 
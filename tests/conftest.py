@@ -0,0 +1,24 @@
+import os
+import sys
+import pytest
+
+# The modules in src import each other as top-level modules.
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+@pytest.fixture
+def db_conn():
+    """
+    A connection to the database configured in .env, rolled back after the
+    test. Tests using it are skipped when no database is reachable.
+    """
+    import psycopg2
+    from db_config import get_db_connection
+    try:
+        conn = get_db_connection()
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"No database available: {e}")
+    try:
+        yield conn
+    finally:
+        conn.rollback()
+        conn.close()
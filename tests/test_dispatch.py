@@ -0,0 +1,66 @@
+from datetime import date, timedelta
+from db_dispatch import dispatch_orders, distance_bands, route_deliveries, take_items
+from db_simulation_state import SimulationState
+
+TODAY = date(2025, 4, 7)
+
+def _state(trucks, stores):
+    state = SimulationState()
+    for truck_id, capacity, refrigerated in trucks:
+        state.trucks[truck_id] = {
+            "truck_id": truck_id, "employee_id": 100 + truck_id, "capacity": capacity,
+            "refrigerated": refrigerated, "operational_status": "available",
+            "last_maintanance": TODAY - timedelta(days=10),
+        }
+    for store_id, distance_km in stores.items():
+        state.stores[store_id] = {"distance_km": distance_km, "expected_time": timedelta(hours=1)}
+    return state
+
+def _order(order_id, store_id, weight, refrigerated=False, quantity=1):
+    item = {"product_id": 1, "quantity": quantity, "weight": weight, "refrigerated": refrigerated}
+    return {"order_id": order_id, "store_id": store_id, "items": [item]}
+
+def _loads(routes):
+    return sorted(sorted(stop["order_id"] for stop in route["stops"]) for route in routes)
+
+def test_stops_are_packed_first_fit_decreasing():
+    state = _state([(1, 1000.0, False), (2, 1000.0, False)], {s: 5.0 + s for s in range(1, 6)})
+    planned = [_order(s, s, w) for s, w in zip(range(1, 6), (300, 600, 200, 500, 400))]
+    routes, unfulfilled = dispatch_orders(planned, TODAY, state)
+    assert unfulfilled == []
+    # 600+400 fill the first truck; 500+300+200 the second.
+    assert _loads(routes) == [[1, 3, 4], [2, 5]]
+    assert all(route["weight"] <= 1000.0 for route in routes)
+    assert len(route_deliveries(routes)) == 5
+
+def test_refrigerated_stops_only_ride_refrigerated_trucks():
+    state = _state([(1, 1000.0, True), (2, 1000.0, False)], {1: 5.0, 2: 6.0, 3: 60.0})
+    planned = [_order(1, 1, 300, refrigerated=True), _order(2, 2, 300), _order(3, 3, 900, refrigerated=True)]
+    routes, unfulfilled = dispatch_orders(planned, TODAY, state)
+    assert unfulfilled == []
+    assert all(not stop["refrigerated"] for route in routes if route["truck_id"] == 2 for stop in route["stops"])
+    # The cold truck runs both bands, and dry goods may share its route.
+    cold = [route for route in routes if route["truck_id"] == 1]
+    assert _loads(cold) == [[1, 2], [3]]
+    assert cold[1]["trip_start"] >= cold[0]["estimated_return"]
+
+def test_far_apart_stores_get_separate_routes():
+    state = _state([(1, 1000.0, False), (2, 1000.0, False)], {1: 5.0, 2: 60.0})
+    routes, _ = dispatch_orders([_order(1, 1, 100), _order(2, 2, 100)], TODAY, state, band_km=10.0)
+    assert _loads(routes) == [[1], [2]]
+    assert [len(band) for band in distance_bands([{"distance_km": d} for d in (1, 4, 12, 30)], 10.0)] == [2, 1, 1]
+
+def test_oversized_orders_are_split_over_the_largest_trucks():
+    state = _state([(1, 800.0, False), (2, 500.0, False), (3, 300.0, False)], {1: 5.0})
+    routes, unfulfilled = dispatch_orders([_order(1, 1, 1200.0, quantity=12)], TODAY, state)
+    assert unfulfilled == []
+    assert sorted((route["truck_id"], route["weight"]) for route in routes) == [(1, 800.0), (2, 400.0)]
+
+    state = _state([(1, 800.0, False)], {1: 5.0})
+    routes, unfulfilled = dispatch_orders([_order(1, 1, 1200.0, quantity=12)], TODAY, state)
+    assert routes == [] and unfulfilled == [1]
+
+def test_take_items_splits_quantities():
+    taken, rest = take_items([{"quantity": 10, "weight": 100.0}, {"quantity": 2, "weight": 50.0}], 85.0)
+    assert [(i["quantity"], i["weight"]) for i in taken] == [(8, 80.0)]
+    assert [(i["quantity"], i["weight"]) for i in rest] == [(2, 20.0), (2, 50.0)]
@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+from db_encryption_util import DecryptCache, decrypt_accounts, encrypt_account_number
+
+SRC = os.path.join(os.path.dirname(__file__), "..", "src")
+
+def test_decrypt_path_does_not_load_the_generators():
+    code = (
+        "import sys, db_encryption_util;"
+        "print(sorted(m for m in ('db_generate_employee', 'faker', 'numpy', 'pandas') if m in sys.modules))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=SRC, capture_output=True,
+                         text=True, check=True).stdout
+    assert out.strip() == "[]"
+
+def test_cache_evicts_the_least_recently_used():
+    cache = DecryptCache(maxsize=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("a") == "1"
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+    assert cache.stats() == {"size": 2, "hits": 3, "misses": 1}
+
+def test_decrypt_accounts_keeps_order_and_decrypts_repeats_once():
+    tokens = [encrypt_account_number(n) for n in ("111", "222")]
+    cache = DecryptCache()
+    batch = [tokens[0], tokens[1], tokens[0]]
+    assert decrypt_accounts(batch, cache) == ["111", "222", "111"]
+    assert cache.stats() == {"size": 2, "hits": 0, "misses": 2}
+    assert decrypt_accounts(batch, cache) == ["111", "222", "111"]
+    assert cache.stats()["hits"] == 2
+    assert decrypt_accounts(batch) == ["111", "222", "111"]
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+from db_forecast_backtest import backtest_forecasts, choose_models, error_tables, fold_origins
+
+def _backtest(rows):
+    return pd.DataFrame(rows, columns=["product_id", "model", "origin", "step", "actual", "forecast"])
+
+def test_fold_origins_leave_a_full_horizon():
+    assert fold_origins(24, horizon=6, min_train=12) == [12, 13, 14, 15, 16, 17, 18]
+    assert fold_origins(24, horizon=6, min_train=12, step=3) == [12, 15, 18]
+    assert fold_origins(17, horizon=6, min_train=12) == []
+
+def test_error_tables_skip_zero_demand_and_failed_forecasts():
+    backtest = _backtest([
+        (1, "naive", "2025-01", 1, 10.0, 12.0),
+        (1, "naive", "2025-01", 2, 0.0, 3.0),
+        (1, "naive", "2025-01", 3, 20.0, 15.0),
+        (1, "holt_winters", "2025-01", 1, 10.0, np.nan),
+        (1, "holt_winters", "2025-01", 2, 0.0, 0.0),
+        (1, "holt_winters", "2025-01", 3, 20.0, 20.0),
+        (2, "naive", "2025-01", 1, 0.0, 1.0),
+        (2, "holt_winters", "2025-01", 1, 0.0, 0.0),
+    ])
+    mape_df, bias_df = error_tables(backtest)
+    # |12-10|/10 and |15-20|/20; the zero-demand month is left out of MAPE.
+    assert mape_df.loc[1, "naive"] == 22.5
+    assert mape_df.loc[1, "holt_winters"] == 0.0
+    assert 2 not in mape_df.index
+    # (30 - 30) / 30 with the zero month, and the NaN forecast dropped from the totals.
+    assert bias_df.loc[1, "naive"] == 0.0
+    assert bias_df.loc[1, "holt_winters"] == 0.0
+    assert np.isnan(bias_df.loc[2, "naive"])
+
+def test_choose_models_falls_back_without_a_mape():
+    mape_df = pd.DataFrame(
+        {"naive": [5.0, np.nan, 9.0], "holt_winters": [7.0, np.nan, np.nan]},
+        index=pd.Index([1, 2, 3], name="product_id"),
+    )
+    choice = choose_models(mape_df)
+    assert choice.to_dict() == {1: "naive", 2: "seasonal_naive", 3: "naive"}
+    assert choice.name == "model"
+
+def test_backtest_rows_line_up_with_the_actuals():
+    months = [f"2024-{m:02d}" for m in range(1, 13)] + [f"2025-{m:02d}" for m in range(1, 7)]
+    pivot = pd.DataFrame([np.arange(18.0), np.full(18, 4.0)], index=[11, 12], columns=months)
+    backtest = backtest_forecasts(pivot, models=("naive",), horizon=3, min_train=14, cache_dir=None,
+                                  max_workers=1)
+    assert sorted(backtest["origin"].unique()) == ["2025-03", "2025-04"]
+    first = backtest[(backtest["product_id"] == 11) & (backtest["origin"] == "2025-03")]
+    assert first["actual"].tolist() == [14.0, 15.0, 16.0]
+    assert first["forecast"].tolist() == [13.0, 13.0, 13.0]
@@ -0,0 +1,40 @@
+import os
+import subprocess
+import sys
+from cryptography.fernet import Fernet
+from db_generate_employee import (
+    EMPLOYEE_COLUMNS, SEEDED_ISSUED_AT, derive_key_from_passphrase, generate_employees_fast, passphrase
+)
+
+SRC = os.path.join(os.path.dirname(__file__), "..", "src")
+
+def test_seeded_output_is_deterministic():
+    a = generate_employees_fast(500, seed=7, max_workers=1)
+    b = generate_employees_fast(500, seed=7, max_workers=1)
+    assert list(a.columns) == EMPLOYEE_COLUMNS
+    assert a.equals(b)
+    assert not a.equals(generate_employees_fast(500, seed=8, max_workers=1))
+
+def test_parallel_encryption_matches_serial():
+    serial = generate_employees_fast(25_000, seed=3, max_workers=1)
+    parallel = generate_employees_fast(25_000, seed=3, max_workers=2)
+    assert serial.equals(parallel)
+
+def test_tokens_decrypt_and_carry_the_seeded_time():
+    df = generate_employees_fast(50, seed=1, max_workers=1)
+    fernet = Fernet(derive_key_from_passphrase(passphrase))
+    for token in df["account_num"]:
+        assert len(fernet.decrypt(token.encode())) == 12
+        assert fernet.extract_timestamp(token.encode()) == int(SEEDED_ISSUED_AT.timestamp())
+
+def _tokens_under_tz(tz):
+    code = (
+        "from db_generate_employee import generate_employees_fast;"
+        "print(generate_employees_fast(20, seed=5, max_workers=1)['account_num'].str.cat())"
+    )
+    env = dict(os.environ, TZ=tz)
+    return subprocess.run([sys.executable, "-c", code], cwd=SRC, env=env, capture_output=True,
+                          text=True, check=True).stdout
+
+def test_seeded_tokens_do_not_depend_on_timezone():
+    assert _tokens_under_tz("UTC") == _tokens_under_tz("America/Los_Angeles")
@@ -0,0 +1,50 @@
+from datetime import date
+import numpy as np
+import pandas as pd
+from db_generate_product_pellet import PELLET_COLUMNS, iter_pellet_chunks, pellet_counts
+
+def _reference_counts(quantities, draws):
+    # One product at a time: take 1-3 units per pellet until the quantity is used up.
+    counts, start = [], 0
+    for quantity in quantities:
+        used = n = 0
+        while used < quantity:
+            used += draws[start + n]
+            n += 1
+        counts.append(n)
+        start += quantity
+    return counts
+
+def _products(quantities):
+    return pd.DataFrame({
+        "name": [f"Product {i}" for i in range(len(quantities))],
+        "category": ["Dairy", "Bakery", "Frozen", "Snacks"][:len(quantities)],
+        "pallet_cost": [10.0, 20.0, 30.0, 40.0][:len(quantities)],
+        "quantity": quantities,
+    })
+
+def test_pellet_counts_match_a_per_product_loop():
+    quantities = [5, 0, 1, 17, 3, 0, 40]
+    counts = pellet_counts(quantities, np.random.default_rng(4))
+    draws = np.random.default_rng(4).integers(1, 4, size=sum(quantities))
+    assert counts.tolist() == _reference_counts(quantities, draws)
+    assert pellet_counts([0, 0], np.random.default_rng(4)).tolist() == [0, 0]
+
+def test_chunks_are_bounded_numbered_and_reproducible():
+    products = _products([3000, 0, 1500, 2500])
+    chunks = list(iter_pellet_chunks(products, seed=9, as_of=date(2025, 4, 1), chunk_size=1000))
+    again = list(iter_pellet_chunks(products, seed=9, as_of=date(2025, 4, 1), chunk_size=1000))
+    assert len(chunks) > 1
+    assert all(a.equals(b) for a, b in zip(chunks, again))
+
+    pellets = pd.concat(chunks)
+    assert list(pellets.columns) == PELLET_COLUMNS
+    assert pellets.index.tolist() == list(range(1, len(pellets) + 1))
+    # A batch spans chunk_size expected pellets plus one product of at most
+    # 2 * chunk_size units, i.e. 4 * chunk_size units and so at most as many pellets.
+    assert max(len(c) for c in chunks) <= 4 * 1000
+    assert set(pellets["name"]) == {"Product 0", "Product 2", "Product 3"}
+    assert (pellets["received"] < date(2025, 4, 1)).all()
+    assert (pellets["sell_by"] > pellets["received"]).all()
+    assert pellets["refrigerated"].tolist() == pellets["category"].isin(["Dairy", "Frozen"]).tolist()
+    assert not pellets["sent"].any()
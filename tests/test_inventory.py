@@ -0,0 +1,14 @@
+from db_inventory import ensure_product_inventory, get_warehouse_status, reconcile_inventory
+
+def test_fresh_ledger_reconciles(db_conn):
+    with db_conn.cursor() as cur:
+        cur.execute("TRUNCATE product_inventory;")
+    assert ensure_product_inventory(db_conn) > 0
+    assert reconcile_inventory(db_conn) == []
+
+def test_inventory_row_matches_ledger_after_ensure(db_conn):
+    with db_conn.cursor() as cur:
+        cur.execute("TRUNCATE product_inventory;")
+        ensure_product_inventory(db_conn)
+        cur.execute("SELECT current_pellets, to_be_sent, to_be_received FROM inventory WHERE inventory_id = 1;")
+        assert cur.fetchone() == tuple(get_warehouse_status(db_conn)[:3])
@@ -0,0 +1,50 @@
+import pytest
+from db_config import get_db_connection
+from db_order_behavior import allocate_pellets_fefo
+
+def _stocked_product(conn, minimum):
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT p.product_id, p.name
+            FROM product_pellets p
+            JOIN product_pellet pp ON pp.name = p.name AND pp.sent = FALSE
+            GROUP BY p.product_id, p.name
+            HAVING COUNT(*) >= %s
+            ORDER BY p.product_id
+            LIMIT 1;
+        """, (minimum,))
+        row = cur.fetchone()
+    if row is None:
+        pytest.skip("No product with enough unsent pellets.")
+    return row
+
+def _fefo_pellets(conn, name, limit):
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT pellet_id FROM product_pellet
+            WHERE sent = FALSE AND name = %s
+            ORDER BY sell_by, pellet_id
+            LIMIT %s;
+        """, (name, limit))
+        return [r[0] for r in cur.fetchall()]
+
+def test_lines_of_one_product_continue_in_fefo_order(db_conn):
+    product_id, name = _stocked_product(db_conn, 5)
+    expected = _fefo_pellets(db_conn, name, 5)
+    allocations = allocate_pellets_fefo(db_conn, [(product_id, 2), (product_id, 3)])
+    assert allocations == [expected[:2], expected[2:]]
+
+def test_only_the_allocated_pellets_are_locked(db_conn):
+    product_id, name = _stocked_product(db_conn, 4)
+    first, rest = _fefo_pellets(db_conn, name, 4)[:2], _fefo_pellets(db_conn, name, 4)[2:]
+    assert allocate_pellets_fefo(db_conn, [(product_id, 2)]) == [first]
+
+    other = get_db_connection()
+    try:
+        # The next wave gets the following pellets without waiting on the first.
+        with other.cursor() as cur:
+            cur.execute("SET lock_timeout = '1s';")
+        assert allocate_pellets_fefo(other, [(product_id, 2)]) == [rest]
+    finally:
+        other.rollback()
+        other.close()
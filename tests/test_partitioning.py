@@ -0,0 +1,55 @@
+import json
+import os
+from datetime import date
+from db_extract_cache import WATERMARK_FILE
+from db_partitioning import archive_blockers, ensure_month_partitions, next_month, partition_name
+
+def _insert_transaction(cur, when):
+    cur.execute("""
+        INSERT INTO transactions (type, cost, date, date_time) VALUES ('fuel', 1.0, %s, %s)
+        RETURNING transaction_id, tableoid::regclass::text;
+    """, (when, when))
+    return cur.fetchone()
+
+def test_month_helpers():
+    assert next_month(date(2025, 12, 1)) == date(2026, 1, 1)
+    assert partition_name("fuel_log", date(2025, 4, 1)) == "fuel_log_2025_04"
+
+def test_rows_without_a_month_partition_land_in_default_and_move(db_conn):
+    month = date(2031, 7, 1)
+    with db_conn.cursor() as cur:
+        transaction_id, partition = _insert_transaction(cur, date(2031, 7, 15))
+        assert partition == "transactions_default"
+
+    ensure_month_partitions(db_conn, month, tables=("transactions",))
+
+    with db_conn.cursor() as cur:
+        cur.execute("SELECT tableoid::regclass::text FROM transactions WHERE transaction_id = %s;",
+                    (transaction_id,))
+        assert cur.fetchone()[0] == "transactions_2031_07"
+        # New rows of that month go straight to its partition.
+        assert _insert_transaction(cur, date(2031, 7, 20))[1] == "transactions_2031_07"
+
+def test_archiving_waits_for_the_cache_and_unfinished_runs(db_conn, tmp_path):
+    month = date(2031, 8, 1)
+    name = partition_name("transactions", month)
+    with db_conn.cursor() as cur:
+        transaction_id, _ = _insert_transaction(cur, date(2031, 8, 3))
+        cur.execute("DELETE FROM simulation_progress;")
+    ensure_month_partitions(db_conn, month, tables=("transactions",))
+
+    reasons = archive_blockers(db_conn, "transactions", month, name, cache_dir=str(tmp_path))
+    assert len(reasons) == 1 and "extract cache" in reasons[0]
+
+    os.makedirs(tmp_path / "transactions")
+    with open(tmp_path / "transactions" / WATERMARK_FILE, "w") as f:
+        json.dump({"column": "transaction_id", "value": transaction_id}, f)
+    assert archive_blockers(db_conn, "transactions", month, name, cache_dir=str(tmp_path)) == []
+
+    with db_conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO simulation_progress (run_id, start_date, num_days, days_processed)
+            VALUES ('test_run', '2031-08-20', 10, 4);
+        """)
+    reasons = archive_blockers(db_conn, "transactions", month, name, cache_dir=str(tmp_path))
+    assert len(reasons) == 1 and "unfinished simulation run" in reasons[0]
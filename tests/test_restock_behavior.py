@@ -0,0 +1,39 @@
+from datetime import date
+from db_restock_behavior import unload_supplier_deliveries
+
+def _pending_delivery(cur, product_id, quantity):
+    cur.execute("""
+        INSERT INTO supplier_delivery (status, cost, product_id, quantity_received, date_time)
+        VALUES ('pending', 0, %s, %s, '2025-04-01')
+        RETURNING transaction_id;
+    """, (product_id, quantity))
+    return cur.fetchone()[0]
+
+def test_a_failing_delivery_does_not_drop_the_others(db_conn):
+    with db_conn.cursor() as cur:
+        cur.execute("UPDATE supplier_delivery SET status = 'received' WHERE status = 'pending';")
+        cur.execute("SELECT product_id FROM product_pellets ORDER BY product_id LIMIT 1;")
+        product_id = cur.fetchone()[0]
+        good = _pending_delivery(cur, product_id, 3)
+        bad = _pending_delivery(cur, product_id, 2)
+        # Rolled back with the test's transaction.
+        cur.execute(f"""
+            CREATE FUNCTION pg_temp.reject_delivery() RETURNS trigger AS $$
+            BEGIN
+                IF NEW.transaction_id = {bad} THEN
+                    RAISE EXCEPTION 'rejected delivery %', NEW.transaction_id;
+                END IF;
+                RETURN NEW;
+            END $$ LANGUAGE plpgsql;
+            CREATE TRIGGER reject_delivery BEFORE UPDATE ON supplier_delivery
+            FOR EACH ROW EXECUTE FUNCTION pg_temp.reject_delivery();
+        """)
+
+    summaries = unload_supplier_deliveries(db_conn, date(2025, 4, 7))
+
+    assert list(summaries) == [good]
+    assert len(summaries[good]["delivered_dict"][str(product_id)]) == 3
+    with db_conn.cursor() as cur:
+        cur.execute("SELECT transaction_id, status FROM supplier_delivery WHERE transaction_id IN (%s, %s);",
+                    (good, bad))
+        assert dict(cur.fetchall()) == {good: "received", bad: "pending"}
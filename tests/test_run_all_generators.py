@@ -0,0 +1,14 @@
+import pytest
+from db_run_all_generators import PIPELINE, check_exclusions, run_pipeline
+
+def test_excluding_an_upstream_dataset_raises_instead_of_hanging():
+    with pytest.raises(ValueError, match="trucks is generated from it"):
+        run_pipeline(write_csv=False, exclude=("employees",))
+    with pytest.raises(ValueError, match="Unknown datasets"):
+        check_exclusions(("employee",))
+    check_exclusions(("employees", "trucks"))
+
+def test_excluded_leaf_datasets_are_skipped():
+    results = run_pipeline(stores=2, products=3, drivers=1, seed=1, write_csv=False, max_workers=2,
+                           exclude=("employees", "trucks"))
+    assert set(results) == set(PIPELINE) - {"employees", "trucks"}
@@ -0,0 +1,16 @@
+from db_simulate_scenarios import collect_kpis
+
+def test_kpis_report_delivery_cost_not_revenue(db_conn):
+    with db_conn.cursor() as cur:
+        cur.execute("DELETE FROM transactions;")
+        cur.execute("""
+            INSERT INTO transactions (type, cost, date, date_time) VALUES
+                ('delivery', 100.0, '2025-04-07', '2025-04-07'),
+                ('supplier_delivery', 40.0, '2025-04-07', '2025-04-07'),
+                ('fuel', 5.0, '2025-04-07', '2025-04-07'),
+                ('payroll', 20.0, '2025-04-07', '2025-04-07');
+        """)
+    kpis = collect_kpis(db_conn)
+    assert "delivery_revenue" not in kpis and "net" not in kpis
+    assert kpis["delivery_cost"] == 100.0
+    assert kpis["operating_cost"] == 65.0
@@ -0,0 +1,55 @@
+import numpy as np
+from db_smoothing_forecast import holt_winters_forecast, seasonal_naive_forecast
+
+SEASON = np.array([3, -2, 5, 0, -4, 1, 2, -3, 4, -1, 0, -5], dtype=float)
+
+def _trend_and_season(periods):
+    t = np.arange(periods)
+    return 10 + 0.5 * t + SEASON[t % 12]
+
+def _reference_holt_winters(y, steps, m, alpha, beta, gamma):
+    # Textbook additive recursion for one series and one set of weights.
+    level = y[:m].mean()
+    trend = (y[m:2 * m].mean() - level) / m
+    season = list(y[:m] - level)
+    for t, value in enumerate(y):
+        s = season[t % m]
+        new_level = alpha * (value - s) + (1 - alpha) * (level + trend)
+        season[t % m] = gamma * (value - level - trend) + (1 - gamma) * s
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        level = new_level
+    return [level + h * trend + season[(len(y) + h - 1) % m] for h in range(1, steps + 1)]
+
+def test_seasonal_naive_repeats_the_last_season():
+    Y = np.vstack([np.arange(24.0), np.arange(24.0) * 2])
+    forecast = seasonal_naive_forecast(Y, steps=15, season_length=12)
+    assert forecast[0].tolist() == list(range(12, 24)) + [12, 13, 14]
+    assert forecast[1].tolist() == [2 * v for v in forecast[0]]
+    short = seasonal_naive_forecast(np.array([[1.0, 4.0, 6.0]]), steps=3, season_length=12)
+    assert short.tolist() == [[6.0, 6.0, 6.0]]
+
+def test_holt_winters_matches_the_scalar_recursion():
+    y = _trend_and_season(36) + np.random.default_rng(2).normal(0, 1, 36)
+    forecast, params = holt_winters_forecast(y[None, :], steps=6, season_length=12,
+                                             alphas=(0.3,), betas=(0.1,), gammas=(0.2,))
+    assert {k: v.tolist() for k, v in params.items()} == {"alpha": [0.3], "beta": [0.1], "gamma": [0.2]}
+    np.testing.assert_allclose(forecast[0], _reference_holt_winters(y, 6, 12, 0.3, 0.1, 0.2))
+
+def test_each_series_gets_its_own_weights():
+    Y = np.vstack([_trend_and_season(48), np.full(48, 7.0)])
+    forecast, params = holt_winters_forecast(Y, steps=12)
+    for row in range(len(Y)):
+        alone, _ = holt_winters_forecast(Y[row:row + 1], steps=12)
+        np.testing.assert_allclose(alone[0], forecast[row])
+    np.testing.assert_allclose(forecast[1], 7.0)
+    # The trend is followed, unlike the seasonal naive forecast.
+    actual = _trend_and_season(60)[48:]
+    naive = seasonal_naive_forecast(Y[:1], steps=12)
+    assert np.abs(forecast[0] - actual).mean() < np.abs(naive[0] - actual).mean()
+
+def test_short_histories_fall_back():
+    forecast, params = holt_winters_forecast(np.array([[1.0, 2.0, 3.0, 4.0]]), steps=3)
+    assert params["gamma"].tolist() == [0.0]
+    assert forecast[0, 0] > 4.0
+    forecast, params = holt_winters_forecast(np.array([[5.0]]), steps=2)
+    assert forecast.tolist() == [[5.0, 5.0]] and params == {}